@@ -6,27 +6,19 @@ Analyzes structure, content, and quality of synchrony data files
 
 import json
 import csv
-import pandas as pd
 from pathlib import Path
 import sys
 from datetime import datetime
+from streaming_stats import compute_statistics
+from synchrony_io import iter_jsonl
 
-def load_jsonl(file_path):
-    """Load JSONL file and return list of records"""
-    records = []
-    with open(file_path, 'r') as f:
-        for line in f:
-            records.append(json.loads(line.strip()))
-    return records
-
-def analyze_structure(data, format_name):
+def analyze_structure(sample_record, record_count):
     """Analyze data structure and return schema info"""
-    if not data:
+    if sample_record is None:
         return {}
     
-    sample_record = data[0]
     structure = {
-        'record_count': len(data),
+        'record_count': record_count,
         'fields': list(sample_record.keys()) if isinstance(sample_record, dict) else [],
         'field_types': {},
         'sample_record': sample_record
@@ -39,29 +31,38 @@ def analyze_structure(data, format_name):
     
     return structure
 
-def compare_formats(full_data, mvp_data):
+def compare_formats(full_structure, mvp_structure):
     """Compare full and MVP format structures"""
-    full_structure = analyze_structure(full_data, "Full")
-    mvp_structure = analyze_structure(mvp_data, "MVP")
+    full_fields = set(full_structure.get('fields', []))
+    mvp_fields = set(mvp_structure.get('fields', []))
     
     comparison = {
         'full_format': full_structure,
         'mvp_format': mvp_structure,
         'differences': {
-            'fields_only_in_full': set(full_structure['fields']) - set(mvp_structure['fields']),
-            'fields_only_in_mvp': set(mvp_structure['fields']) - set(full_structure['fields']),
-            'common_fields': set(full_structure['fields']) & set(mvp_structure['fields'])
+            'fields_only_in_full': full_fields - mvp_fields,
+            'fields_only_in_mvp': mvp_fields - full_fields,
+            'common_fields': full_fields & mvp_fields
         }
     }
     
     return comparison
 
-def validate_integrity(jsonl_data, csv_data, format_name):
+def count_csv_records(file_path):
+    """Number of CSV data rows (quoted multi-line fields count once), streamed"""
+    # Whole IMU windows are single fields, beyond the default 128 KB limit
+    csv.field_size_limit(sys.maxsize)
+    with open(file_path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # header
+        return sum(1 for row in reader if row)
+
+def validate_integrity(jsonl_count, csv_count, format_name):
     """Validate data integrity between JSONL and CSV formats"""
     results = {
-        'record_count_match': len(jsonl_data) == len(csv_data),
-        'jsonl_count': len(jsonl_data),
-        'csv_count': len(csv_data),
+        'record_count_match': jsonl_count == csv_count,
+        'jsonl_count': jsonl_count,
+        'csv_count': csv_count,
         'issues': []
     }
     
@@ -70,55 +71,47 @@ def validate_integrity(jsonl_data, csv_data, format_name):
     
     return results
 
-def generate_statistics(data, format_name):
-    """Generate statistical summary of the data"""
+def generate_statistics(data, format_name, chunk_size=10000):
+    """Generate statistical summary of the data
+    
+    Accepts any iterable of records and makes a single chunked pass with
+    constant memory (see streaming_stats.py). Medians and unique counts
+    are approximate (t-digest / HyperLogLog).
+    """
     if not data:
         return {}
     
+    field_stats = compute_statistics(data, chunk_size=chunk_size)
+    if not field_stats['record_count']:
+        return {}
+    
     stats = {
-        'record_count': len(data),
+        'record_count': field_stats['record_count'],
         'timestamp_range': None,
-        'numeric_field_stats': {},
-        'text_field_stats': {}
+        'numeric_field_stats': field_stats['numeric_field_stats'],
+        'text_field_stats': field_stats['text_field_stats']
     }
     
-    # Convert to DataFrame for easier analysis
-    df = pd.DataFrame(data)
-    
-    # Analyze numeric columns
-    numeric_cols = df.select_dtypes(include=['number']).columns
-    for col in numeric_cols:
-        stats['numeric_field_stats'][col] = {
-            'mean': df[col].mean(),
-            'median': df[col].median(),
-            'std': df[col].std(),
-            'min': df[col].min(),
-            'max': df[col].max(),
-            'null_count': df[col].isnull().sum()
-        }
-    
-    # Analyze text columns (skip dict/complex types)
-    text_cols = df.select_dtypes(include=['object']).columns
-    for col in text_cols:
-        try:
-            # Skip columns with dict/complex types that can't be hashed
-            unique_count = df[col].nunique()
-            stats['text_field_stats'][col] = {
-                'unique_values': unique_count,
-                'null_count': df[col].isnull().sum(),
-                'avg_length': df[col].astype(str).str.len().mean() if not df[col].empty else 0
-            }
-        except TypeError:
-            # Handle unhashable types like dicts
-            stats['text_field_stats'][col] = {
-                'unique_values': 'N/A (complex type)',
-                'null_count': df[col].isnull().sum(),
-                'avg_length': df[col].astype(str).str.len().mean() if not df[col].empty else 0,
-                'note': 'Contains complex data (dict/list)'
-            }
-    
     return stats
 
+def scan_jsonl(file_path, format_name, chunk_size=10000):
+    """Structure and statistics of a JSONL file in one streaming pass.
+    
+    Only the first record is kept (for the structure sample); everything
+    else goes straight through the streaming statistics.
+    """
+    first = []
+    
+    def records():
+        for record in iter_jsonl(file_path):
+            if not first:
+                first.append(record)
+            yield record
+    
+    stats = generate_statistics(records(), format_name, chunk_size)
+    structure = analyze_structure(first[0] if first else None, stats.get('record_count', 0))
+    return structure, stats
+
 def main(data_dir):
     """Main analysis function"""
     data_path = Path(data_dir)
@@ -144,43 +137,37 @@ def main(data_dir):
     
     print("✅ All files found")
     
-    # Load data
-    print("\n📊 Loading data files...")
-    full_jsonl_data = load_jsonl(files['full_jsonl'])
-    mvp_jsonl_data = load_jsonl(files['mvp_jsonl'])
-    full_csv_data = pd.read_csv(files['full_csv']).to_dict('records')
-    mvp_csv_data = pd.read_csv(files['mvp_csv']).to_dict('records')
+    # Analysis 1: Structure and statistics, one streaming pass per JSONL file
+    print("\n📊 Scanning data files...")
+    full_structure, full_stats = scan_jsonl(files['full_jsonl'], "Full")
+    mvp_structure, mvp_stats = scan_jsonl(files['mvp_jsonl'], "MVP")
     
     with open(files['metadata'], 'r') as f:
         metadata = json.load(f)
     
-    print(f"📈 Loaded {len(full_jsonl_data)} full format records")
-    print(f"📈 Loaded {len(mvp_jsonl_data)} MVP format records")
+    print(f"📈 Scanned {full_structure.get('record_count', 0)} full format records")
+    print(f"📈 Scanned {mvp_structure.get('record_count', 0)} MVP format records")
     
-    # Analysis 1: Structure Comparison
     print("\n🔬 Analyzing data structures...")
-    format_comparison = compare_formats(full_jsonl_data, mvp_jsonl_data)
+    format_comparison = compare_formats(full_structure, mvp_structure)
     
-    print(f"Full format fields: {len(format_comparison['full_format']['fields'])}")
-    print(f"MVP format fields: {len(format_comparison['mvp_format']['fields'])}")
+    print(f"Full format fields: {len(format_comparison['full_format'].get('fields', []))}")
+    print(f"MVP format fields: {len(format_comparison['mvp_format'].get('fields', []))}")
     print(f"Common fields: {len(format_comparison['differences']['common_fields'])}")
     print(f"Full-only fields: {format_comparison['differences']['fields_only_in_full']}")
     print(f"MVP-only fields: {format_comparison['differences']['fields_only_in_mvp']}")
     
     # Analysis 2: Data Integrity
     print("\n🔍 Validating data integrity...")
-    full_integrity = validate_integrity(full_jsonl_data, full_csv_data, "Full")
-    mvp_integrity = validate_integrity(mvp_jsonl_data, mvp_csv_data, "MVP")
+    full_integrity = validate_integrity(full_structure.get('record_count', 0),
+                                        count_csv_records(files['full_csv']), "Full")
+    mvp_integrity = validate_integrity(mvp_structure.get('record_count', 0),
+                                       count_csv_records(files['mvp_csv']), "MVP")
     
     print(f"Full format integrity: {'✅' if full_integrity['record_count_match'] else '❌'}")
     print(f"MVP format integrity: {'✅' if mvp_integrity['record_count_match'] else '❌'}")
     
-    # Analysis 3: Statistical Summary
-    print("\n📊 Generating statistics...")
-    full_stats = generate_statistics(full_jsonl_data, "Full")
-    mvp_stats = generate_statistics(mvp_jsonl_data, "MVP")
-    
-    # Analysis 4: File Sizes
+    # Analysis 3: File Sizes
     file_sizes = {}
     for name, path in files.items():
         if path.exists():
@@ -4,28 +4,145 @@ Convert iOS Synchrony Data for PiSrv Integration
 Transforms synchrony data into formats compatible with pisrv inference endpoints
 """
 
+import argparse
+import hashlib
 import json
+import os
+import textwrap
+from functools import partial
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import sys
 from datetime import datetime
+from jsonl_index import IndexedJsonl, map_chunks
+from synchrony_io import iter_jsonl_with_offsets, load_jsonl
 
-def load_synchrony_data(data_dir, format_type='mvp'):
-    """Load synchrony data in specified format"""
+# synchrony_fft.py and imu_codec.py live at the repo root, shared with the
+# session worker and the sidecar
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+import imu_codec
+import synchrony_fft
+
+# Fields used by the window extraction and motif formatting below
+CONVERT_FIELDS = ('id', 'session_id', 'timestamp', 'imu_data', 'synchrony_score')
+
+# Incremental conversion state, stored next to the converted outputs
+STATE_FILE = "conversion_state.json"
+HASH_CHUNK = 1 << 20
+
+# Fields of the full export read when recomputing synchrony (--synchrony)
+SYNCHRONY_FIELDS = ('id', 'session_id', 'sample_rate_hz', 'synchrony_score', 'imu_data', 'handler_imu_data')
+SYNCHRONY_FILE = "synchrony_sessions.json"
+# Records scored per FFT batch
+SYNCHRONY_BATCH = 4096
+# Windows timed by the codec report (--codec)
+CODEC_REPORT_WINDOWS = 1000
+
+def synchrony_jsonl_path(data_dir, format_type='mvp'):
+    """Return the JSONL file for the given export format"""
     data_path = Path(data_dir)
     
     if format_type == 'mvp':
-        jsonl_file = data_path / 'synchrony_mvp_data.jsonl'
-    else:
-        jsonl_file = data_path / 'synchrony_data.jsonl'
+        return data_path / 'synchrony_mvp_data.jsonl'
+    return data_path / 'synchrony_data.jsonl'
+
+def load_synchrony_data(data_dir, format_type='mvp', fields=None):
+    """Load synchrony data in specified format"""
+    return load_jsonl(synchrony_jsonl_path(data_dir, format_type), fields)
+
+def read_records_from_offset(jsonl_file, offset=0, hasher=None, fields=None):
+    """Read complete JSONL records starting at a byte offset.
     
+    Returns (records, end_offset). A trailing line without a newline is
+    only consumed if it parses; otherwise it is left for the next run since
+    the exporter may still be writing it. If a hasher is given it is
+    updated with every consumed byte.
+    """
     records = []
-    with open(jsonl_file, 'r') as f:
-        for line in f:
-            records.append(json.loads(line.strip()))
+    end_offset = offset
+    for record, end_offset in iter_jsonl_with_offsets(jsonl_file, fields, offset, hasher):
+        records.append(record)
     
-    return records
+    return records, end_offset
+
+def _prefix_hasher(path, length):
+    """Return a sha256 hasher fed with the first `length` bytes of path"""
+    hasher = hashlib.sha256()
+    remaining = length
+    with open(path, 'rb') as f:
+        while remaining > 0:
+            chunk = f.read(min(HASH_CHUNK, remaining))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            remaining -= len(chunk)
+    return hasher
+
+def load_conversion_state(output_path, jsonl_file):
+    """Return (state, hasher) if a previous run can be resumed, else (None, None).
+    
+    The state is only reused when it describes the same source file and the
+    already-converted prefix of that file is byte-for-byte unchanged.
+    """
+    state_file = Path(output_path) / STATE_FILE
+    if not state_file.exists():
+        return None, None
+    
+    try:
+        with open(state_file, 'r') as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None, None
+    
+    offset = state.get('offset', 0)
+    if state.get('source') != Path(jsonl_file).name:
+        return None, None
+    if jsonl_file.stat().st_size < offset:
+        return None, None
+    
+    hasher = _prefix_hasher(jsonl_file, offset)
+    if hasher.hexdigest() != state.get('prefix_sha256'):
+        return None, None
+    
+    return state, hasher
+
+def save_conversion_state(output_path, state):
+    """Atomically write the incremental conversion state"""
+    state_file = Path(output_path) / STATE_FILE
+    tmp_file = state_file.with_suffix(state_file.suffix + '.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(state, f, indent=2)
+    tmp_file.replace(state_file)
+
+def append_json_array(path, items):
+    """Append items to a JSON array file written with json.dump(indent=2).
+    
+    Only the closing bracket is rewritten, so the cost is proportional to
+    the new items rather than the size of the existing file.
+    """
+    if not items:
+        return
+    
+    with open(path, 'r+b') as f:
+        end = f.seek(0, os.SEEK_END)
+        tail_start = max(0, end - 64)
+        f.seek(tail_start)
+        tail = f.read().rstrip()
+        if not tail.endswith(b']'):
+            raise ValueError(f"{path} does not end with a JSON array")
+        body = tail[:-1].rstrip()
+        separator = b'\n' if body.endswith(b'[') else b',\n'
+        
+        encoded = ',\n'.join(
+            textwrap.indent(json.dumps(item, indent=2, default=str), '  ')
+            for item in items
+        )
+        f.seek(tail_start + len(body))
+        f.truncate()
+        f.write(separator + encoded.encode('utf-8') + b'\n]')
 
 def extract_imu_windows(records, window_size=100):
     """Extract IMU data windows suitable for inference"""
@@ -71,14 +188,154 @@ def format_for_analysis_infer(imu_windows):
     
     return formatted_requests
 
-def format_for_analysis_motifs(records):
-    """Format data for /api/v1/analysis/motifs endpoint (if applicable)"""
+def encode_infer_requests(infer_requests, precision=None):
+    """Store each request's window as a base64 IMU codec frame ('x_encoded') instead of float lists.
+
+    Requests whose 'x' is not a rectangular (samples, channels) array are kept
+    as-is so validation errors stay readable.
+    """
+    encoded = []
+    for request in infer_requests:
+        try:
+            frame = imu_codec.encode_text(request['x'], precision=precision)
+        except (KeyError, ValueError):
+            encoded.append(request)
+            continue
+        encoded.append({imu_codec.JSON_FIELD: frame, 'metadata': request['metadata']})
+    return encoded
+
+def codec_report(infer_requests, precision=None):
+    """imu_codec.report() over up to CODEC_REPORT_WINDOWS valid windows, or None"""
+    windows = [r['x'] for r in infer_requests[:CODEC_REPORT_WINDOWS]]
+    if not windows:
+        return None
+    try:
+        return imu_codec.report(np.asarray(windows, dtype=np.float32), precision=precision)
+    except ValueError:
+        # Ragged windows; validation has already reported them
+        return None
+
+def _window_array(imu_data, window_size):
+    """First window_size rows of an IMU window as a float array, or None if malformed"""
+    if not isinstance(imu_data, list) or len(imu_data) < window_size:
+        return None
+    try:
+        window = np.asarray(imu_data[:window_size], dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    if window.shape != (window_size, synchrony_fft.IMU_CHANNELS):
+        return None
+    return window
+
+def score_synchrony_records(records, window_size=100, max_lag_sec=synchrony_fft.DEFAULT_MAX_LAG_SEC):
+    """Score full-format records in batches with the lag-aware FFT cross-correlation.
+    
+    Returns (per-record results keyed by id, per-session totals); records
+    without two well-formed windows are skipped.
+    """
+    by_record = {}
+    sessions = {}
+    pending = []
+    
+    def flush():
+        if not pending:
+            return
+        rate = pending[0][1]
+        max_lag = min(synchrony_fft.max_lag_samples(rate, max_lag_sec), window_size // 2)
+        dog = np.stack([item[2] for item in pending])
+        handler = np.stack([item[3] for item in pending])
+        result = synchrony_fft.synchrony(dog, handler, max_lag)
+        for i, (record, _, _, _) in enumerate(pending):
+            score = round(float(result['score'][i]), 4)
+            lag_ms = round(float(result['lag'][i]) * 1000 / rate, 1)
+            by_record[record.get('id')] = {'sync_score_fft': score, 'sync_lag_ms': lag_ms}
+            exported = record.get('synchrony_score')
+            exported = exported if isinstance(exported, (int, float)) else None
+            _add_session_totals(sessions, record.get('session_id'), {
+                'windows': 1, 'score_sum': score, 'lag_ms_sum': lag_ms,
+                'exported_windows': int(exported is not None), 'exported_sum': exported or 0.0})
+        pending.clear()
+    
+    for record in records:
+        dog = _window_array(record.get('imu_data'), window_size)
+        handler = _window_array(record.get('handler_imu_data'), window_size)
+        if dog is None or handler is None:
+            continue
+        rate = record.get('sample_rate_hz') or synchrony_fft.DEFAULT_SAMPLE_RATE
+        if pending and (pending[0][1] != rate or len(pending) == SYNCHRONY_BATCH):
+            flush()
+        pending.append((record, rate, dog, handler))
+    flush()
+    
+    return by_record, sessions
+
+def _add_session_totals(sessions, session_id, totals):
+    entry = sessions.setdefault(session_id, dict.fromkeys(totals, 0))
+    for key, value in totals.items():
+        entry[key] += value
+
+def compute_synchrony(full_file, offset=0, window_size=100, max_lag_sec=synchrony_fft.DEFAULT_MAX_LAG_SEC,
+                      workers=1):
+    """Recompute synchrony from the dog and handler IMU of the full export.
+    
+    Records are read from the byte offset. With workers > 1 the file is
+    split on record boundaries through its offset index (jsonl_index.py) and
+    the chunks are parsed and scored in parallel processes. Returns
+    (per-record results keyed by id, per-session totals, end offset).
+    """
+    score = partial(score_synchrony_records, window_size=window_size, max_lag_sec=max_lag_sec)
+    if workers > 1:
+        with IndexedJsonl(full_file) as data:
+            start, end_offset = data.locate(offset), max(data.end, offset)
+        by_record, sessions = {}, {}
+        for chunk_records, chunk_sessions in map_chunks(full_file, score, workers, SYNCHRONY_FIELDS, start):
+            by_record.update(chunk_records)
+            for session_id, totals in chunk_sessions.items():
+                _add_session_totals(sessions, session_id, totals)
+        return by_record, sessions, end_offset
+    
+    end_offset = offset
+    
+    def records():
+        nonlocal end_offset
+        for record, end_offset in iter_jsonl_with_offsets(full_file, SYNCHRONY_FIELDS, offset):
+            yield record
+    
+    by_record, sessions = score(records())
+    return by_record, sessions, end_offset
+
+def merge_synchrony_sessions(existing, totals):
+    """Fold per-session totals from compute_synchrony() into the saved session summaries"""
+    merged = dict(existing)
+    for session_id, new in totals.items():
+        old = merged.get(session_id, {})
+        windows = old.get('windows', 0) + new['windows']
+        exported_windows = old.get('exported_windows', 0) + new['exported_windows']
+        entry = {
+            'windows': windows,
+            'mean_score': round((old.get('mean_score', 0) * old.get('windows', 0) + new['score_sum']) / windows, 4),
+            'mean_lag_ms': round((old.get('mean_lag_ms', 0) * old.get('windows', 0) + new['lag_ms_sum']) / windows, 1),
+            'exported_windows': exported_windows,
+        }
+        if exported_windows:
+            entry['exported_mean_score'] = round(
+                (old.get('exported_mean_score', 0) * old.get('exported_windows', 0) + new['exported_sum'])
+                / exported_windows, 4)
+        merged[session_id] = entry
+    return merged
+
+def format_for_analysis_motifs(records, synchrony=None):
+    """Format data for /api/v1/analysis/motifs endpoint (if applicable)
+    
+    synchrony maps record ids to the recomputed sync_score_fft / sync_lag_ms
+    from compute_synchrony(), added next to the exported sync_score.
+    """
     # This endpoint might not need specific input format
     # but we can prepare metadata for batch processing
     motif_requests = []
     
     for record in records:
-        motif_requests.append({
+        request = {
             'session_id': record.get('session_id'),
             'timestamp': record.get('timestamp'),
             'sync_score': record.get('synchrony_score'),
@@ -86,19 +343,26 @@ def format_for_analysis_motifs(records):
                 'source': 'ios_synchrony',
                 'record_id': record.get('id')
             }
-        })
+        }
+        if synchrony and record.get('id') in synchrony:
+            request.update(synchrony[record.get('id')])
+        motif_requests.append(request)
     
     return motif_requests
 
-def validate_pisrv_format(formatted_data):
-    """Validate data format for PiSrv compatibility"""
+def validate_pisrv_format(formatted_data, start_index=0):
+    """Validate data format for PiSrv compatibility
+    
+    start_index offsets the request numbers used in error messages, so
+    reports from incremental runs line up with the appended outputs.
+    """
     validation_results = {
         'valid_windows': 0,
         'invalid_windows': 0,
         'errors': []
     }
     
-    for i, request in enumerate(formatted_data):
+    for i, request in enumerate(formatted_data, start=start_index):
         try:
             # Check x field exists and has correct shape
             if 'x' not in request:
@@ -154,7 +418,8 @@ def generate_test_requests(formatted_data, output_dir, num_samples=5):
     
     print(f"✅ Generated {len(test_samples)} test requests in {output_path}")
 
-def main(data_dir, output_dir=None):
+def main(data_dir, output_dir=None, incremental=False, recompute_synchrony=False, workers=1,
+         codec=False, codec_precision=None):
     """Main conversion function"""
     data_path = Path(data_dir)
     output_path = Path(output_dir) if output_dir else data_path / "pisrv_formatted"
@@ -165,16 +430,35 @@ def main(data_dir, output_dir=None):
     print(f"📂 Output: {output_path}")
     print("=" * 60)
     
+    mvp_file = synchrony_jsonl_path(data_dir, 'mvp')
+    state, hasher = (None, None)
+    if incremental:
+        state, hasher = load_conversion_state(output_path, mvp_file)
+        if state:
+            print(f"⏩ Resuming after {state['records']} records (byte offset {state['offset']:,})")
+        else:
+            print("🔁 No reusable conversion state (missing or source prefix changed) - full rebuild")
+    resuming = state is not None
+    
     # Load data
     print("📊 Loading synchrony data...")
     try:
-        mvp_records = load_synchrony_data(data_dir, 'mvp')
-        full_records = load_synchrony_data(data_dir, 'full')
-        print(f"✅ Loaded {len(mvp_records)} MVP records, {len(full_records)} full records")
+        if resuming:
+            mvp_records, end_offset = read_records_from_offset(mvp_file, state['offset'], hasher, CONVERT_FIELDS)
+            print(f"✅ Loaded {len(mvp_records)} new MVP records")
+        else:
+            hasher = hashlib.sha256()
+            mvp_records, end_offset = read_records_from_offset(mvp_file, 0, hasher, CONVERT_FIELDS)
+            full_records = load_synchrony_data(data_dir, 'full', fields=('id',))
+            print(f"✅ Loaded {len(mvp_records)} MVP records, {len(full_records)} full records")
     except Exception as e:
         print(f"❌ Error loading data: {e}")
         return
     
+    if resuming and not mvp_records:
+        print("✅ Outputs already up to date - nothing to convert")
+        return
+    
     # Extract IMU windows
     print("🔬 Extracting IMU windows...")
     try:
@@ -185,14 +469,30 @@ def main(data_dir, output_dir=None):
         print("📝 Note: This may need adaptation based on actual data structure")
         return
     
+    # Recompute synchrony from the full export's dog + handler IMU
+    synchrony = None
+    full_offset = state.get('full_offset', 0) if resuming else 0
+    if recompute_synchrony:
+        print("🐕 Recomputing synchrony (lag-aware FFT cross-correlation)...")
+        full_file = synchrony_jsonl_path(data_dir, 'full')
+        try:
+            started = datetime.now()
+            synchrony, synchrony_totals, full_offset = compute_synchrony(full_file, full_offset, workers=workers)
+            elapsed = (datetime.now() - started).total_seconds()
+            print(f"✅ Scored {len(synchrony)} windows across {len(synchrony_totals)} sessions in {elapsed:.2f}s")
+        except OSError as e:
+            print(f"⚠️  Could not recompute synchrony: {e}")
+            synchrony, synchrony_totals = None, {}
+    
     # Format for PiSrv endpoints
     print("🎯 Formatting for PiSrv endpoints...")
     infer_requests = format_for_analysis_infer(imu_windows)
-    motif_requests = format_for_analysis_motifs(mvp_records)
+    motif_requests = format_for_analysis_motifs(mvp_records, synchrony)
     
     # Validate format
     print("🔍 Validating PiSrv format...")
-    validation = validate_pisrv_format(infer_requests)
+    previous_windows = state['windows'] if resuming else 0
+    validation = validate_pisrv_format(infer_requests, start_index=previous_windows)
     print(f"✅ Valid windows: {validation['valid_windows']}")
     print(f"❌ Invalid windows: {validation['invalid_windows']}")
     
@@ -201,6 +501,17 @@ def main(data_dir, output_dir=None):
         for error in validation['errors'][:10]:  # Show first 10 errors
             print(f"  • {error}")
     
+    # Store windows as IMU codec frames instead of JSON float lists
+    codec_summary = None
+    if codec:
+        print(f"📦 Encoding windows (IMU codec, {'precision ' + str(codec_precision) if codec_precision else 'lossless'})...")
+        codec_summary = codec_report(infer_requests, codec_precision)
+        infer_requests = encode_infer_requests(infer_requests, codec_precision)
+        if codec_summary:
+            print(f"✅ {codec_summary['compression']}: {codec_summary['ratio_vs_json']}x smaller than JSON, "
+                  f"encode {codec_summary['encode_mb_per_s']} MB/s, decode {codec_summary['decode_mb_per_s']} MB/s, "
+                  f"max error {codec_summary['max_abs_error']:.2e}")
+    
     # Save formatted data
     output_files = {
         'infer_requests.json': infer_requests,
@@ -208,30 +519,74 @@ def main(data_dir, output_dir=None):
         'validation_report.json': validation
     }
     
-    for filename, data in output_files.items():
-        output_file = output_path / filename
-        with open(output_file, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
-        print(f"💾 Saved: {output_file}")
+    if resuming:
+        append_json_array(output_path / 'infer_requests.json', infer_requests)
+        append_json_array(output_path / 'motif_requests.json', motif_requests)
+        
+        report_file = output_path / 'validation_report.json'
+        with open(report_file, 'r') as f:
+            report = json.load(f)
+        report['valid_windows'] += validation['valid_windows']
+        report['invalid_windows'] += validation['invalid_windows']
+        report['errors'].extend(validation['errors'])
+        with open(report_file, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        validation = report
+        
+        for filename in output_files:
+            print(f"💾 Updated: {output_path / filename}")
+    else:
+        for filename, data in output_files.items():
+            output_file = output_path / filename
+            with open(output_file, 'w') as f:
+                json.dump(data, f, indent=2, default=str)
+            print(f"💾 Saved: {output_file}")
+    
+    if synchrony is not None:
+        sessions_file = output_path / SYNCHRONY_FILE
+        existing = {}
+        if resuming and sessions_file.exists():
+            with open(sessions_file, 'r') as f:
+                existing = json.load(f)
+        with open(sessions_file, 'w') as f:
+            json.dump(merge_synchrony_sessions(existing, synchrony_totals), f, indent=2)
+        print(f"💾 Saved: {sessions_file}")
     
     # Generate test samples
-    if validation['valid_windows'] > 0:
+    if validation['valid_windows'] > 0 and not (resuming and (output_path / "test_samples").exists()):
         generate_test_requests(infer_requests, output_path / "test_samples")
     
+    total_records = len(mvp_records) + (state['records'] if resuming else 0)
+    total_windows = len(imu_windows) + previous_windows
+    
     # Create summary
     summary = {
         'conversion_timestamp': datetime.now().isoformat(),
-        'source_records': len(mvp_records),
-        'extracted_windows': len(imu_windows),
+        'source_records': total_records,
+        'extracted_windows': total_windows,
         'valid_infer_requests': validation['valid_windows'],
         'validation_errors': len(validation['errors']),
-        'output_files': list(output_files.keys())
+        'output_files': list(output_files.keys()),
+        'incremental': resuming,
+        'new_records': len(mvp_records)
     }
+    if codec_summary:
+        summary['codec'] = codec_summary
     
     summary_file = output_path / "conversion_summary.json"
     with open(summary_file, 'w') as f:
         json.dump(summary, f, indent=2)
     
+    save_conversion_state(output_path, {
+        'source': mvp_file.name,
+        'offset': end_offset,
+        'records': total_records,
+        'windows': total_windows,
+        'full_offset': full_offset,
+        'prefix_sha256': hasher.hexdigest(),
+        'updated': datetime.now().isoformat()
+    })
+    
     print(f"\n📋 Conversion Summary:")
     print(f"  • Source records: {summary['source_records']}")
     print(f"  • Extracted windows: {summary['extracted_windows']}")
@@ -241,11 +596,20 @@ def main(data_dir, output_dir=None):
     print("🎉 Conversion complete!")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python convert_for_pisrv.py <data_directory> [output_directory]")
-        sys.exit(1)
-    
-    data_dir = sys.argv[1]
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else None
+    parser = argparse.ArgumentParser(description="Convert iOS synchrony data for PiSrv")
+    parser.add_argument("data_dir", help="Directory containing the synchrony exports")
+    parser.add_argument("output_dir", nargs="?", help="Output directory (default: <data_dir>/pisrv_formatted)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only convert records appended since the last run; rebuilds if the source prefix changed")
+    parser.add_argument("--synchrony", action="store_true",
+                        help="Recompute per-window synchrony from the full export's dog and handler IMU")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes for --synchrony; >1 splits the full export on record boundaries (default: 1)")
+    parser.add_argument("--codec", action="store_true",
+                        help="Store infer request windows as base64 IMU codec frames ('x_encoded') instead of float lists")
+    parser.add_argument("--codec-precision", type=float,
+                        help="Quantization step for --codec, e.g. 1e-4 (default: lossless float32)")
+    args = parser.parse_args()
     
-    main(data_dir, output_dir)
\ No newline at end of file
+    main(args.data_dir, args.output_dir, incremental=args.incremental, recompute_synchrony=args.synchrony,
+         workers=args.workers, codec=args.codec, codec_precision=args.codec_precision)
\ No newline at end of file
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Synthetic iOS Synchrony Dataset Generator
+Writes schema-faithful synchrony exports of any size for scale testing:
+
+  synchrony_data.jsonl / .csv       (full format: handler + dog IMU)
+  synchrony_mvp_data.jsonl / .csv   (MVP format: dog IMU + synchrony score)
+  session_metadata.json
+
+Each record is one window of 9-channel IMU (ax,ay,az,gx,gy,gz,mx,my,mz) at a
+realistic sample rate. Records are generated in numpy blocks and streamed to
+disk, so memory stays flat and multi-GB fixtures take minutes, not hours.
+A configurable fraction of MVP rows is deliberately malformed.
+"""
+
+import argparse
+import csv
+import json
+import math
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHANNELS = ['ax', 'ay', 'az', 'gx', 'gy', 'gz', 'mx', 'my', 'mz']
+GRAVITY = 9.81
+
+# Records generated per numpy block
+BLOCK_RECORDS = 512
+
+MALFORMED_KINDS = ('short_window', 'bad_channels', 'missing_imu', 'non_numeric', 'truncated')
+DEFAULT_MALFORMED_KINDS = ('short_window', 'bad_channels', 'missing_imu', 'non_numeric')
+
+FULL_CSV_FIELDS = ['id', 'session_id', 'timestamp', 'sample_rate_hz', 'synchrony_score',
+                   'lag_ms', 'activity', 'imu_data', 'handler_imu_data']
+MVP_CSV_FIELDS = ['id', 'session_id', 'timestamp', 'synchrony_score', 'imu_data']
+
+ACTIVITIES = ['stationary', 'walking', 'running', 'turning']
+
+
+def parse_size(text):
+    """Parse sizes like 500M or 2G into bytes"""
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def _to_list(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"cannot serialize {type(value).__name__}")
+
+
+def _dumps(record):
+    if orjson is not None:
+        return orjson.dumps(record, default=_to_list, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+    return json.dumps(record, default=_to_list)
+
+
+def imu_block(rng, start_sample, n_windows, window_size, sample_rate, gait_hz, heading, lag_samples=0):
+    """Generate n_windows contiguous 9-channel windows, shape (n, window_size, 9)"""
+    n = n_windows * window_size
+    t = (start_sample - lag_samples + np.arange(n)) / sample_rate
+    phase = 2 * math.pi * gait_hz * t
+
+    data = np.empty((n, 9))
+    data[:, 0] = 1.5 * np.sin(phase)
+    data[:, 1] = 0.6 * np.sin(phase + math.pi / 3)
+    data[:, 2] = GRAVITY + 0.8 * np.sin(2 * phase)
+    data[:, 3] = 15.0 * np.cos(phase)
+    data[:, 4] = 8.0 * np.sin(phase / 2)
+    data[:, 5] = 5.0 * np.cos(phase / 3)
+    yaw = heading + 0.05 * t
+    data[:, 6] = 25.0 * np.cos(yaw)
+    data[:, 7] = 25.0 * np.sin(yaw)
+    data[:, 8] = -20.0 + 2.0 * np.sin(0.1 * t)
+
+    noise_scale = np.array([0.15, 0.15, 0.15, 1.5, 1.5, 1.5, 0.8, 0.8, 0.8])
+    data += rng.normal(size=data.shape) * noise_scale
+    return np.round(data, 4).reshape(n_windows, window_size, 9)
+
+
+def synchrony_scores(dog, handler):
+    """Per-window correlation of accelerometer magnitude mapped to [0, 1]"""
+    a = np.linalg.norm(dog[:, :, :3], axis=2)
+    b = np.linalg.norm(handler[:, :, :3], axis=2)
+    a = a - a.mean(axis=1, keepdims=True)
+    b = b - b.mean(axis=1, keepdims=True)
+    denom = np.sqrt((a * a).sum(axis=1) * (b * b).sum(axis=1))
+    r = np.divide((a * b).sum(axis=1), denom, out=np.zeros(len(a)), where=denom > 0)
+    return np.round((r + 1) / 2, 4)
+
+
+def malformed_record(rng, record, kind):
+    """Corrupt an MVP record; returns a JSON line (possibly invalid)"""
+    window = record['imu_data']
+    if kind == 'short_window':
+        record['imu_data'] = window[: len(window) // 2]
+    elif kind == 'bad_channels':
+        record['imu_data'] = window[:, :8]
+    elif kind == 'missing_imu':
+        record['imu_data'] = None
+    elif kind == 'non_numeric':
+        rows = window.tolist()
+        rows[int(rng.integers(len(rows)))][0] = 'NaN'
+        record['imu_data'] = rows
+    line = _dumps(record)
+    if kind == 'truncated':
+        line = line[: int(rng.integers(1, len(line)))]
+    return line
+
+
+class DatasetWriter:
+    """Streams records to the JSONL and CSV export files"""
+
+    def __init__(self, output_path, write_csv=True):
+        self.files = {
+            'full_jsonl': open(output_path / 'synchrony_data.jsonl', 'w'),
+            'mvp_jsonl': open(output_path / 'synchrony_mvp_data.jsonl', 'w'),
+        }
+        self.full_csv = self.mvp_csv = None
+        if write_csv:
+            self.files['full_csv'] = open(output_path / 'synchrony_data.csv', 'w', newline='')
+            self.files['mvp_csv'] = open(output_path / 'synchrony_mvp_data.csv', 'w', newline='')
+            self.full_csv = csv.writer(self.files['full_csv'])
+            self.mvp_csv = csv.writer(self.files['mvp_csv'])
+            self.full_csv.writerow(FULL_CSV_FIELDS)
+            self.mvp_csv.writerow(MVP_CSV_FIELDS)
+
+    def write(self, full_record, mvp_line, mvp_record):
+        full_line = _dumps(full_record)
+        self.files['full_jsonl'].write(full_line + '\n')
+        self.files['mvp_jsonl'].write(mvp_line + '\n')
+        if self.full_csv is not None:
+            self.full_csv.writerow([
+                _dumps(v) if isinstance(v, np.ndarray) else v
+                for v in (full_record[k] for k in FULL_CSV_FIELDS)
+            ])
+            self.mvp_csv.writerow([
+                _dumps(v) if isinstance(v, (np.ndarray, list)) else v
+                for v in (mvp_record.get(k) for k in MVP_CSV_FIELDS)
+            ])
+        return len(full_line) + 1
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def generate_dataset(output_dir, records=1000, sessions=1, sample_rate=100.0, window_size=100,
+                     malformed_rate=0.0, malformed_kinds=DEFAULT_MALFORMED_KINDS,
+                     target_bytes=None, write_csv=True, seed=0):
+    """Write a synthetic dataset and return its metadata"""
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    if target_bytes:
+        records = sys.maxsize
+    records_per_session = math.ceil(records / sessions) if records != sys.maxsize else sys.maxsize
+    window_sec = window_size / sample_rate
+    start_time = datetime(2025, 9, 1, 8, 0, tzinfo=timezone.utc)
+
+    writer = DatasetWriter(output_path, write_csv)
+    session_info = []
+    malformed = {kind: 0 for kind in malformed_kinds}
+    record_id = 0
+    full_bytes = 0
+
+    try:
+        for s in range(sessions):
+            session_id = str(uuid.UUID(bytes=rng.bytes(16), version=4)).upper()
+            gait_hz = float(rng.uniform(1.2, 2.5))
+            heading = float(rng.uniform(0, 2 * math.pi))
+            lag_samples = int(rng.integers(0, int(0.3 * sample_rate)))
+            session_start = start_time + timedelta(hours=s)
+            written = 0
+
+            while written < records_per_session and record_id < records:
+                if target_bytes and full_bytes >= target_bytes * (s + 1) / sessions:
+                    break
+                n = min(BLOCK_RECORDS, records_per_session - written, records - record_id)
+                start_sample = written * window_size
+                dog = imu_block(rng, start_sample, n, window_size, sample_rate, gait_hz, heading)
+                handler = imu_block(rng, start_sample, n, window_size, sample_rate, gait_hz,
+                                    heading + 0.4, lag_samples)
+                scores = synchrony_scores(dog, handler)
+                corrupt = rng.random(n) < malformed_rate if malformed_kinds else np.zeros(n, bool)
+
+                for i in range(n):
+                    timestamp = (session_start + timedelta(seconds=(written + i) * window_sec))
+                    timestamp = timestamp.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+                    full_record = {
+                        'id': record_id,
+                        'session_id': session_id,
+                        'timestamp': timestamp,
+                        'sample_rate_hz': sample_rate,
+                        'synchrony_score': float(scores[i]),
+                        'lag_ms': round(lag_samples * 1000 / sample_rate, 1),
+                        'activity': ACTIVITIES[int(gait_hz * 2) % len(ACTIVITIES)],
+                        'imu_data': dog[i],
+                        'handler_imu_data': handler[i],
+                    }
+                    mvp_record = {
+                        'id': record_id,
+                        'session_id': session_id,
+                        'timestamp': timestamp,
+                        'synchrony_score': float(scores[i]),
+                        'imu_data': dog[i],
+                    }
+                    if corrupt[i]:
+                        kind = malformed_kinds[int(rng.integers(len(malformed_kinds)))]
+                        malformed[kind] += 1
+                        mvp_line = malformed_record(rng, mvp_record, kind)
+                    else:
+                        mvp_line = _dumps(mvp_record)
+                    full_bytes += writer.write(full_record, mvp_line, mvp_record)
+                    record_id += 1
+
+                written += n
+
+            session_info.append({
+                'session_id': session_id,
+                'records': written,
+                'start_time': session_start.isoformat().replace('+00:00', 'Z'),
+                'gait_hz': round(gait_hz, 3),
+                'lag_ms': round(lag_samples * 1000 / sample_rate, 1),
+            })
+    finally:
+        writer.close()
+
+    metadata = {
+        'generator': 'generate_synthetic_dataset.py',
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'seed': seed,
+        'total_records': record_id,
+        'sample_rate_hz': sample_rate,
+        'window_size': window_size,
+        'channels': CHANNELS,
+        'sessions': session_info,
+        'malformed_rate': malformed_rate,
+        'malformed_rows': malformed,
+    }
+    with open(output_path / 'session_metadata.json', 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    return metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic iOS synchrony dataset")
+    parser.add_argument("output_dir", help="Directory to write the dataset into")
+    parser.add_argument("--records", type=int, default=1000, help="Total records/windows (default: 1000)")
+    parser.add_argument("--sessions", type=int, default=1, help="Number of sessions (default: 1)")
+    parser.add_argument("--target-size", type=parse_size,
+                        help="Stop once synchrony_data.jsonl reaches this size (e.g. 2G); overrides --records")
+    parser.add_argument("--sample-rate", type=float, default=100.0, help="IMU sample rate in Hz (default: 100)")
+    parser.add_argument("--window-size", type=int, default=100, help="Samples per record (default: 100)")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="Fraction of MVP rows to corrupt (default: 0)")
+    parser.add_argument("--malformed-kinds", default=",".join(DEFAULT_MALFORMED_KINDS),
+                        help=f"Comma separated corruption kinds from: {', '.join(MALFORMED_KINDS)}")
+    parser.add_argument("--no-csv", action="store_true", help="Skip the CSV exports")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+
+    kinds = tuple(k.strip() for k in args.malformed_kinds.split(",") if k.strip())
+    unknown = set(kinds) - set(MALFORMED_KINDS)
+    if unknown:
+        parser.error(f"unknown malformed kinds: {sorted(unknown)}")
+
+    print(f"🧬 Generating synthetic synchrony dataset in {args.output_dir}")
+    started = datetime.now()
+    metadata = generate_dataset(
+        args.output_dir,
+        records=args.records,
+        sessions=args.sessions,
+        sample_rate=args.sample_rate,
+        window_size=args.window_size,
+        malformed_rate=args.malformed_rate,
+        malformed_kinds=kinds,
+        target_bytes=args.target_size,
+        write_csv=not args.no_csv,
+        seed=args.seed,
+    )
+    elapsed = (datetime.now() - started).total_seconds()
+
+    size = (Path(args.output_dir) / 'synchrony_data.jsonl').stat().st_size
+    print(f"✅ {metadata['total_records']:,} records across {len(metadata['sessions'])} sessions "
+          f"in {elapsed:.1f}s ({size / (1 << 20):.1f} MB full JSONL)")
+    if any(metadata['malformed_rows'].values()):
+        print(f"⚠️  Malformed MVP rows: {metadata['malformed_rows']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+JSONL Line-Offset Index
+Random access into large synchrony JSONL exports through a sidecar
+<file>.idx of record byte offsets and an mmap of the data file.
+
+The index is built in one vectorized newline scan and reused while the
+file is unchanged. When the exporter has only appended, the existing
+offsets are kept and just the new bytes are scanned; any other change
+(truncation, rewritten prefix) triggers a full rebuild.
+
+Index layout (little endian):
+  header   magic, record count, indexed bytes, file size and mtime at
+           indexing, sha256 of the file head and of the bytes just before
+           the indexed end (append detection)
+  offsets  uint64 start offset of every record, memory-mapped on open
+
+Only newline-terminated records are indexed; a trailing partial line is
+left out until the exporter finishes it. Blank lines are skipped.
+
+    with IndexedJsonl(path) as data:
+        data[len(data) // 2]                # O(1) record access
+        data.sample(100, seed=0)            # uniform random sample
+        data.tail(5)
+        map_chunks(path, count_records)     # parallel, split on records
+"""
+
+import hashlib
+import mmap
+import os
+import random
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from synchrony_io import parse_record
+
+INDEX_SUFFIX = '.idx'
+MAGIC = b'JSONLIX1'
+# magic, records, indexed bytes, file size, mtime_ns, head sha256, tail sha256
+HEADER = struct.Struct('<8sQQQq32s32s')
+# Bytes hashed at the head and before the indexed end to detect rewrites
+FINGERPRINT_BYTES = 1 << 16
+# Line-leading bytes that may begin a blank line (bytes.strip whitespace)
+WHITESPACE = np.frombuffer(b' \t\r\x0b\x0c', dtype=np.uint8)
+# Bytes scanned for newlines per step while building
+SCAN_CHUNK = 64 << 20
+
+
+def index_path(path):
+    """The .idx file kept next to a JSONL file"""
+    path = Path(path)
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def _digest(view, start, end):
+    return hashlib.sha256(view[max(0, start):end]).digest()
+
+
+def _fingerprints(view, indexed_end):
+    head = _digest(view, 0, min(indexed_end, FINGERPRINT_BYTES))
+    tail = _digest(view, indexed_end - FINGERPRINT_BYTES, indexed_end)
+    return head, tail
+
+
+def scan_offsets(view, start=0):
+    """Start offsets of the complete, non-blank lines in view[start:] and the end of the last one"""
+    size = len(view)
+    parts = []
+    line_start = start
+    for pos in range(start, size, SCAN_CHUNK):
+        chunk = np.frombuffer(view, dtype=np.uint8, count=min(SCAN_CHUNK, size - pos), offset=pos)
+        newlines = np.flatnonzero(chunk == 10) + pos
+        if not len(newlines):
+            continue
+        starts = np.empty(len(newlines), dtype=np.uint64)
+        starts[0] = line_start
+        starts[1:] = newlines[:-1] + 1
+        lengths = newlines - starts.astype(np.int64)
+        keep = lengths > 0
+        # A whitespace-only line starts with whitespace; check just those by hand
+        first = chunk[np.maximum(starts.astype(np.int64) - pos, 0)]
+        first[0] = view[int(starts[0])]  # may lie in the previous chunk
+        for i in np.flatnonzero(keep & np.isin(first, WHITESPACE)):
+            if not bytes(view[int(starts[i]):int(newlines[i])]).strip():
+                keep[i] = False
+        parts.append(starts[keep])
+        line_start = int(newlines[-1]) + 1
+    offsets = np.concatenate(parts) if parts else np.empty(0, dtype=np.uint64)
+    return offsets, line_start if parts else start
+
+
+def _read_index(idx_file):
+    """(header fields, offsets memmap) of an existing index, or None if unreadable"""
+    try:
+        with open(idx_file, 'rb') as f:
+            header = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return None
+    magic, count = header[0], header[1]
+    if magic != MAGIC:
+        return None
+    if not count:
+        return header, np.empty(0, dtype=np.uint64)
+    try:
+        offsets = np.memmap(idx_file, dtype='<u8', mode='r', offset=HEADER.size, shape=(count,))
+    except (OSError, ValueError):
+        return None
+    return header, offsets
+
+
+def _write_index(idx_file, offsets, indexed_end, stat, fingerprints):
+    """Atomically write the index; returns False if the directory is read-only"""
+    tmp_file = idx_file.with_name(idx_file.name + '.tmp')
+    try:
+        with open(tmp_file, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(offsets), indexed_end, stat.st_size, stat.st_mtime_ns, *fingerprints))
+            f.write(np.ascontiguousarray(offsets, dtype='<u8').tobytes())
+        tmp_file.replace(idx_file)
+    except OSError:
+        return False
+    return True
+
+
+def load_or_build_index(path, view, rebuild=False):
+    """Record offsets for path (whose bytes are `view`) and the indexed end.
+
+    Reuses <path>.idx when the file is unchanged, extends it after appends
+    and rebuilds it otherwise. The index is only kept in memory when it
+    cannot be written next to the data file.
+    """
+    path = Path(path)
+    idx_file = index_path(path)
+    stat = path.stat()
+    existing = None if rebuild else _read_index(idx_file)
+
+    if existing is not None:
+        (_, _, indexed_end, size, mtime_ns, head, tail), offsets = existing
+        if size == stat.st_size and mtime_ns == stat.st_mtime_ns and indexed_end <= len(view):
+            return offsets, indexed_end
+        if indexed_end <= len(view) and _fingerprints(view, indexed_end) == (head, tail):
+            # Appended since the last run: scan only the new bytes
+            new_offsets, new_end = scan_offsets(view, indexed_end)
+            offsets = np.concatenate([np.asarray(offsets), new_offsets])
+            _write_index(idx_file, offsets, new_end, stat, _fingerprints(view, new_end))
+            return offsets, new_end
+
+    offsets, indexed_end = scan_offsets(view)
+    _write_index(idx_file, offsets, indexed_end, stat, _fingerprints(view, indexed_end))
+    return offsets, indexed_end
+
+
+class IndexedJsonl:
+    """Sequence-like, memory-mapped view of a JSONL file's records"""
+
+    def __init__(self, path, fields=None, rebuild=False):
+        self.path = Path(path)
+        self.fields = fields
+        self._file = open(self.path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        # mmap cannot map an empty file
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.offsets, self.end = load_or_build_index(self.path, self._mm, rebuild)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _position(self, i):
+        n = len(self.offsets)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(f"record {i} out of range for {n} records")
+        return i
+
+    def raw(self, i):
+        """Bytes of record i (without the newline)"""
+        start = int(self.offsets[self._position(i)])
+        return self._mm[start:self._mm.find(b'\n', start)]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return parse_record(self.raw(i), self.fields)
+
+    def records(self, start=0, stop=None):
+        """Yield the records in [start, stop) in file order"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        for i in range(start, stop):
+            yield self[i]
+
+    def byte_range(self, start, stop):
+        """Bytes [first, last) spanned by records [start, stop)"""
+        first = int(self.offsets[start]) if start < len(self) else self.end
+        last = int(self.offsets[stop]) if stop < len(self) else self.end
+        return first, last
+
+    def locate(self, offset):
+        """Index of the first record starting at or after a byte offset"""
+        return int(np.searchsorted(self.offsets, offset))
+
+    def sample(self, k, seed=None):
+        """k distinct records drawn uniformly at random, as (index, record) in file order"""
+        picks = sorted(random.Random(seed).sample(range(len(self)), min(k, len(self))))
+        return [(i, self[i]) for i in picks]
+
+    def tail(self, n=5):
+        """The last n records as (index, record)"""
+        first = max(0, len(self) - n)
+        return [(i, self[i]) for i in range(first, len(self))]
+
+    def chunks(self, count, start=0):
+        """Split records [start, len) into up to `count` (start, stop) ranges of about equal bytes"""
+        total = len(self)
+        if start >= total:
+            return []
+        first, last = self.byte_range(start, total)
+        targets = first + (last - first) * np.arange(1, count) / count
+        bounds = np.searchsorted(self.offsets, targets.astype(np.uint64))
+        edges = np.unique(np.concatenate([[start], np.clip(bounds, start, total), [total]]))
+        return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:])]
+
+
+def _run_chunk(path, fields, start, stop, func):
+    with IndexedJsonl(path, fields) as data:
+        return func(data.records(start, stop))
+
+
+def map_chunks(path, func, workers=None, fields=None, start=0):
+    """Apply func(records iterator) to record-aligned chunks of path in parallel.
+
+    The index is built (or refreshed) once up front; each worker process maps
+    the file itself and parses only its own byte range. Returns the results
+    in file order. func must be a picklable top-level function.
+    """
+    workers = workers or os.cpu_count() or 1
+    with IndexedJsonl(path, fields) as data:
+        ranges = data.chunks(workers, start)
+    if workers == 1 or len(ranges) <= 1:
+        return [_run_chunk(path, fields, a, b, func) for a, b in ranges]
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(_run_chunk, path, fields, a, b, func) for a, b in ranges]
+        return [future.result() for future in futures]
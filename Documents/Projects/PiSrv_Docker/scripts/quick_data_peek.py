@@ -1,33 +1,63 @@
 #!/usr/bin/env python3
 """
 Quick Data Peek - Fast preview of synchrony dataset files
+
+JSONL files are previewed from the head by default. --tail, --sample and
+--at read records anywhere in the file through a line-offset index
+(<file>.idx, see jsonl_index.py), built on first use and reused while the
+file is unchanged.
 """
 
+import argparse
 import json
 import csv
+from itertools import islice
 from pathlib import Path
-import sys
+from jsonl_index import IndexedJsonl
+from synchrony_io import iter_jsonl
+
+def print_record(label, record):
+    """Print one record with long values truncated"""
+    print(f"{label}:")
+    if isinstance(record, dict):
+        for key, value in record.items():
+            # Truncate long values
+            str_value = str(value)[:100] + "..." if len(str(value)) > 100 else str(value)
+            print(f"  {key}: {str_value}")
+    else:
+        print(f"  {record}")
+    print()
 
-def peek_jsonl(file_path, num_records=3):
-    """Quick peek at JSONL file structure"""
+def peek_jsonl(file_path, num_records=3, tail=None, sample=None, at=None, seed=None):
+    """Quick peek at JSONL file structure
+    
+    By default shows the first num_records records. tail, sample (uniform
+    random) and at (record numbers, negative counts from the end) use the
+    offset index instead, so any part of a multi-GB file is read in O(1).
+    """
     print(f"\n📄 {file_path.name}")
     print("-" * 40)
     
     try:
-        with open(file_path, 'r') as f:
-            for i, line in enumerate(f):
-                if i >= num_records:
-                    break
-                record = json.loads(line.strip())
-                print(f"Record {i+1}:")
-                if isinstance(record, dict):
-                    for key, value in record.items():
-                        # Truncate long values
-                        str_value = str(value)[:100] + "..." if len(str(value)) > 100 else str(value)
-                        print(f"  {key}: {str_value}")
-                else:
-                    print(f"  {record}")
-                print()
+        if tail is None and sample is None and at is None:
+            for i, record in enumerate(islice(iter_jsonl(file_path), num_records)):
+                print_record(f"Record {i+1}", record)
+            return
+        
+        with IndexedJsonl(file_path) as data:
+            print(f"🗂️  {len(data):,} records indexed ({data.end:,} bytes)")
+            print()
+            if at is not None:
+                picks = [(i % len(data), data[i]) if -len(data) <= i < len(data) else (i, None) for i in at]
+            elif sample is not None:
+                picks = data.sample(sample, seed=seed)
+            else:
+                picks = data.tail(tail)
+            for i, record in picks:
+                if record is None:
+                    print(f"❌ Record {i+1} out of range")
+                    continue
+                print_record(f"Record {i+1}", record)
     except Exception as e:
         print(f"❌ Error reading {file_path.name}: {e}")
 
@@ -67,7 +97,7 @@ def peek_metadata(file_path):
     except Exception as e:
         print(f"❌ Error reading {file_path.name}: {e}")
 
-def main(data_dir):
+def main(data_dir, num_records=3, tail=None, sample=None, at=None, seed=None):
     """Main peek function"""
     data_path = Path(data_dir)
     
@@ -96,14 +126,28 @@ def main(data_dir):
     
     for filename, peek_func in file_map.items():
         file_path = data_path / filename
-        if file_path.exists():
-            peek_func(file_path)
-        else:
+        if not file_path.exists():
             print(f"\n❌ File not found: {filename}")
+        elif peek_func is peek_jsonl:
+            peek_jsonl(file_path, num_records, tail=tail, sample=sample, at=at, seed=seed)
+        elif peek_func is peek_csv:
+            peek_csv(file_path, num_records)
+        else:
+            peek_func(file_path)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python quick_data_peek.py <data_directory>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Quick preview of a synchrony dataset")
+    parser.add_argument("data_dir", help="Directory containing the synchrony exports")
+    parser.add_argument("--records", type=int, default=3, help="Records shown from the head (default: 3)")
+    view = parser.add_mutually_exclusive_group()
+    view.add_argument("--tail", type=int, metavar="N", help="Show the last N JSONL records")
+    view.add_argument("--sample", type=int, metavar="N", help="Show N JSONL records drawn uniformly at random")
+    view.add_argument("--at", type=int, nargs="+", metavar="I",
+                      help="Show JSONL records by number (1-based; negative counts from the end)")
+    parser.add_argument("--seed", type=int, help="Random seed for --sample")
+    args = parser.parse_args()
     
-    main(sys.argv[1])
\ No newline at end of file
+    if args.at and 0 in args.at:
+        parser.error("--at record numbers start at 1")
+    at = [i - 1 if i > 0 else i for i in args.at] if args.at else None
+    main(args.data_dir, args.records, tail=args.tail, sample=args.sample, at=at, seed=args.seed)
\ No newline at end of file
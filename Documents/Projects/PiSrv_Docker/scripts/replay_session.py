@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Replay a Converted Session Against the Inference Sidecar
+Rebuilds the continuous IMU stream from convert_for_pisrv.py output, cuts
+overlapping 100x9 windows (hop from model_config.json) and sends each one to
+/infer as soon as it would be complete on a live collar, at 1x, Nx or max
+speed with a bounded number of requests in flight.
+
+End-to-end lag is measured from the moment a window is ready (its last
+sample arrived) to the moment its result is back. A lag that keeps growing
+over the replay means the sidecar cannot sustain that sample rate.
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import requests
+
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+import imu_codec
+
+MODEL_CONFIG = REPO_ROOT / "appdata" / "models" / "tcn_vae" / "model_config.json"
+
+# Lag growth (seconds per second of replay) above which a run is not sustainable
+SUSTAINABLE_SLOPE = 0.01
+
+
+def load_model_config(path=MODEL_CONFIG):
+    """Window length and overlap from model_config.json, with safe defaults"""
+    try:
+        with open(path, 'r') as f:
+            config = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        config = {}
+    return config.get('sequence_length', 100), config.get('window_overlap', 0.5)
+
+
+def load_session_stream(converted_dir):
+    """Concatenate the converted infer windows back into one (n, 9) stream"""
+    with open(Path(converted_dir) / 'infer_requests.json', 'r') as f:
+        requests_data = json.load(f)
+    # convert_for_pisrv.py --codec stores "x_encoded" frames instead of "x"
+    windows = [imu_codec.windows_from_request(r) for r in requests_data]
+    windows = [w for w in windows if w.size]
+    if not windows:
+        raise ValueError(f"No IMU windows in {converted_dir}/infer_requests.json")
+    return np.concatenate(windows)
+
+
+def cut_windows(stream, window_size, overlap):
+    """Overlapping windows as a zero-copy view of shape (n_windows, window_size, 9)"""
+    hop = max(1, int(round(window_size * (1 - overlap))))
+    view = np.lib.stride_tricks.sliding_window_view(stream, window_size, axis=0)[::hop]
+    return view.transpose(0, 2, 1), hop
+
+
+class SessionReplay:
+    """Streams windows to the sidecar on the schedule of a live collar"""
+
+    def __init__(self, endpoint, windows, hop, sample_rate, speed, max_in_flight, timeout=30):
+        self.endpoint = endpoint
+        self.windows = windows
+        self.hop = hop
+        self.sample_rate = sample_rate
+        self.speed = speed
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._results = []
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers['Content-Type'] = 'application/json'
+            self._local.session = session
+        return session
+
+    def _ready_offset(self, index):
+        """Seconds after replay start at which window `index` is complete"""
+        if self.speed is None:
+            return 0.0
+        last_sample = index * self.hop + self.windows.shape[1]
+        return last_sample / (self.sample_rate * self.speed)
+
+    def _send(self, index, ready_at, start):
+        error = None
+        try:
+            body = json.dumps({'x': self.windows[index].tolist()})
+            response = self._session().post(self.endpoint, data=body, timeout=self.timeout)
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}"
+        except requests.RequestException as e:
+            error = type(e).__name__
+        finally:
+            self._slots.release()
+        done = time.perf_counter()
+        with self._lock:
+            self._results.append((index, ready_at - start, done - ready_at, error))
+
+    def run(self):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            for index in range(len(self.windows)):
+                ready_at = start + self._ready_offset(index)
+                delay = ready_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                # Blocks when max_in_flight requests are outstanding; the wait
+                # counts towards lag just like a backed-up collar buffer would
+                self._slots.acquire()
+                pool.submit(self._send, index, ready_at, start)
+        elapsed = time.perf_counter() - start
+        return self.summarize(elapsed)
+
+    def summarize(self, elapsed, bucket_sec=1.0):
+        results = sorted(self._results)
+        ok = [(ready, lag) for _, ready, lag, error in results if error is None]
+        errors = {}
+        for *_, error in results:
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+
+        summary = {
+            'speed': f"{self.speed:g}x" if self.speed else 'max',
+            'offered_sample_rate_hz': self.sample_rate * self.speed if self.speed else None,
+            'windows_sent': len(results),
+            'windows_ok': len(ok),
+            'errors': errors,
+            'elapsed_sec': round(elapsed, 3),
+            'achieved_windows_per_sec': round(len(ok) / elapsed, 2) if elapsed > 0 else 0,
+            'achieved_sample_rate_hz': round(len(ok) * self.hop / elapsed, 1) if elapsed > 0 else 0,
+        }
+        if not ok:
+            return summary
+
+        ready = np.array([r for r, _ in ok])
+        lag = np.array([l for _, l in ok])
+        slope = float(np.polyfit(ready, lag, 1)[0]) if len(ok) > 1 and np.ptp(ready) > 0 else 0.0
+        summary['lag_ms'] = {
+            'p50': round(float(np.percentile(lag, 50)) * 1000, 2),
+            'p95': round(float(np.percentile(lag, 95)) * 1000, 2),
+            'p99': round(float(np.percentile(lag, 99)) * 1000, 2),
+            'max': round(float(lag.max()) * 1000, 2),
+        }
+        summary['lag_growth_sec_per_sec'] = round(slope, 5)
+        summary['sustainable'] = (slope < SUSTAINABLE_SLOPE and not errors) if self.speed else None
+
+        buckets = (ready // bucket_sec).astype(int)
+        summary['lag_over_time'] = [
+            {
+                't_sec': int(b * bucket_sec),
+                'windows': int((buckets == b).sum()),
+                'mean_lag_ms': round(float(lag[buckets == b].mean()) * 1000, 2),
+                'max_lag_ms': round(float(lag[buckets == b].max()) * 1000, 2),
+            }
+            for b in np.unique(buckets)
+        ]
+        return summary
+
+
+def parse_speed(text):
+    """'1x', '10', 'max' -> float multiplier or None for max speed"""
+    text = text.strip().lower()
+    if text == 'max':
+        return None
+    return float(text.rstrip('x'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a converted session against the sidecar /infer endpoint")
+    parser.add_argument("base_url", help="Sidecar base URL (e.g. http://localhost:9000), or 'stub'")
+    parser.add_argument("converted_dir", help="Output directory of convert_for_pisrv.py")
+    parser.add_argument("--endpoint", default="/infer", help="Inference path (default: /infer)")
+    parser.add_argument("--sample-rate", type=float, default=100.0, help="Collar IMU sample rate in Hz (default: 100)")
+    parser.add_argument("--speed", default="1x",
+                        help="Comma separated replay speeds, e.g. 1x,10x,max (default: 1x)")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="Outstanding requests allowed (default: 4)")
+    parser.add_argument("--max-windows", type=int, help="Only replay the first N windows")
+    parser.add_argument("--output", help="Write the JSON report here (default: <converted_dir>/replay_results.json)")
+    args = parser.parse_args()
+
+    window_size, overlap = load_model_config()
+    windows, hop = cut_windows(load_session_stream(args.converted_dir), window_size, overlap)
+    if args.max_windows:
+        windows = windows[:args.max_windows]
+
+    stub = None
+    base_url = args.base_url.rstrip('/')
+    if base_url == 'stub':
+        from sidecar_stub import start_stub_server
+        stub, base_url = start_stub_server()
+
+    print(f"🎬 Replaying {len(windows)} windows ({window_size} samples, hop {hop}) to {base_url}{args.endpoint}")
+    runs = []
+    try:
+        for speed in (parse_speed(s) for s in args.speed.split(',')):
+            replay = SessionReplay(f"{base_url}{args.endpoint}", windows, hop,
+                                   args.sample_rate, speed, args.max_in_flight)
+            summary = replay.run()
+            runs.append(summary)
+            lag = summary.get('lag_ms', {})
+            verdict = {True: '✅ sustainable', False: '❌ falling behind'}.get(summary.get('sustainable'), '')
+            print(f"  {summary['speed']:>5}: {summary['windows_ok']}/{summary['windows_sent']} ok, "
+                  f"{summary['achieved_sample_rate_hz']} samples/s, lag p50={lag.get('p50')}ms "
+                  f"p99={lag.get('p99')}ms growth={summary.get('lag_growth_sec_per_sec')}s/s {verdict}")
+    finally:
+        if stub:
+            stub.shutdown()
+
+    output = Path(args.output) if args.output else Path(args.converted_dir) / 'replay_results.json'
+    with open(output, 'w') as f:
+        json.dump({'base_url': base_url, 'endpoint': args.endpoint, 'window_size': window_size,
+                   'hop': hop, 'sample_rate_hz': args.sample_rate, 'runs': runs}, f, indent=2)
+    print(f"💾 Replay report saved: {output}")
+
+
+if __name__ == "__main__":
+    main()
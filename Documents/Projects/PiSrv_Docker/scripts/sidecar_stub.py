@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Local PiSrv / Hailo sidecar stub
+Serves the endpoints used by the integration and load tests so they can run
+offline. Responses mirror the mock sidecar (64-dim latent, 12 motif scores).
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENT_DIM = 64
+NUM_MOTIFS = 12
+
+INFER_PATHS = ('/infer', '/api/v1/analysis/infer')
+# Binary IMU codec bodies (imu_codec.py); only the frame magic is checked
+CODEC_CONTENT_TYPE = 'application/x-imu-codec'
+CODEC_MAGIC = b'IMUC'
+
+
+def _infer_response():
+    return {
+        'latent': [0.0] * LATENT_DIM,
+        'motif_scores': [0.5] * NUM_MOTIFS
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Keep-alive HTTP/1.1 handler for the stubbed endpoints"""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/healthz':
+            self._send_json(200, {'status': 'OK'})
+        elif self.path.startswith('/api/v1/analysis/motifs'):
+            motifs = [{'id': f'm{i}', 'score': 0.5} for i in range(NUM_MOTIFS)]
+            self._send_json(200, {'motifs': motifs})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        if self.path not in INFER_PATHS:
+            self._send_json(404, {'error': 'not found'})
+            return
+        if self.headers.get('Content-Type', '').split(';')[0].strip() == CODEC_CONTENT_TYPE:
+            if not body.startswith(CODEC_MAGIC):
+                self._send_json(422, {'error': 'not an IMU codec frame'})
+                return
+        else:
+            try:
+                request = json.loads(body)
+            except ValueError:
+                self._send_json(400, {'error': 'invalid JSON'})
+                return
+            if not isinstance(request, dict) or not (isinstance(request.get('x'), list)
+                                                     or isinstance(request.get('x_encoded'), str)):
+                self._send_json(422, {'error': "missing 'x'"})
+                return
+
+        if self.server.latency_s:
+            time.sleep(self.server.latency_s)
+        self._send_json(200, _infer_response())
+
+
+def start_stub_server(host='127.0.0.1', port=0, latency_ms=0.0):
+    """Start the stub in a daemon thread and return (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.latency_s = latency_ms / 1000.0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    return server, base_url
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 9000
+    server, base_url = start_stub_server('0.0.0.0', port)
+    print(f"🧪 Sidecar stub listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
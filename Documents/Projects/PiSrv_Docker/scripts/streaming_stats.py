@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Streaming Statistics Engine
+Single-pass, constant-memory field statistics for synchrony records.
+
+Records are consumed in chunks. Each field keeps fixed-size accumulators:
+  - count/mean/std via Welford (merged per chunk with Chan's formula)
+  - min/max and null counts
+  - approximate median via a merging t-digest
+  - approximate unique count via HyperLogLog
+so memory does not grow with the number of records.
+"""
+
+import math
+from itertools import islice
+
+import numpy as np
+
+MASK64 = (1 << 64) - 1
+
+
+class RunningMoments:
+    """Count, mean, variance, min and max over batches of values"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1, same as pandas)"""
+        if self.count < 2:
+            return None
+        return math.sqrt(self.m2 / (self.count - 1))
+
+
+class TDigest:
+    """Merging t-digest for approximate quantiles"""
+
+    def __init__(self, compression=100, buffer_size=5000):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+        self._buffer = []
+        self._buffered = 0
+
+    def update(self, values):
+        if len(values) == 0:
+            return
+        self._buffer.append(np.asarray(values, dtype=np.float64))
+        self._buffered += len(values)
+        if self._buffered >= self.buffer_size:
+            self._compress()
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        means = np.concatenate([self._means] + self._buffer)
+        weights = np.concatenate([self._weights] + [np.ones(len(b)) for b in self._buffer])
+        self._buffer = []
+        self._buffered = 0
+
+        order = np.argsort(means, kind='mergesort')
+        means = means[order]
+        weights = weights[order]
+
+        # Group neighbours that fall into the same unit of the k1 scale
+        # function, which keeps centroids small near the tails
+        total = weights.sum()
+        q_left = (np.cumsum(weights) - weights) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * q_left - 1)
+        bucket = np.floor(k)
+        starts = np.r_[0, np.flatnonzero(np.diff(bucket)) + 1]
+
+        self._weights = np.add.reduceat(weights, starts)
+        self._means = np.add.reduceat(means * weights, starts) / self._weights
+
+    def quantile(self, q):
+        self._compress()
+        if len(self._means) == 0:
+            return None
+        if len(self._means) == 1:
+            return float(self._means[0])
+        centers = np.cumsum(self._weights) - self._weights / 2
+        return float(np.interp(q * self._weights.sum(), centers, self._means))
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter over hashable values"""
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values):
+        if not values:
+            return
+        hashes = np.fromiter((hash(v) & MASK64 for v in values), dtype=np.uint64, count=len(values))
+        hashes = _splitmix64(hashes)
+
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        # Position of the leftmost 1-bit in the remaining 64-p bits
+        bit_length = np.frexp(rest.astype(np.float64))[1]
+        rank = (64 - p) - bit_length + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return float(raw)
+
+
+def _splitmix64(x):
+    """Vectorized splitmix64 finalizer, spreads Python hash() values"""
+    with np.errstate(over='ignore'):
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+def _is_null(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class FieldStats:
+    """Fixed-size accumulators for a single record field"""
+
+    def __init__(self):
+        self.non_null = 0
+        self.non_numeric = 0
+        self.complex = False
+        self.moments = RunningMoments()
+        self.digest = TDigest()
+        self.distinct = HyperLogLog()
+        self.length_total = 0
+
+    def update(self, values):
+        numbers = []
+        hashable = []
+        for value in values:
+            if _is_null(value):
+                continue
+            self.non_null += 1
+            if _is_number(value):
+                numbers.append(value)
+                hashable.append(value)
+                self.length_total += len(str(value))
+            elif isinstance(value, (list, dict)):
+                # Element count instead of len(str(value)), which would
+                # stringify whole nested IMU arrays
+                self.complex = True
+                self.non_numeric += 1
+                self.length_total += len(value)
+            else:
+                self.non_numeric += 1
+                hashable.append(value)
+                self.length_total += len(str(value))
+
+        if numbers:
+            array = np.asarray(numbers, dtype=np.float64)
+            self.moments.update(array)
+            self.digest.update(array)
+        if not self.complex:
+            self.distinct.update(hashable)
+
+    @property
+    def is_numeric(self):
+        return self.non_null > 0 and self.non_numeric == 0
+
+    def numeric_summary(self, record_count):
+        return {
+            'mean': self.moments.mean,
+            'median': self.digest.quantile(0.5),
+            'std': self.moments.std,
+            'min': self.moments.min,
+            'max': self.moments.max,
+            'null_count': record_count - self.non_null
+        }
+
+    def text_summary(self, record_count):
+        summary = {
+            'unique_values': round(self.distinct.estimate()),
+            'null_count': record_count - self.non_null,
+            'avg_length': self.length_total / self.non_null if self.non_null else 0
+        }
+        if self.complex:
+            summary['unique_values'] = 'N/A (complex type)'
+            summary['note'] = 'Contains complex data (dict/list); avg_length counts top-level elements'
+        return summary
+
+
+def compute_statistics(records, chunk_size=10000):
+    """Compute per-field statistics over any iterable of records in one pass"""
+    fields = {}
+    record_count = 0
+    iterator = iter(records)
+
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            break
+        record_count += len(chunk)
+
+        columns = {}
+        for record in chunk:
+            if not isinstance(record, dict):
+                continue
+            for key, value in record.items():
+                columns.setdefault(key, []).append(value)
+
+        for key, values in columns.items():
+            if key not in fields:
+                fields[key] = FieldStats()
+            fields[key].update(values)
+
+    stats = {
+        'record_count': record_count,
+        'numeric_field_stats': {},
+        'text_field_stats': {}
+    }
+    for key, field in fields.items():
+        if field.is_numeric:
+            stats['numeric_field_stats'][key] = field.numeric_summary(record_count)
+        else:
+            stats['text_field_stats'][key] = field.text_summary(record_count)
+
+    return stats
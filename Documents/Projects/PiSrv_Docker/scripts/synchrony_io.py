@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Shared JSONL loader for synchrony dataset scripts
+Reads files in large buffered chunks and parses records with the fastest
+available JSON backend (orjson, then pysimdjson, then the stdlib).
+
+Set SYNCHRONY_JSON_BACKEND=orjson|simdjson|json to force a backend (an
+unknown or uninstalled one is an error).
+"""
+
+import json
+import os
+
+# Bytes read per chunk; records are split on newlines inside each chunk
+CHUNK_SIZE = 4 << 20
+
+
+def _load_orjson():
+    import orjson
+    return orjson.loads
+
+
+def _load_simdjson():
+    import simdjson
+    parser = simdjson.Parser()
+
+    def to_python(value):
+        if hasattr(value, 'as_dict'):
+            return value.as_dict()
+        if hasattr(value, 'as_list'):
+            return value.as_list()
+        return value
+
+    def loads(data, fields=None):
+        doc = parser.parse(data)
+        if fields is None or not hasattr(doc, 'as_dict'):
+            return to_python(doc)
+        # Lazy document: only materialize the projected fields
+        return {key: to_python(doc[key]) for key in fields if key in doc}
+
+    return loads
+
+
+def _load_stdlib():
+    return json.loads
+
+
+_BACKENDS = {
+    'orjson': _load_orjson,
+    'simdjson': _load_simdjson,
+    'json': _load_stdlib,
+}
+
+
+def _select_backend(requested=None):
+    """(name, loads) of the forced backend, else the fastest installed one.
+    
+    A forced backend that is unknown or not installed raises instead of
+    quietly falling back to the stdlib.
+    """
+    if requested:
+        if requested not in _BACKENDS:
+            raise ValueError(f"SYNCHRONY_JSON_BACKEND={requested!r} is not one of {sorted(_BACKENDS)}")
+        return requested, _BACKENDS[requested]()
+    for name in ('orjson', 'simdjson'):
+        try:
+            return name, _BACKENDS[name]()
+        except ImportError:
+            continue
+    return 'json', _load_stdlib()
+
+
+BACKEND, _loads = _select_backend(os.environ.get('SYNCHRONY_JSON_BACKEND'))
+
+
+def parse_record(data, fields=None):
+    """Parse one JSON document, optionally keeping only the given fields"""
+    if BACKEND == 'simdjson':
+        return _loads(data, fields)
+    record = _loads(data)
+    if fields is not None and isinstance(record, dict):
+        return {key: record[key] for key in fields if key in record}
+    return record
+
+
+def iter_jsonl_with_offsets(file_path, fields=None, start=0, hasher=None):
+    """Yield (record, end_offset) for every record from byte offset `start`.
+
+    Blank lines are skipped. A trailing line without a newline is only
+    yielded if it parses, since the exporter may still be writing it.
+    If a hasher is given it is updated with every consumed byte.
+    """
+    offset = start
+    with open(file_path, 'rb', buffering=0) as f:
+        f.seek(start)
+        # Pieces of the unterminated last line; joined once its newline
+        # arrives, so a line spanning many chunks is copied only once
+        pending = []
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            lines = chunk.split(b'\n')
+            if len(lines) == 1:
+                pending.append(chunk)
+                continue
+            if pending:
+                pending.append(lines[0])
+                lines[0] = b''.join(pending)
+            pending = [lines.pop()]
+            for line in lines:
+                offset += len(line) + 1
+                if hasher is not None:
+                    hasher.update(line + b'\n')
+                if line.strip():
+                    yield parse_record(line, fields), offset
+
+        pending = b''.join(pending)
+        if pending.strip():
+            try:
+                record = parse_record(pending, fields)
+            except ValueError:
+                return
+            if hasher is not None:
+                hasher.update(pending)
+            yield record, offset + len(pending)
+
+
+def iter_jsonl(file_path, fields=None, start=0):
+    """Yield records from a JSONL file"""
+    for record, _ in iter_jsonl_with_offsets(file_path, fields, start):
+        yield record
+
+
+def load_jsonl(file_path, fields=None):
+    """Load JSONL file and return list of records"""
+    return list(iter_jsonl(file_path, fields))
@@ -4,13 +4,38 @@ Test PiSrv Integration with iOS Synchrony Data
 Tests converted data against PiSrv inference endpoints
 """
 
+import argparse
 import json
+import math
 import requests
+import threading
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
 from pathlib import Path
 import sys
 from datetime import datetime
 
+# PiSrv's analysis route; the Hailo sidecar serves /infer (--infer-path)
+INFER_PATH = '/api/v1/analysis/infer'
+# Sent instead of JSON float lists with --codec
+CODEC_CONTENT_TYPE = 'application/x-imu-codec'
+
+def _imu_codec():
+    """imu_codec.py from the repo root; imported only when encoded data is used (needs numpy)"""
+    repo_root = str(Path(__file__).resolve().parents[4])
+    if repo_root not in sys.path:
+        sys.path.append(repo_root)
+    import imu_codec
+    return imu_codec
+
+def encode_infer_body(x, codec_options=None):
+    """(body bytes, content type) of an infer request for window x"""
+    if codec_options is None:
+        return json.dumps({'x': x}).encode('utf-8'), 'application/json'
+    return _imu_codec().encode(x, **codec_options), CODEC_CONTENT_TYPE
+
 def test_health_endpoint(base_url):
     """Test PiSrv health endpoint"""
     try:
@@ -65,26 +90,27 @@ def test_motifs_endpoint(base_url, test_data=None):
             'error': str(e)
         }
 
-def test_infer_endpoint(base_url, test_request):
-    """Test /api/v1/analysis/infer endpoint with test data"""
-    endpoint = f"{base_url}/api/v1/analysis/infer"
+def test_infer_endpoint(base_url, test_request, codec_options=None, infer_path=INFER_PATH):
+    """Test the infer endpoint (default /api/v1/analysis/infer) with test data"""
+    endpoint = f"{base_url}{infer_path}"
     
     try:
+        body, content_type = encode_infer_body(test_request['x'], codec_options)
         start_time = time.time()
         response = requests.post(
             endpoint,
-            json=test_request,
-            headers={'Content-Type': 'application/json'},
+            data=body,
+            headers={'Content-Type': content_type},
             timeout=30
         )
         response_time = time.time() - start_time
         
         result = {
-            'endpoint': '/api/v1/analysis/infer',
+            'endpoint': infer_path,
             'status': response.status_code,
             'response_time': response_time,
             'success': response.status_code == 200,
-            'request_size': len(json.dumps(test_request))
+            'request_size': len(body)
         }
         
         if response.status_code == 200:
@@ -111,7 +137,7 @@ def test_infer_endpoint(base_url, test_request):
         
     except Exception as e:
         return {
-            'endpoint': '/api/v1/analysis/infer',
+            'endpoint': infer_path,
             'status': None,
             'response_time': None,
             'success': False,
@@ -129,11 +155,184 @@ def load_test_data(test_data_dir):
     if test_samples_dir.exists():
         for test_file in test_samples_dir.glob("test_request_*.json"):
             with open(test_file, 'r') as f:
-                test_requests.append(json.load(f))
+                test_request = json.load(f)
+            # convert_for_pisrv.py --codec stores windows as imu_codec frames
+            if 'x' not in test_request and 'x_encoded' in test_request:
+                test_request['x'] = _imu_codec().decode_text(test_request.pop('x_encoded')).tolist()
+            test_requests.append(test_request)
     
     return test_requests
 
-def run_comprehensive_tests(base_url, test_data_dir):
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    # ceil(pct/100 * n), multiplied first so 7% of 100 is exactly rank 7
+    rank = math.ceil(pct * len(sorted_values) / 100)
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+class LoadGenerator:
+    """Drives the infer endpoint with concurrent keep-alive clients.
+    
+    Closed-loop mode runs `concurrency` clients back-to-back. Open-loop mode
+    (rps set) issues requests on a fixed schedule regardless of responses and
+    measures latency from the scheduled send time, so queueing shows up in
+    the percentiles instead of silently lowering the request rate.
+    """
+    
+    def __init__(self, base_url, test_requests, concurrency=8, rps=None,
+                 duration=10.0, total_requests=None, timeout=30, codec_options=None, infer_path=INFER_PATH):
+        self.endpoint = f"{base_url}{infer_path}"
+        # Serialize bodies once so client-side encoding is not measured
+        self.bodies = [encode_infer_body(r['x'], codec_options)[0] for r in test_requests]
+        if not self.bodies:
+            raise ValueError("load test needs at least one test request")
+        self.content_type = 'application/json' if codec_options is None else CODEC_CONTENT_TYPE
+        self.concurrency = concurrency
+        self.rps = rps
+        self.duration = duration
+        self.total_requests = total_requests
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._latencies = []
+        self._statuses = Counter()
+        self._errors = Counter()
+    
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['Content-Type'] = self.content_type
+            self._local.session = session
+        return session
+    
+    def _send(self, body, scheduled_at):
+        error = None
+        status = None
+        try:
+            response = self._session().post(self.endpoint, data=body, timeout=self.timeout)
+            status = response.status_code
+            if status != 200:
+                error = f"HTTP {status}"
+        except requests.RequestException as e:
+            error = type(e).__name__
+        latency = time.perf_counter() - scheduled_at
+        
+        with self._lock:
+            if status is not None:
+                self._statuses[status] += 1
+            if error:
+                self._errors[error] += 1
+            else:
+                self._latencies.append(latency)
+    
+    def _run_closed_loop(self, deadline):
+        bodies = cycle(self.bodies)
+        issued = Counter()
+        
+        def client():
+            while time.perf_counter() < deadline:
+                with self._lock:
+                    if self.total_requests is not None and issued['n'] >= self.total_requests:
+                        return
+                    issued['n'] += 1
+                    body = next(bodies)
+                self._send(body, time.perf_counter())
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for _ in range(self.concurrency):
+                pool.submit(client).add_done_callback(self._record_failure)
+    
+    def _run_open_loop(self, start, deadline):
+        interval = 1.0 / self.rps
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for i, body in enumerate(cycle(self.bodies)):
+                if self.total_requests is not None and i >= self.total_requests:
+                    break
+                scheduled_at = start + i * interval
+                if scheduled_at >= deadline:
+                    break
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._send, body, scheduled_at).add_done_callback(self._record_failure)
+    
+    def _record_failure(self, future):
+        """Count a client thread or send that died with an exception as an error"""
+        error = future.exception()
+        if error is not None:
+            with self._lock:
+                self._errors[f"client thread {type(error).__name__}: {error}"] += 1
+    
+    def run(self):
+        """Run the load test and return a summary dict"""
+        duration = self.duration if self.duration else float('inf')
+        start = time.perf_counter()
+        deadline = start + duration
+        if self.rps:
+            self._run_open_loop(start, deadline)
+        else:
+            self._run_closed_loop(deadline)
+        elapsed = time.perf_counter() - start
+        
+        latencies = sorted(self._latencies)
+        failed = sum(self._errors.values())
+        to_ms = lambda v: round(v * 1000, 3) if v is not None else None
+        return {
+            'mode': 'open-loop' if self.rps else 'closed-loop',
+            'concurrency': self.concurrency,
+            'target_rps': self.rps,
+            'content_type': self.content_type,
+            'mean_body_bytes': round(sum(map(len, self.bodies)) / len(self.bodies)) if self.bodies else 0,
+            'elapsed_sec': round(elapsed, 3),
+            'total_requests': len(latencies) + failed,
+            'successful_requests': len(latencies),
+            'failed_requests': failed,
+            'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed > 0 else 0,
+            'latency_ms': {
+                'p50': to_ms(_percentile(latencies, 50)),
+                'p90': to_ms(_percentile(latencies, 90)),
+                'p99': to_ms(_percentile(latencies, 99)),
+                'max': to_ms(latencies[-1] if latencies else None),
+                'mean': to_ms(sum(latencies) / len(latencies) if latencies else None)
+            },
+            'status_codes': {str(k): v for k, v in sorted(self._statuses.items())},
+            'errors': dict(self._errors)
+        }
+
+def run_load_test(base_url, test_requests, **options):
+    """Run a concurrent load test against the infer endpoint"""
+    mode = f"open-loop @ {options['rps']} rps" if options.get('rps') else "closed-loop"
+    print(f"\n🚦 Load test ({mode}, concurrency {options.get('concurrency', 8)})...")
+    summary = LoadGenerator(base_url, test_requests, **options).run()
+    
+    latency = summary['latency_ms']
+    print(f"   Requests: {summary['successful_requests']}/{summary['total_requests']} successful "
+          f"in {summary['elapsed_sec']:.1f}s ({summary['throughput_rps']} req/s)")
+    print(f"   Latency ms: p50={latency['p50']} p90={latency['p90']} "
+          f"p99={latency['p99']} max={latency['max']}")
+    if summary['errors']:
+        print(f"   Errors: {summary['errors']}")
+    
+    return summary
+
+def run_codec_report(test_requests, codec_options):
+    """Size ratio, throughput and reconstruction error of the codec on the test windows"""
+    import numpy as np
+    
+    print("\n📦 IMU codec report...")
+    report = _imu_codec().report(np.asarray([r['x'] for r in test_requests], dtype=np.float32), **codec_options)
+    print(f"   {report['compression']}, precision {report['precision'] or 'lossless'}: "
+          f"{report['ratio_vs_json']}x smaller than JSON ({report['ratio_vs_raw']}x vs float32)")
+    print(f"   Encode {report['encode_mb_per_s']} MB/s, decode {report['decode_mb_per_s']} MB/s, "
+          f"max error {report['max_abs_error']:.2e}, RMSE {report['rmse']:.2e}")
+    return report
+
+def run_comprehensive_tests(base_url, test_data_dir, load_options=None, codec_options=None, infer_path=INFER_PATH):
     """Run comprehensive test suite"""
     print(f"🧪 Testing PiSrv integration")
     print(f"🌐 Base URL: {base_url}")
@@ -179,8 +378,11 @@ def run_comprehensive_tests(base_url, test_data_dir):
     
     print(f"✅ Loaded {len(test_requests)} test requests")
     
+    if codec_options is not None:
+        test_results['codec'] = run_codec_report(test_requests, codec_options)
+    
     # Test 4: Infer Endpoint
-    print(f"\n🔬 Testing infer endpoint with {len(test_requests)} samples...")
+    print(f"\n🔬 Testing {infer_path} with {len(test_requests)} samples...")
     infer_results = []
     
     for i, test_request in enumerate(test_requests):
@@ -189,7 +391,7 @@ def run_comprehensive_tests(base_url, test_data_dir):
         # Remove metadata from request for API call
         api_request = {'x': test_request['x']}
         
-        result = test_infer_endpoint(base_url, api_request)
+        result = test_infer_endpoint(base_url, api_request, codec_options, infer_path)
         result['sample_id'] = i + 1
         infer_results.append(result)
         
@@ -217,9 +419,15 @@ def run_comprehensive_tests(base_url, test_data_dir):
     success_rate = test_results['tests']['infer']['successful_samples'] / test_results['tests']['infer']['total_samples'] * 100
     print(f"   Success rate: {success_rate:.1f}%")
     
+    # Test 5: Load test (optional)
+    if load_options is not None:
+        test_results['tests']['load'] = run_load_test(base_url, test_requests, codec_options=codec_options,
+                                                      infer_path=infer_path, **load_options)
+    
     return test_results
 
-def main(base_url, test_data_dir):
+def main(base_url, test_data_dir, load_options=None, stub_latency_ms=0.0, codec_options=None,
+         infer_path=INFER_PATH):
     """Main test function"""
     # Ensure test data directory exists
     if not Path(test_data_dir).exists():
@@ -227,8 +435,18 @@ def main(base_url, test_data_dir):
         print("Run convert_for_pisrv.py first to generate test data")
         return
     
+    stub = None
+    if base_url == 'stub':
+        from sidecar_stub import start_stub_server
+        stub, base_url = start_stub_server(latency_ms=stub_latency_ms)
+        print(f"🧪 Using local sidecar stub at {base_url}")
+    
     # Run tests
-    results = run_comprehensive_tests(base_url, test_data_dir)
+    try:
+        results = run_comprehensive_tests(base_url, test_data_dir, load_options, codec_options, infer_path)
+    finally:
+        if stub:
+            stub.shutdown()
     
     # Save results
     results_file = Path(test_data_dir) / "integration_test_results.json"
@@ -239,12 +457,40 @@ def main(base_url, test_data_dir):
     print("🎉 Testing complete!")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python test_pisrv_integration.py <base_url> <test_data_directory>")
-        print("Example: python test_pisrv_integration.py http://localhost:8080 ./pisrv_formatted")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Test PiSrv integration with converted iOS synchrony data",
+        epilog="Example: python test_pisrv_integration.py http://localhost:8080 ./pisrv_formatted --load --concurrency 16"
+    )
+    parser.add_argument("base_url", help="PiSrv base URL, or 'stub' to start a local sidecar stub")
+    parser.add_argument("test_data_dir", help="Output directory of convert_for_pisrv.py")
+    parser.add_argument("--load", action="store_true", help="Run a concurrent load test after the functional tests")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients / in-flight requests (default: 8)")
+    parser.add_argument("--rps", type=float, help="Target request rate; enables open-loop mode")
+    parser.add_argument("--duration", type=float, default=10.0, help="Load test duration in seconds (default: 10)")
+    parser.add_argument("--requests", type=int, dest="total_requests", help="Stop after this many requests")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Simulated inference latency for the stub")
+    parser.add_argument("--infer-path", default=INFER_PATH,
+                        help=f"Infer route (default: {INFER_PATH}; the Hailo sidecar serves /infer)")
+    parser.add_argument("--codec", action="store_true",
+                        help="Send windows as binary IMU codec frames (Content-Type application/x-imu-codec)")
+    parser.add_argument("--codec-precision", type=float,
+                        help="Quantization step for --codec, e.g. 1e-4 (default: lossless float32)")
+    parser.add_argument("--codec-compression", choices=["zstd", "lz4", "zlib", "none"],
+                        help="Compression for --codec (default: best installed)")
+    args = parser.parse_args()
+    
+    load_options = None
+    if args.load:
+        load_options = {
+            'concurrency': args.concurrency,
+            'rps': args.rps,
+            'duration': args.duration,
+            'total_requests': args.total_requests
+        }
     
-    base_url = sys.argv[1].rstrip('/')
-    test_data_dir = sys.argv[2]
+    codec_options = None
+    if args.codec:
+        codec_options = {'precision': args.codec_precision, 'compression': args.codec_compression}
     
-    main(base_url, test_data_dir)
\ No newline at end of file
+    main(args.base_url.rstrip('/'), args.test_data_dir, load_options, args.stub_latency_ms, codec_options,
+         args.infer_path)
\ No newline at end of file
@@ -0,0 +1,63 @@
+import Foundation
+import Vapor
+
+/// `SESSIONS_DIR/.manifest.json`, maintained by `opt/hailo/session_worker.py`
+/// (see `opt/hailo/sessions_manifest.py` for the format).
+struct SessionsManifest: Decodable {
+    struct Entry: Decodable {
+        let files: [String: UInt64]
+        let mtime: Double
+        let status: String
+    }
+
+    let version: Int
+    let sessions: [String: Entry]
+}
+
+/// Serves the sessions manifest so routes don't walk `SESSIONS_DIR` per request.
+///
+/// The parsed manifest is cached until the file's mtime changes. The worker
+/// stamps the manifest with the sessions directory's mtime after each save, so
+/// a directory newer than the manifest (e.g. an upload since the last worker
+/// scan) means the manifest may be incomplete: `current` returns nil and
+/// callers fall back to scanning.
+final class SessionsManifestStore: @unchecked Sendable {
+    static let shared = SessionsManifestStore()
+
+    private let lock = NSLock()
+    private var cached: (path: String, mtime: Date, manifest: SessionsManifest)?
+
+    func current(base: String) -> SessionsManifest? {
+        let fm = FileManager.default
+        let path = (base as NSString).appendingPathComponent(".manifest.json")
+        guard let manifestMtime = (try? fm.attributesOfItem(atPath: path))?[.modificationDate] as? Date,
+              let dirMtime = (try? fm.attributesOfItem(atPath: base))?[.modificationDate] as? Date,
+              dirMtime <= manifestMtime
+        else { return nil }
+
+        lock.lock()
+        defer { lock.unlock() }
+        if let c = cached, c.path == path, c.mtime == manifestMtime {
+            return c.manifest
+        }
+        guard let data = fm.contents(atPath: path),
+              let manifest = try? JSONDecoder().decode(SessionsManifest.self, from: data),
+              manifest.version == 1
+        else { return nil }
+        cached = (path, manifestMtime, manifest)
+        return manifest
+    }
+}
+
+/// Session ids compacted into `SESSIONS_DIR/.archive/index.json` by
+/// `opt/hailo/session_archive.py`. Used by the directory-scan fallbacks so they
+/// list archived sessions the way the manifest does.
+func archivedSessionIDs(base: String) -> [String] {
+    let path = (base as NSString).appendingPathComponent(".archive/index.json")
+    guard let data = FileManager.default.contents(atPath: path),
+          let index = (try? JSONSerialization.jsonObject(with: data)) as? [String: Any],
+          index["version"] as? Int == 1,
+          let sessions = index["sessions"] as? [String: Any]
+    else { return [] }
+    return Array(sessions.keys)
+}
@@ -17,6 +17,7 @@ struct UploadPayload: Content {
 struct SessionSummary: Content {
     let id: String
     let files: [String: UInt64]
+    var status: String? = nil
 }
 
 // MARK: - Routes
@@ -32,15 +33,20 @@ public func routes(_ app: Application) throws {
     // List all session IDs (public)
     app.get("sessions") { req async throws -> [String] in
         let base = Environment.get("SESSIONS_DIR") ?? "/var/app/sessions"
+        if let manifest = SessionsManifestStore.shared.current(base: base) {
+            return manifest.sessions.keys.sorted()
+        }
 
+        // Same listing as the manifest: live session directories plus archived
+        // sessions; worker state (.archive, .latents, .debug) is not a session
         let fm = FileManager.default
         let items = (try? fm.contentsOfDirectory(atPath: base)) ?? []
-        var ids: [String] = []
-        for item in items {
+        var ids = Set(archivedSessionIDs(base: base))
+        for item in items where !item.hasPrefix(".") {
             var isDir: ObjCBool = false
             let path = (base as NSString).appendingPathComponent(item)
             if fm.fileExists(atPath: path, isDirectory: &isDir), isDir.boolValue {
-                ids.append(item)
+                ids.insert(item)
             }
         }
         return ids.sorted()
@@ -50,10 +56,14 @@ public func routes(_ app: Application) throws {
     app.get("sessions", ":id") { req async throws -> SessionSummary in
         let base = Environment.get("SESSIONS_DIR") ?? "/var/app/sessions"
         guard let id = req.parameters.get("id") else { throw Abort(.badRequest) }
+        if let entry = SessionsManifestStore.shared.current(base: base)?.sessions[id] {
+            return SessionSummary(id: id, files: entry.files, status: entry.status)
+        }
         let sdir = URL(fileURLWithPath: base).appendingPathComponent(id, isDirectory: true)
 
         var out: [String: UInt64] = [:]
-        for name in ["video.mp4", "imu.json", "meta.json", "results.json"] {
+        for name in ["video.mp4", "imu.json", "meta.json", "results.json", "imu_latents.npz",
+                     "handler_imu.json", "synchrony.npz"] {
             let p = sdir.appendingPathComponent(name)
             if let attrs = try? FileManager.default.attributesOfItem(atPath: p.path),
                let size = attrs[.size] as? UInt64 {
@@ -64,13 +74,19 @@ public func routes(_ app: Application) throws {
     }
     app.get("admin","retention","candidates") { _ async throws -> [String] in
         let base = Environment.get("SESSIONS_DIR") ?? "/var/app/sessions"
+        let cutoff = Date().addingTimeInterval(-7*24*3600)
+        if let manifest = SessionsManifestStore.shared.current(base: base) {
+            return manifest.sessions
+                .filter { $0.value.status != "archived" && $0.value.mtime < cutoff.timeIntervalSince1970 }
+                .map { $0.key }
+                .sorted()
+        }
         let fm = FileManager.default
         let items = (try? fm.contentsOfDirectory(atPath: base)) ?? []
-        let cutoff = Date().addingTimeInterval(-7*24*3600)
         return items.compactMap { name in
             var isDir: ObjCBool = false
             let p = (base as NSString).appendingPathComponent(name)
-            guard fm.fileExists(atPath: p, isDirectory: &isDir), isDir.boolValue,
+            guard !name.hasPrefix("."), fm.fileExists(atPath: p, isDirectory: &isDir), isDir.boolValue,
                   let attrs = try? fm.attributesOfItem(atPath: p),
                   let mtime = attrs[.modificationDate] as? Date,
                   mtime < cutoff
@@ -86,6 +102,19 @@ public func routes(_ app: Application) throws {
             .appendingPathComponent(id)
             .appendingPathComponent("results.json")
         
+        // Compacted sessions keep a copy of results.json in the archive
+        let archived = URL(fileURLWithPath: base)
+            .appendingPathComponent(".archive/results")
+            .appendingPathComponent("\(id).json")
+        if !FileManager.default.fileExists(atPath: p.path),
+           !id.contains("/"), !id.hasPrefix("."),
+           FileManager.default.fileExists(atPath: archived.path) {
+            let res = Response(status: .ok)
+            res.headers.contentType = .json
+            res.body = .init(data: try Data(contentsOf: archived))
+            return res
+        }
+        
         guard FileManager.default.fileExists(atPath: p.path) else {
             // Enhanced debugging for 202 responses
             let sdir = URL(fileURLWithPath: base).appendingPathComponent(id)
@@ -182,7 +211,8 @@ curl -v http://localhost:8082/sessions
 
 # 5. Get session summary
 curl -v http://localhost:8082/sessions/<SESSION_ID>
-# Expect: JSON with file names and sizes
+# Expect: JSON with file names and sizes (plus "status" once the worker's
+# .manifest.json lists the session)
 
 # 6. Get results.json
 curl -v http://localhost:8082/sessions/<SESSION_ID>/results
@@ -0,0 +1,219 @@
+"""
+On-Demand Profiling
+Stdlib sampling profiler and tracemalloc summaries behind the sidecar's
+/debug/profile and /debug/memory endpoints and the session worker's
+profile triggers (opt/hailo/worker_profiling.py).
+
+Nothing runs until a profile is requested. SamplingProfiler then walks the
+Python stack of every thread (sys._current_frames) every `interval` seconds
+from a daemon thread and counts identical stacks. Results come out as folded
+stacks ("thread;outer;inner count" per line, the input format of
+flamegraph.pl, speedscope and inferno) or as a self-contained SVG flame
+graph.
+
+MemoryTrace starts tracemalloc only if it is not already tracing (e.g. via
+PYTHONTRACEMALLOC) and stops it again after the snapshot, so tracing costs
+nothing outside a requested window. The report lists the top allocation
+sites of memory still held at the end of the window.
+"""
+
+import html
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+import zlib
+from collections import Counter
+
+DEFAULT_INTERVAL = 0.005
+DEFAULT_TOP = 25
+GROUP_BY = ("lineno", "filename", "traceback")
+
+
+def _label(code):
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Periodic stack sampler for all threads of this process except its own"""
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.duration = 0.0
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="debug-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self.duration = time.monotonic() - self.started_at
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(skip=own)
+
+    def sample(self, skip=None):
+        """Record the current stack of every thread but `skip`"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        labels = self._labels
+        for ident, frame in sys._current_frames().items():
+            if ident == skip:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _label(code)
+                stack.append(label)
+                frame = frame.f_back
+            stack.append(f"thread {names.get(ident, ident)}")
+            self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def folded(self):
+        """Folded stacks, one "frame;frame;... count" line per distinct stack"""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def svg(self, title="Sidecar CPU profile"):
+        subtitle = f"{self.samples} samples every {self.interval * 1000:g} ms over {self.duration:.1f} s"
+        return flamegraph_svg(self.stacks, title, subtitle)
+
+
+def profile(seconds, interval=DEFAULT_INTERVAL):
+    """Sample this process for `seconds` (blocking) and return the stopped profiler"""
+    profiler = SamplingProfiler(interval).start()
+    try:
+        time.sleep(seconds)
+    finally:
+        profiler.stop()
+    return profiler
+
+
+def _color(name):
+    # Stable warm colors per frame name, like flamegraph.pl's "hot" palette
+    h = zlib.crc32(name.encode("utf-8"))
+    return f"rgb({205 + h % 50},{(h >> 8) % 180},{(h >> 16) % 55})"
+
+
+def flamegraph_svg(stacks, title="Flame graph", subtitle="", width=1200, row_height=16):
+    """Render {stack tuple: count} as a standalone SVG flame graph (root at the bottom)"""
+    root = {"count": 0, "children": {}}
+    for stack, count in stacks.items():
+        node = root
+        root["count"] += count
+        for frame in stack:
+            node = node["children"].setdefault(frame, {"count": 0, "children": {}})
+            node["count"] += count
+    depth = max((len(stack) for stack in stacks), default=0)
+    top = 40
+    height = top + (depth + 1) * row_height + 10
+    total = root["count"] or 1
+    rects = []
+
+    def layout(name, node, x, level):
+        w = node["count"] / total * width
+        if w < 0.5:
+            return
+        y = height - 10 - (level + 1) * row_height
+        label = html.escape(f"{name} ({node['count']} samples, {node['count'] / total:.1%})")
+        # ~7 px per character at font-size 11; elide names that do not fit
+        fits = int((w - 4) / 7)
+        text = name if len(name) <= fits else (name[:fits - 2] + ".." if fits > 3 else "")
+        rects.append(
+            f'<g><title>{label}</title><rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row_height - 1}" '
+            f'fill="{_color(name)}" rx="2"/><text x="{x + 3:.1f}" y="{y + row_height - 4}">{html.escape(text)}</text></g>'
+        )
+        child_x = x
+        for child_name, child in sorted(node["children"].items()):
+            layout(child_name, child, child_x, level + 1)
+            child_x += child["count"] / total * width
+
+    layout("all", root, 0.0, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<rect width="100%" height="100%" fill="#f8f8f8"/>'
+        f'<text x="{width / 2}" y="18" text-anchor="middle" font-size="15">{html.escape(title)}</text>'
+        f'<text x="{width / 2}" y="34" text-anchor="middle" fill="#666">{html.escape(subtitle)}</text>'
+        + "".join(rects) + "</svg>\n"
+    )
+
+
+class MemoryTrace:
+    """tracemalloc over a window: start(), let the process run, then report()"""
+
+    def __init__(self, frames=1):
+        self.frames = frames
+        self.started = False
+        self.started_at = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.started = True
+        self.started_at = time.monotonic()
+        return self
+
+    def stop(self):
+        if self.started:
+            tracemalloc.stop()
+            self.started = False
+
+    def report(self, top=DEFAULT_TOP, group_by="lineno"):
+        """Top allocation sites of traced memory; stops tracing if start() began it"""
+        started = self.started
+        try:
+            if group_by not in GROUP_BY:
+                raise ValueError(f"group_by must be one of {GROUP_BY}, got {group_by!r}")
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            self.stop()
+        snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        stats = snapshot.statistics(group_by)
+        return {
+            "pid": os.getpid(),
+            "tracing_started": started,
+            "seconds": round(time.monotonic() - self.started_at, 2),
+            "traced_current_bytes": current,
+            "traced_peak_bytes": peak,
+            # ru_maxrss is in KiB on Linux
+            "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            "group_by": group_by,
+            "top": [
+                {
+                    "site": str(stat.traceback) if group_by != "traceback" else stat.traceback.format(),
+                    "size_bytes": stat.size,
+                    "count": stat.count,
+                }
+                for stat in stats[:top]
+            ],
+        }
+
+
+def memory_report(seconds, top=DEFAULT_TOP, group_by="lineno", frames=1):
+    """Trace allocations for `seconds` (blocking) and return the report"""
+    trace = MemoryTrace(frames).start()
+    try:
+        time.sleep(seconds)
+    except BaseException:
+        trace.stop()
+        raise
+    return trace.report(top, group_by)
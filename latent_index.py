@@ -0,0 +1,448 @@
+"""
+Latent Vector Store and Similarity Search
+Stores the per-window TCN-VAE latents of every processed session and answers
+nearest-neighbor queries over them ("windows that look like this one",
+"sessions that look like this one").
+
+Storage (one directory, append-only, read through np.memmap so memory stays
+bounded by the page cache rather than the number of sessions):
+  sessions.json     session names, in insertion order (atomic writes; a
+                    session's rows count once its name is written)
+  vectors.f16       (n, dim) float16 latents
+  rows.i32          (n, 2) int32 [session index, window start sample]
+  ivfpq.npz         IVF-PQ coarse centroids and PQ codebooks, once trained
+  ivfpq_lists.i32   (n,) int32 coarse list of each encoded vector
+  ivfpq_codes.u8    (n, m) uint8 PQ codes of the residual to its centroid
+
+Two indexes share the store:
+  BruteForceIndex   exact L2 search, streamed over the float16 memmap in chunks
+  IVFPQIndex        inverted lists over k-means centroids with product-quantized
+                    residuals; probes nprobe lists with table lookups, then
+                    re-ranks the best candidates against the exact vectors
+
+LatentSearch picks IVF-PQ once the store is large enough to train it and
+falls back to brute force before that. Session similarity compares
+per-session mean latents, which are updated incrementally. Writers (the
+session worker) append; readers (the sidecar's /search) pick up new rows on
+the next query.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LATENT_DIM = 64
+IVF_MIN_TRAIN = 50000     # vectors before IVF-PQ replaces brute force
+IVF_RETRAIN_FACTOR = 8    # retrain once the store has grown this many times past the trained size
+
+
+def _write_json_atomic(path, data):
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(data))
+    tmp_path.replace(path)
+
+
+def _memmap(path, dtype, width):
+    """Read-only view of the complete rows of an append-only file"""
+    row_bytes = np.dtype(dtype).itemsize * width
+    try:
+        rows = path.stat().st_size // row_bytes
+    except FileNotFoundError:
+        rows = 0
+    if rows == 0:
+        return np.empty((0, width), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows, width))
+
+
+def _sq_distances(x, queries):
+    """Squared L2 distances between (n, d) rows and (q, d) queries, as (q, n)"""
+    return ((queries ** 2).sum(axis=1)[:, None] - 2 * queries @ x.T + (x ** 2).sum(axis=1)[None, :])
+
+
+def _nearest(centroids, x, chunk_rows=4096):
+    """Index of the nearest centroid per row, chunked to bound the distance matrix"""
+    return np.concatenate([np.argmin(_sq_distances(centroids, x[i:i + chunk_rows]), axis=1)
+                           for i in range(0, len(x), chunk_rows)] or [np.empty(0, np.int64)])
+
+
+def _top_k(distances, ids, k):
+    """Smallest k per row of (q, n) distances, sorted; ids maps columns to row ids"""
+    n = distances.shape[1]
+    k = min(k, n)
+    if k < n:
+        part = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(n), (len(distances), 1))
+    part_d = np.take_along_axis(distances, part, axis=1)
+    order = np.argsort(part_d, axis=1)
+    return np.take_along_axis(part_d, order, axis=1), ids[np.take_along_axis(part, order, axis=1)]
+
+
+def _merge(best, candidates, k):
+    if best is None:
+        return candidates
+    distances = np.concatenate((best[0], candidates[0]), axis=1)
+    ids = np.concatenate((best[1], candidates[1]), axis=1)
+    order = np.argsort(distances, axis=1)[:, :k]
+    return np.take_along_axis(distances, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+
+def kmeans(x, k, iterations=10, seed=0):
+    """Lloyd's k-means on float32 rows; empty clusters are re-seeded from random rows"""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(centroids, x)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = x[rng.choice(len(x), size=int(empty.sum()), replace=False)]
+    return centroids
+
+
+class LatentStore:
+    """Append-only memory-mapped latents with (session, window start) per row"""
+
+    def __init__(self, root, dim=LATENT_DIM):
+        self.root = Path(root)
+        self.dim = dim
+        self.sessions_path = self.root / "sessions.json"
+        self.vectors_path = self.root / "vectors.f16"
+        self.rows_path = self.root / "rows.i32"
+        self.sessions = []
+        self.vectors = np.empty((0, dim), dtype=np.float16)
+        self.rows = np.empty((0, 2), dtype=np.int32)
+        self._means = (0, np.zeros((0, dim)), np.zeros(0, dtype=np.int64))
+        self.refresh()
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def refresh(self):
+        """Pick up rows appended since the last call (e.g. by another process)"""
+        try:
+            self.sessions = json.loads(self.sessions_path.read_text())
+        except (OSError, ValueError):
+            self.sessions = []
+        vectors = _memmap(self.vectors_path, np.float16, self.dim)
+        rows = _memmap(self.rows_path, np.int32, 2)
+        n = min(len(vectors), len(rows))
+        if n and rows[n - 1, 0] >= len(self.sessions):
+            # Rows of a session not yet in sessions.json (being added, or left
+            # by a crashed add); row session ids never decrease
+            n = int(np.searchsorted(np.asarray(rows[:n, 0]), len(self.sessions)))
+        self.vectors, self.rows = vectors[:n], rows[:n]
+        return n
+
+    def _truncate(self):
+        """Cut both files back to the rows refresh() accepted (writer only).
+
+        Drops partial rows and rows of sessions missing from sessions.json, so
+        a crash mid-add cannot misalign the vectors and rows of later appends.
+        """
+        n = len(self.vectors)
+        for path, row_bytes in ((self.vectors_path, 2 * self.dim), (self.rows_path, 8)):
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:
+                continue
+            if size != n * row_bytes:
+                logger.warning(f"Truncating {path} from {size} to {n * row_bytes} bytes after an incomplete add")
+                os.truncate(path, n * row_bytes)
+
+    def session_rows(self, session):
+        """Row ids of one session"""
+        try:
+            index = self.sessions.index(session)
+        except ValueError:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.rows[:, 0] == index)
+
+    def session_means(self, chunk_rows=65536):
+        """(sessions, dim) mean latent and (sessions,) window count per session,
+        updated incrementally as rows are appended"""
+        done, sums, counts = self._means
+        if len(sums) < len(self.sessions):
+            grow = len(self.sessions) - len(sums)
+            sums = np.concatenate((sums, np.zeros((grow, self.dim))))
+            counts = np.concatenate((counts, np.zeros(grow, dtype=np.int64)))
+        for start in range(done, len(self.vectors), chunk_rows):
+            owners = self.rows[start:start + chunk_rows, 0]
+            np.add.at(sums, owners, np.asarray(self.vectors[start:start + chunk_rows], dtype=np.float64))
+            counts += np.bincount(owners, minlength=len(counts))
+        self._means = (len(self.vectors), sums, counts)
+        return sums / np.maximum(counts, 1)[:, None], counts
+
+    def add(self, session, latents, window_starts):
+        """Append a session's latents; returns rows added (0 if already stored)"""
+        self.refresh()
+        if session in self.sessions or not len(latents):
+            return 0
+        latents = np.asarray(latents, dtype=np.float32)
+        if latents.ndim != 2 or latents.shape[1] != self.dim:
+            raise ValueError(f"expected (n, {self.dim}) latents, got {latents.shape}")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._truncate()
+        rows = np.column_stack((np.full(len(latents), len(self.sessions), dtype=np.int32),
+                                np.asarray(window_starts, dtype=np.int32)))
+        with open(self.vectors_path, "ab") as f:
+            f.write(latents.astype(np.float16).tobytes())
+        with open(self.rows_path, "ab") as f:
+            f.write(rows.tobytes())
+        # Session name last: it commits the rows for readers, and a crash
+        # before it leaves rows that the next add truncates
+        _write_json_atomic(self.sessions_path, self.sessions + [session])
+        self.refresh()
+        return len(latents)
+
+
+class BruteForceIndex:
+    """Exact search streamed over the store in chunks of chunk_rows"""
+
+    def __init__(self, store, chunk_rows=65536):
+        self.store = store
+        self.chunk_rows = chunk_rows
+
+    def search(self, queries, k=10):
+        """(q, dim) queries -> (q, k) squared distances and row ids, nearest first"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        vectors = self.store.vectors
+        best = None
+        for start in range(0, len(vectors), self.chunk_rows):
+            chunk = np.asarray(vectors[start:start + self.chunk_rows], dtype=np.float32)
+            ids = np.arange(start, start + len(chunk))
+            best = _merge(best, _top_k(_sq_distances(chunk, queries), ids, k), k)
+        if best is None:
+            return np.empty((len(queries), 0), dtype=np.float32), np.empty((len(queries), 0), dtype=np.int64)
+        return best
+
+
+class IVFPQIndex:
+    """IVF-PQ over the store: nlist coarse lists, m sub-quantizers of 256 codes"""
+
+    def __init__(self, store, nlist=None, m=8, nprobe=16, rerank=10):
+        if store.dim % m:
+            raise ValueError(f"latent dim {store.dim} is not divisible by m={m}")
+        self.store = store
+        self.nlist = nlist
+        self.m = m
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.params_path = store.root / "ivfpq.npz"
+        self.lists_path = store.root / "ivfpq_lists.i32"
+        self.codes_path = store.root / "ivfpq_codes.u8"
+        self.centroids = self.codebooks = self._codebook_norms = None
+        self.trained_size = 0
+        self._params_mtime = None
+        self._lists_cache = (0, None)
+        self.load()
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def load(self):
+        """(Re)load the trained quantizers if they changed on disk"""
+        try:
+            mtime = self.params_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._params_mtime:
+            return
+        with np.load(self.params_path) as params:
+            self.centroids = params["centroids"]
+            self.codebooks = params["codebooks"]
+            self._codebook_norms = (self.codebooks ** 2).sum(axis=2)
+            self.trained_size = int(params["trained_size"])
+        self._params_mtime = mtime
+        self._lists_cache = (0, None)
+
+    # -- training and encoding -------------------------------------------
+
+    def train(self, sample_size=50000, iterations=10, seed=0):
+        """Fit coarse centroids and PQ codebooks on a sample, then re-encode every row"""
+        vectors = self.store.vectors
+        rng = np.random.default_rng(seed)
+        sample_ids = np.sort(rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False))
+        sample = np.asarray(vectors[sample_ids], dtype=np.float32)
+        nlist = self.nlist or int(np.clip(4 * np.sqrt(len(vectors)), 16, 1024))
+        nlist = min(nlist, len(sample))
+        centroids = kmeans(sample, nlist, iterations, seed)
+
+        residuals = sample - centroids[_nearest(centroids, sample)]
+        sub = self.store.dim // self.m
+        ksub = min(256, len(sample))
+        codebooks = np.stack([kmeans(residuals[:, j * sub:(j + 1) * sub], ksub, iterations, seed + j)
+                              for j in range(self.m)])
+
+        self.centroids, self.codebooks, self.trained_size = centroids, codebooks, len(vectors)
+        self._codebook_norms = (codebooks ** 2).sum(axis=2)
+        # Re-encode into side files so readers keep a consistent old index until the swap
+        tmp_lists = self.lists_path.with_suffix(".tmp")
+        tmp_codes = self.codes_path.with_suffix(".tmp")
+        tmp_lists.unlink(missing_ok=True)
+        tmp_codes.unlink(missing_ok=True)
+        self._append(0, tmp_lists, tmp_codes)
+        tmp_params = self.params_path.with_suffix(".tmp.npz")
+        np.savez(tmp_params, centroids=centroids, codebooks=codebooks, trained_size=len(vectors))
+        tmp_codes.replace(self.codes_path)
+        tmp_lists.replace(self.lists_path)
+        tmp_params.replace(self.params_path)
+        self._params_mtime = self.params_path.stat().st_mtime_ns
+        self._lists_cache = (0, None)
+        logger.info(f"Trained IVF-PQ on {len(sample)} of {len(vectors)} latents ({nlist} lists, m={self.m})")
+
+    def encode(self, x):
+        """(n, dim) float32 -> (n,) coarse lists and (n, m) uint8 codes"""
+        lists = _nearest(self.centroids, x).astype(np.int32)
+        residuals = x - self.centroids[lists]
+        sub = self.store.dim // self.m
+        codes = np.empty((len(x), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = _nearest(self.codebooks[j], residuals[:, j * sub:(j + 1) * sub])
+        return lists, codes
+
+    def _append(self, start, lists_path, codes_path, chunk_rows=65536):
+        vectors = self.store.vectors
+        for i in range(start, len(vectors), chunk_rows):
+            lists, codes = self.encode(np.asarray(vectors[i:i + chunk_rows], dtype=np.float32))
+            # Codes before lists: readers size the index by the shorter file
+            with open(codes_path, "ab") as f:
+                f.write(codes.tobytes())
+            with open(lists_path, "ab") as f:
+                f.write(lists.tobytes())
+        return len(vectors) - start
+
+    def add_new(self):
+        """Encode store rows appended since the last call; returns rows encoded"""
+        n = min(len(_memmap(self.lists_path, np.int32, 1)), len(_memmap(self.codes_path, np.uint8, self.m)))
+        # An interrupted append leaves codes without lists, or a partial row
+        for path, row_bytes in ((self.lists_path, 4), (self.codes_path, self.m)):
+            if path.exists() and path.stat().st_size != n * row_bytes:
+                os.truncate(path, n * row_bytes)
+        return self._append(n, self.lists_path, self.codes_path)
+
+    # -- search ----------------------------------------------------------
+
+    def _inverted_lists(self, lists):
+        """Row ids grouped by list (cached until rows are added)"""
+        cached_n, cached = self._lists_cache
+        if cached is not None and cached_n == len(lists):
+            return cached
+        order = np.argsort(lists, kind="stable")
+        bounds = np.searchsorted(lists[order], np.arange(len(self.centroids) + 1))
+        self._lists_cache = (len(lists), (order, bounds))
+        return order, bounds
+
+    def search(self, queries, k=10):
+        """(q, dim) queries -> (q, k) squared distances and row ids, nearest first"""
+        self.load()
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        lists = _memmap(self.lists_path, np.int32, 1)[:, 0]
+        codes = _memmap(self.codes_path, np.uint8, self.m)
+        n = min(len(lists), len(codes))
+        lists, codes = np.asarray(lists[:n]), codes[:n]
+        order, bounds = self._inverted_lists(lists)
+        sub = self.store.dim // self.m
+
+        all_d, all_ids = [], []
+        for query in queries:
+            coarse = _sq_distances(self.centroids, query[None])[0]
+            probes = np.argsort(coarse)[:self.nprobe]
+            candidates = np.concatenate([order[bounds[p]:bounds[p + 1]] for p in probes])
+            if not len(candidates):
+                all_d.append(np.empty(0, np.float32))
+                all_ids.append(np.empty(0, np.int64))
+                continue
+            # Asymmetric distance: |q - c - r|^2 from per-probe, per-subspace tables
+            # expanded as |r|^2 - 2 r.b + |b|^2 so the cross term is one batched matmul
+            residuals = (query - self.centroids[probes]).reshape(len(probes), self.m, 1, sub).transpose(1, 0, 2, 3)
+            cross = np.matmul(residuals[:, :, 0], self.codebooks.transpose(0, 2, 1)).transpose(1, 0, 2)
+            tables = (residuals[:, :, 0] ** 2).sum(axis=2).T[:, :, None] - 2 * cross + self._codebook_norms
+            probe_of = np.repeat(np.arange(len(probes)), bounds[probes + 1] - bounds[probes])
+            member_codes = np.asarray(codes[candidates])
+            distances = tables[probe_of[:, None], np.arange(self.m), member_codes].sum(axis=1)
+
+            shortlist = candidates[np.argsort(distances)[:k * self.rerank]]
+            # Re-rank with the stored float16 vectors
+            exact = _sq_distances(np.asarray(self.store.vectors[np.sort(shortlist)], dtype=np.float32), query[None])
+            d, ids = _top_k(exact, np.sort(shortlist), k)
+            all_d.append(d[0])
+            all_ids.append(ids[0])
+
+        width = min(k, min((len(d) for d in all_d), default=0))
+        return (np.stack([d[:width] for d in all_d]).astype(np.float32),
+                np.stack([i[:width] for i in all_ids]))
+
+
+class LatentSearch:
+    """Store plus whichever index fits its size"""
+
+    def __init__(self, root, dim=LATENT_DIM, ivf_min=IVF_MIN_TRAIN, nprobe=16):
+        self.store = LatentStore(root, dim)
+        self.brute = BruteForceIndex(self.store)
+        self.ivf = IVFPQIndex(self.store, nprobe=nprobe)
+        self.ivf_min = ivf_min
+
+    def add_session(self, session, latents, window_starts):
+        """Insert a processed session and keep the IVF-PQ index current"""
+        added = self.store.add(session, latents, window_starts)
+        if not added:
+            return 0
+        self.ivf.load()
+        n = len(self.store)
+        if (not self.ivf.trained and n >= self.ivf_min) or \
+                (self.ivf.trained and n >= IVF_RETRAIN_FACTOR * self.ivf.trained_size):
+            self.ivf.train()
+        elif self.ivf.trained:
+            self.ivf.add_new()
+        return added
+
+    def search(self, queries, k=10):
+        self.store.refresh()
+        self.ivf.load()
+        if self.ivf.trained:
+            return self.ivf.search(queries, k), "ivfpq"
+        return self.brute.search(queries, k), "brute_force"
+
+    def _describe(self, distances, ids):
+        return [
+            {
+                "session": self.store.sessions[self.store.rows[i, 0]],
+                "window_start": int(self.store.rows[i, 1]),
+                "distance": float(np.sqrt(max(d, 0.0))),
+            }
+            for d, i in zip(distances, ids)
+        ]
+
+    def neighbors(self, latent, k=10):
+        """Nearest stored windows to one latent vector"""
+        (distances, ids), index = self.search(latent, k)
+        return self._describe(distances[0], ids[0]), index
+
+    def similar_sessions(self, session, k=10):
+        """Sessions whose mean latent is closest to the given session's"""
+        self.store.refresh()
+        try:
+            index = self.store.sessions.index(session)
+        except ValueError:
+            raise KeyError(session)
+        means, counts = self.store.session_means()
+        if index >= len(means) or not counts[index]:
+            raise KeyError(session)
+        distances = ((means - means[index]) ** 2).sum(axis=1)
+        distances[counts == 0] = np.inf
+        distances[index] = np.inf
+        order = np.argsort(distances)[:k]
+        return [
+            {"session": self.store.sessions[i], "windows": int(counts[i]), "distance": float(np.sqrt(distances[i]))}
+            for i in order if np.isfinite(distances[i])
+        ], "session_means"
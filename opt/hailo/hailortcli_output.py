@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+hailortcli Benchmark Output Parser
+----------------------------------
+
+Line-oriented parser for `hailortcli benchmark` output. It is fed stdout
+as the process runs, so the worker never buffers the whole output.
+
+Captures:
+  - summary FPS (hw_only / streaming) and HW latency
+  - per-network FPS for each measurement mode and HW latency, including the
+    spread (min/mean/max) of the running latency readouts
+  - per-device power in streaming mode (average / max)
+  - [HailoRT] warnings
+
+Progress bars redraw with carriage returns; text-mode pipes translate those
+into separate lines, so every redraw is one feed() call.
+"""
+
+import re
+import subprocess
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+ANSI = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')
+
+MODE_HEADERS = (
+    (re.compile(r"^Measuring FPS in hw_only mode"), "hw_only"),
+    (re.compile(r"^Measuring FPS (?:and Power )?in streaming mode"), "streaming"),
+    (re.compile(r"^Measuring HW Latency"), "latency"),
+)
+PROGRESS = re.compile(
+    r"^Network (?P<network>\S+?):\s+(?P<percent>\d+)%\s*\|\s*(?P<frames>\d+)\s*\|\s*"
+    r"(?:FPS:\s*(?P<fps>[0-9.]+)|HW Latency:\s*(?P<latency>[0-9.]+)\s*ms)"
+)
+SUMMARY_HEADER = re.compile(r"^Summary\s*$")
+FPS_HW_ONLY = re.compile(r"^FPS\s*\(hw_only\)\s*=\s*([0-9.]+)")
+FPS_STREAMING = re.compile(r"^\(streaming\)\s*=\s*([0-9.]+)")
+LATENCY_HW = re.compile(r"^Latency\s*\(hw\)\s*=\s*([0-9.]+)\s*ms")
+DEVICE = re.compile(r"^Device\s+(\S+):\s*$")
+POWER_AVERAGE = re.compile(r"^Power in streaming mode\s*\(average\)\s*=\s*([0-9.]+)\s*W")
+POWER_MAX = re.compile(r"^\(max\)\s*=\s*([0-9.]+)\s*W")
+WARNING = re.compile(r"^\[HailoRT\]\s*\[(?:warning|error)\]\s*(.*)", re.I)
+
+
+@dataclass
+class LatencyStats:
+    """Running HW latency readouts (ms) from the progress output"""
+    count: int = 0
+    min_ms: Optional[float] = None
+    mean_ms: Optional[float] = None
+    max_ms: Optional[float] = None
+
+    def add(self, value: float):
+        self.count += 1
+        self.min_ms = value if self.min_ms is None else min(self.min_ms, value)
+        self.max_ms = value if self.max_ms is None else max(self.max_ms, value)
+        self.mean_ms = value if self.mean_ms is None else self.mean_ms + (value - self.mean_ms) / self.count
+
+
+@dataclass
+class NetworkStats:
+    fps_hw_only: Optional[float] = None
+    fps_streaming: Optional[float] = None
+    latency_ms: Optional[float] = None
+    latency_readouts: LatencyStats = field(default_factory=LatencyStats)
+
+
+@dataclass
+class PowerStats:
+    average_w: Optional[float] = None
+    max_w: Optional[float] = None
+
+
+@dataclass
+class BenchmarkResult:
+    fps_hw_only: Optional[float] = None
+    fps_streaming: Optional[float] = None
+    latency_ms: Optional[float] = None
+    networks: Dict[str, NetworkStats] = field(default_factory=dict)
+    power: Dict[str, PowerStats] = field(default_factory=dict)
+    warnings: List[str] = field(default_factory=list)
+
+    def to_summary(self) -> dict:
+        """JSON-ready summary for results.json (keeps the original three keys)"""
+        first_power = next(iter(self.power.values()), PowerStats())
+        return {
+            "fps_hw_only": self.fps_hw_only,
+            "fps_streaming": self.fps_streaming,
+            "latency_ms": self.latency_ms,
+            "power_avg_w": first_power.average_w,
+            "power_max_w": first_power.max_w,
+            "networks": {name: asdict(stats) for name, stats in self.networks.items()},
+            "devices": {device: asdict(stats) for device, stats in self.power.items()},
+            "warnings": list(self.warnings),
+        }
+
+
+class BenchmarkParser:
+    """Incremental parser: feed() lines, then read .result"""
+
+    def __init__(self, max_warnings: int = 20):
+        self.result = BenchmarkResult()
+        self._mode = None
+        self._in_summary = False
+        self._device = None
+        self._max_warnings = max_warnings
+
+    def feed(self, line: str):
+        if "\x1b" in line:
+            line = ANSI.sub("", line)
+        line = line.strip()
+        if not line:
+            return
+        if self._in_summary:
+            self._summary_line(line)
+            return
+
+        if line.startswith("Network "):
+            match = PROGRESS.match(line)
+            if match:
+                self._progress(match)
+            return
+        if line.startswith("Measuring"):
+            for pattern, mode in MODE_HEADERS:
+                if pattern.match(line):
+                    self._mode = mode
+            return
+        if SUMMARY_HEADER.match(line):
+            self._in_summary = True
+            return
+        self._warning(line)
+
+    def feed_text(self, text: str) -> BenchmarkResult:
+        for line in text.splitlines():
+            self.feed(line)
+        return self.result
+
+    def _progress(self, match):
+        stats = self.result.networks.setdefault(match.group("network"), NetworkStats())
+        if match.group("latency") is not None:
+            latency = float(match.group("latency"))
+            stats.latency_ms = latency
+            stats.latency_readouts.add(latency)
+        elif self._mode == "hw_only":
+            stats.fps_hw_only = float(match.group("fps"))
+        elif self._mode == "streaming":
+            stats.fps_streaming = float(match.group("fps"))
+
+    def _summary_line(self, line):
+        result = self.result
+        for pattern, attr in ((FPS_HW_ONLY, "fps_hw_only"), (FPS_STREAMING, "fps_streaming"),
+                              (LATENCY_HW, "latency_ms")):
+            match = pattern.match(line)
+            if match:
+                setattr(result, attr, float(match.group(1)))
+                return
+
+        match = DEVICE.match(line)
+        if match:
+            self._device = match.group(1)
+            return
+        match = POWER_AVERAGE.match(line)
+        if match:
+            result.power.setdefault(self._device or "0", PowerStats()).average_w = float(match.group(1))
+            return
+        match = POWER_MAX.match(line)
+        if match:
+            result.power.setdefault(self._device or "0", PowerStats()).max_w = float(match.group(1))
+            return
+        self._warning(line)
+
+    def _warning(self, line):
+        match = WARNING.match(line)
+        if match and len(self.result.warnings) < self._max_warnings:
+            self.result.warnings.append(match.group(1))
+
+
+def parse_benchmark_output(text: str) -> BenchmarkResult:
+    """Parse a complete captured output"""
+    return BenchmarkParser().feed_text(text)
+
+
+def stream_benchmark(args: List[str], timeout: float, tail_lines: int = 20) -> Tuple[BenchmarkResult, str]:
+    """
+    Run a hailortcli benchmark command, parsing stdout line by line.
+
+    Returns (result, stdout_tail). Raises subprocess.TimeoutExpired or
+    CalledProcessError like subprocess.run(check=True, timeout=...), with
+    the ANSI-stripped stdout tail as .stdout and the full stderr.
+    """
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1)
+    stderr_chunks = []
+    stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+    stderr_reader.start()
+
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout, kill)
+    timer.start()
+
+    parser = BenchmarkParser()
+    tail = deque(maxlen=tail_lines)
+    try:
+        for line in proc.stdout:
+            parser.feed(line)
+            line = ANSI.sub("", line).rstrip() if "\x1b" in line else line.rstrip()
+            if line:
+                tail.append(line)
+        proc.wait()
+    finally:
+        timer.cancel()
+        stderr_reader.join()
+        proc.stdout.close()
+        proc.stderr.close()
+
+    stdout_tail = "\n".join(tail)
+    stderr = "".join(stderr_chunks)
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(args, timeout, output=stdout_tail, stderr=stderr)
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, args, output=stdout_tail, stderr=stderr)
+    return parser.result, stdout_tail
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+IMU Batch Analysis
+------------------
+
+Worker stage for session_worker.py: streams a session's imu.json, cuts it
+into windows per model_config.json (sequence_length, window_overlap) and
+runs every window through the TCN-VAE encoder in large batches, either
+in-process (tcn_inference.py), through the sidecar's shared-memory transport
+(shm_transport.py, same host) or through its POST /infer/batch.
+
+Output, SESSIONS/<id>/imu_latents.npz (written atomically):
+  latent        (windows, latent_dim) float32
+  motif_scores  (windows, num_motifs) float32
+  window_start  (windows,) int32 sample index of each window
+  window_size, hop
+
+imu.json may be a list of samples or an object holding one under "x",
+"samples" or "imu"; each sample is a 9-value row [ax, ay, az, gx, gy, gz,
+mx, my, mz] or an object with those keys (the EdgeInfer IMUSample form).
+Samples are decoded one at a time, so the file is never loaded as a whole
+into Python lists.
+
+Configuration (environment):
+  IMU_BACKEND        auto | local | shm | sidecar | off (default auto: shm when
+                     IMU_SHM_SOCKET is set, sidecar when IMU_SIDECAR_URL is
+                     set, otherwise local)
+  IMU_SHM_SOCKET     the sidecar's SHM_SOCKET_PATH
+  IMU_SIDECAR_URL    sidecar base URL, e.g. http://localhost:9000
+  IMU_MODEL_DIR      directory with model_config.json and the encoder weights
+                     (default: <SESSIONS_DIR>/../models/tcn_vae)
+  TCN_WEIGHTS_PATH   encoder weights (.npz, or .pth with torch installed)
+  IMU_BATCH_SIZE     windows per encoder call / sidecar request (default 64)
+  LATENT_STORE_DIR   latent store the sidecar's /search reads (latent_index.py);
+                     every analyzed session is appended to it
+                     (default: <SESSIONS_DIR>/.latents, empty disables)
+"""
+
+import importlib
+import json
+import os
+import pathlib
+import sys
+import time
+import urllib.request
+
+import numpy as np
+
+LATENTS_NAME = "imu_latents.npz"
+IMU_CHANNELS = 9
+SAMPLE_KEYS = ("x", "samples", "imu")
+SAMPLE_FIELDS = ("ax", "ay", "az", "gx", "gy", "gz", "mx", "my", "mz")
+BACKENDS = ("auto", "local", "shm", "sidecar", "off")
+SHM_SLOTS = 4
+
+# Samples converted to an array per block while streaming
+_BLOCK_ROWS = 4096
+
+
+class _JSONStream:
+    """Just enough of an incremental JSON reader to walk to one array and
+    decode its elements one by one."""
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        if self.pos > self.chunk_size:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        chunk = self.f.read(self.chunk_size)
+        self.eof = not chunk
+        self.buf += chunk
+        return bool(chunk)
+
+    def peek(self):
+        """Next non-whitespace character, or '' at end of input"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars):
+        ch = self.peek()
+        if ch not in chars:
+            raise ValueError(f"expected one of {chars!r} at offset {self.pos}, got {ch!r}")
+        self.pos += 1
+        return ch
+
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def array_items(self):
+        """Yield the elements of the array starting at the current position"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(",]") == "]":
+                return
+
+    def find_samples(self):
+        """Position the stream at the samples array"""
+        if self.peek() == "[":
+            return
+        self.expect("{")
+        while self.peek() != "}":
+            key = self.value()
+            self.expect(":")
+            if key in SAMPLE_KEYS and self.peek() == "[":
+                return
+            self.value()
+            if self.expect(",}") == "}":
+                break
+        raise ValueError(f"no samples array (keys {SAMPLE_KEYS}) in imu.json")
+
+
+def _row(sample):
+    if isinstance(sample, dict):
+        return [sample[field] for field in SAMPLE_FIELDS]
+    if len(sample) != IMU_CHANNELS:
+        raise ValueError(f"expected {IMU_CHANNELS} values per sample, got {len(sample)}")
+    return sample
+
+
+def read_imu(path, chunk_size=1 << 16):
+    """Stream imu.json into an (n, 9) float32 array"""
+    blocks, rows = [], []
+    with open(path, encoding="utf-8") as f:
+        stream = _JSONStream(f, chunk_size)
+        stream.find_samples()
+        for sample in stream.array_items():
+            rows.append(_row(sample))
+            if len(rows) == _BLOCK_ROWS:
+                blocks.append(np.asarray(rows, dtype=np.float32))
+                rows = []
+    if rows:
+        blocks.append(np.asarray(rows, dtype=np.float32))
+    if not blocks:
+        return np.empty((0, IMU_CHANNELS), dtype=np.float32)
+    return np.concatenate(blocks)
+
+
+def load_window_config(path):
+    """(window_size, hop) from model_config.json; the sidecar's defaults otherwise"""
+    try:
+        config = json.loads(pathlib.Path(path).read_text())
+    except (OSError, ValueError):
+        config = {}
+    window_size = int(config.get("sequence_length", 100))
+    overlap = float(config.get("window_overlap", 0.5))
+    return window_size, max(1, round(window_size * (1 - overlap)))
+
+
+def window_view(samples, window_size, hop):
+    """Zero-copy (windows, window_size, 9) view and the window start indices"""
+    if len(samples) < window_size:
+        return np.empty((0, window_size, samples.shape[1]), dtype=np.float32), np.empty(0, dtype=np.int32)
+    windows = np.lib.stride_tricks.sliding_window_view(samples, window_size, axis=0)[::hop]
+    starts = np.arange(0, len(samples) - window_size + 1, hop, dtype=np.int32)
+    # sliding_window_view puts the window axis last
+    return windows.transpose(0, 2, 1), starts
+
+
+def write_latents(path, latents, scores, starts, window_size, hop):
+    path = pathlib.Path(path)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, latent=latents, motif_scores=scores, window_start=starts,
+                 window_size=np.int32(window_size), hop=np.int32(hop))
+    tmp_path.replace(path)
+
+
+def _import_root(name):
+    """Import a module shared with the sidecar from the repo root"""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        # Worker runs from the repo checkout (opt/hailo)
+        sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+        return importlib.import_module(name)
+
+
+class LocalEngine:
+    """In-process NumPy encoder (tcn_inference.TCNEncoder)"""
+
+    name = "local"
+
+    def __init__(self, config_path, weights_path):
+        TCNEncoder = _import_root("tcn_inference").TCNEncoder
+        if not pathlib.Path(weights_path).exists():
+            raise FileNotFoundError(f"TCN weights not found: {weights_path}")
+        self.encoder = TCNEncoder.from_config(config_path, weights_path)
+
+    def __call__(self, windows):
+        return self.encoder.batch(windows, batch_size=len(windows))
+
+
+class ShmEngine:
+    """The sidecar's shared-memory ring: windows are copied once into the
+    mapped slots and encoded there (see shm_transport.py)"""
+
+    name = "shm"
+
+    def __init__(self, socket_path, batch_size):
+        ShmClient = _import_root("shm_transport").ShmClient
+        # Slots small enough that several are in flight per stage batch
+        self.client = ShmClient(socket_path, slots=SHM_SLOTS, slot_windows=max(1, batch_size // SHM_SLOTS))
+
+    def __call__(self, windows):
+        return self.client.infer(windows)
+
+    def close(self):
+        self.client.close()
+
+
+class SidecarEngine:
+    """The sidecar's POST /infer/batch: one request per batch of windows"""
+
+    name = "sidecar"
+
+    def __init__(self, url, timeout=60):
+        self.url = url.rstrip("/") + "/infer/batch"
+        self.timeout = timeout
+
+    def __call__(self, windows):
+        body = json.dumps({"x": np.asarray(windows).tolist()}).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            reply = json.loads(response.read())
+        return (np.asarray(reply["latent"], dtype=np.float32),
+                np.asarray(reply["motif_scores"], dtype=np.float32))
+
+
+class ImuBatchStage:
+    """Per-session IMU analysis; the engine is created once and reused"""
+
+    def __init__(self, model_dir, backend="auto", sidecar_url=None, weights_path=None, batch_size=64,
+                 shm_socket=None, latent_store=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"IMU_BACKEND must be one of {BACKENDS}, got {backend!r}")
+        if backend == "auto":
+            backend = "shm" if shm_socket else "sidecar" if sidecar_url else "local"
+        if backend == "sidecar" and not sidecar_url:
+            raise ValueError("IMU_BACKEND=sidecar needs IMU_SIDECAR_URL")
+        if backend == "shm" and not shm_socket:
+            raise ValueError("IMU_BACKEND=shm needs IMU_SHM_SOCKET")
+        self.backend = backend
+        self.sidecar_url = sidecar_url
+        self.shm_socket = shm_socket
+        self.config_path = pathlib.Path(model_dir) / "model_config.json"
+        self.weights_path = weights_path or pathlib.Path(model_dir) / "tcn_encoder_for_edgeinfer.pth"
+        self.batch_size = batch_size
+        self.window_size, self.hop = load_window_config(self.config_path)
+        self.latent_store = latent_store
+        self._engine = None
+        self._search = None
+
+    @classmethod
+    def from_env(cls, sessions_dir):
+        model_dir = os.environ.get("IMU_MODEL_DIR", str(pathlib.Path(sessions_dir).parent / "models" / "tcn_vae"))
+        return cls(
+            model_dir,
+            backend=os.environ.get("IMU_BACKEND", "auto"),
+            sidecar_url=os.environ.get("IMU_SIDECAR_URL"),
+            shm_socket=os.environ.get("IMU_SHM_SOCKET"),
+            latent_store=os.environ.get("LATENT_STORE_DIR", str(pathlib.Path(sessions_dir) / ".latents")) or None,
+            weights_path=os.environ.get("TCN_WEIGHTS_PATH"),
+            batch_size=int(os.environ.get("IMU_BATCH_SIZE", "64")),
+        )
+
+    @property
+    def enabled(self):
+        return self.backend != "off"
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            if self.backend == "shm":
+                self._engine = ShmEngine(self.shm_socket, self.batch_size)
+            elif self.backend == "sidecar":
+                self._engine = SidecarEngine(self.sidecar_url)
+            else:
+                self._engine = LocalEngine(self.config_path, self.weights_path)
+        return self._engine
+
+    def reset(self):
+        """Drop the engine (closing its connection) so the next run creates a new one"""
+        if hasattr(self._engine, "close"):
+            self._engine.close()
+        self._engine = None
+
+    def index(self, session, latents, starts):
+        """Append a session's latents to the latent store; returns the rows added"""
+        if not self.latent_store or not len(latents):
+            return 0
+        if self._search is None:
+            self._search = _import_root("latent_index").LatentSearch(self.latent_store, dim=latents.shape[1])
+        return self._search.add_session(session, latents, starts)
+
+    def run(self, sdir):
+        """Analyze sdir/imu.json into sdir/imu_latents.npz; None if there is no imu.json"""
+        sdir = pathlib.Path(sdir)
+        imu_path = sdir / "imu.json"
+        out_path = sdir / LATENTS_NAME
+        try:
+            imu_mtime = imu_path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+        try:
+            if out_path.stat().st_mtime >= imu_mtime:
+                # Already analyzed (e.g. a retry after the device was busy)
+                with np.load(out_path) as existing:
+                    latents, starts = existing["latent"], existing["window_start"]
+                info = {"status": "ok", "file": LATENTS_NAME, "windows": len(starts), "reused": True}
+                # Indexing is idempotent: covers sessions analyzed before it failed or existed
+                return self._with_index(info, sdir.name, latents, starts)
+        except (OSError, ValueError, KeyError):
+            pass
+
+        start = time.time()
+        samples = read_imu(imu_path)
+        windows, starts = window_view(samples, self.window_size, self.hop)
+        engine = self.engine
+        latents = scores = None
+        try:
+            for i in range(0, len(windows), self.batch_size):
+                latent, score = engine(windows[i:i + self.batch_size])
+                if latents is None:
+                    latents = np.empty((len(windows), latent.shape[1]), dtype=np.float32)
+                    scores = np.empty((len(windows), score.shape[1]), dtype=np.float32)
+                latents[i:i + len(latent)] = latent
+                scores[i:i + len(score)] = score
+        except (OSError, ConnectionError):
+            # e.g. the sidecar restarted: reconnect for the next session
+            self.reset()
+            raise
+        if latents is None:
+            latents = np.empty((0, 0), dtype=np.float32)
+            scores = np.empty((0, 0), dtype=np.float32)
+        write_latents(out_path, latents, scores, starts, self.window_size, self.hop)
+
+        info = {
+            "status": "ok",
+            "file": LATENTS_NAME,
+            "backend": engine.name,
+            "samples": len(samples),
+            "windows": len(windows),
+            "window_size": self.window_size,
+            "hop": self.hop,
+            "duration_sec": round(time.time() - start, 2),
+        }
+        return self._with_index(info, sdir.name, latents, starts)
+
+    def _with_index(self, info, session, latents, starts):
+        try:
+            added = self.index(session, latents, starts)
+        except (OSError, ValueError) as e:
+            # imu_latents.npz is kept; the next run over this session indexes it
+            print(f"Could not index latents for session {session}: {e}", file=sys.stderr)
+            info["index_error"] = str(e)
+            return info
+        if added:
+            info["indexed"] = added
+        return info
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Session Archive Compaction
+--------------------------
+
+Background stage for session_worker.py that moves finished sessions out of
+SESSIONS_DIR into compressed per-session archives:
+
+  SESSIONS/.archive/<id>.zip           session files (JSON deflated, media stored)
+  SESSIONS/.archive/results/<id>.json  copy of results.json for direct reads
+  SESSIONS/.archive/index.json         per-session metadata (atomic writes)
+
+Policy (environment):
+  ARCHIVE_AFTER_DAYS    archive sessions whose results.json is older (default 7, 0 disables)
+  ARCHIVE_MEDIA_POLICY  keep | drop | transcode video.mp4 (default keep; transcode needs ffmpeg)
+  ARCHIVE_BUDGET_MB     cap on archive bytes; least recently used archives are
+                        evicted (results are kept) when exceeded (default 0 = no cap)
+  SESSIONS_BUDGET_MB    cap on finished live sessions; the least recently
+                        modified are archived early when exceeded (default 0 = no cap)
+"""
+
+import json
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import time
+import zipfile
+
+from sessions_manifest import SUMMARY_FIELDS
+
+ARCHIVE_DIRNAME = ".archive"
+INDEX_VERSION = 1
+MEDIA_FILES = ("video.mp4",)
+MEDIA_POLICIES = ("keep", "drop", "transcode")
+
+# Transcode target: small H.264 proxy, audio dropped
+TRANSCODE_ARGS = ["-vf", "scale=-2:360", "-c:v", "libx264", "-preset", "veryfast", "-crf", "30", "-an"]
+
+
+def _mb(value):
+    return int(float(value) * 1024 * 1024)
+
+
+def _write_json_atomic(path: pathlib.Path, data: dict):
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(data, separators=(",", ":"), sort_keys=True))
+    tmp_path.replace(path)
+
+
+def _dir_bytes(path: pathlib.Path) -> int:
+    total = 0
+    for f in path.iterdir():
+        try:
+            total += f.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+class SessionArchive:
+    """Archive index plus the compaction and eviction passes."""
+
+    def __init__(self, sessions_dir, after_days=7.0, media_policy="keep", archive_budget=0, sessions_budget=0):
+        if media_policy not in MEDIA_POLICIES:
+            raise ValueError(f"ARCHIVE_MEDIA_POLICY must be one of {MEDIA_POLICIES}, got {media_policy!r}")
+        self.sessions_dir = pathlib.Path(sessions_dir)
+        self.root = self.sessions_dir / ARCHIVE_DIRNAME
+        self.results_dir = self.root / "results"
+        self.index_path = self.root / "index.json"
+        self.after_seconds = after_days * 86400
+        self.media_policy = media_policy
+        self.archive_budget = archive_budget
+        self.sessions_budget = sessions_budget
+        self.sessions = self._load_index()
+        self._manifest_entries = None
+
+    @classmethod
+    def from_env(cls, sessions_dir):
+        return cls(
+            sessions_dir,
+            after_days=float(os.environ.get("ARCHIVE_AFTER_DAYS", "7")),
+            media_policy=os.environ.get("ARCHIVE_MEDIA_POLICY", "keep"),
+            archive_budget=_mb(os.environ.get("ARCHIVE_BUDGET_MB", "0")),
+            sessions_budget=_mb(os.environ.get("SESSIONS_BUDGET_MB", "0")),
+        )
+
+    @property
+    def enabled(self):
+        return self.after_seconds > 0 or self.sessions_budget > 0
+
+    def _load_index(self):
+        try:
+            index = json.loads(self.index_path.read_text())
+        except (OSError, ValueError):
+            return {}
+        return index.get("sessions", {}) if index.get("version") == INDEX_VERSION else {}
+
+    def _save_index(self):
+        self._manifest_entries = None
+        _write_json_atomic(self.index_path, {"version": INDEX_VERSION, "updated": time.time(),
+                                             "sessions": self.sessions})
+
+    # -- selection -------------------------------------------------------
+
+    def candidates(self, manifest_sessions, now=None):
+        """
+        Finished sessions to archive, oldest first: everything past the age
+        threshold, then (if finished sessions exceed SESSIONS_BUDGET_MB) the
+        least recently modified until the live total fits.
+        """
+        now = now or time.time()
+        finished = sorted(
+            ((name, entry) for name, entry in manifest_sessions.items() if entry["status"] in ("ok", "error")),
+            key=lambda item: item[1]["mtime"],
+        )
+        selected = []
+        if self.after_seconds > 0:
+            selected = [name for name, entry in finished if now - entry["mtime"] >= self.after_seconds]
+
+        if self.sessions_budget > 0:
+            live = sum(sum(entry["files"].values()) for name, entry in finished if name not in selected)
+            for name, entry in finished:
+                if live <= self.sessions_budget:
+                    break
+                if name not in selected:
+                    selected.append(name)
+                    live -= sum(entry["files"].values())
+        return selected
+
+    # -- compaction ------------------------------------------------------
+
+    def compact(self, names, limit=20):
+        """Archive up to `limit` sessions; returns the names archived."""
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        archived = []
+        for name in names[:limit]:
+            sdir = self.sessions_dir / name
+            try:
+                if name in self.sessions and (self.root / f"{name}.zip").exists():
+                    # Archived before a crash/restart removed the directory
+                    shutil.rmtree(sdir, ignore_errors=True)
+                else:
+                    self._archive_one(sdir)
+                archived.append(name)
+            except Exception as e:
+                print(f"Archive failed for {name}: {e}", file=sys.stderr)
+        return archived
+
+    def _archive_one(self, sdir: pathlib.Path):
+        name = sdir.name
+        original_bytes = _dir_bytes(sdir)
+        media = {}
+        zip_path = self.root / f"{name}.zip"
+        tmp_zip = zip_path.with_suffix(".zip.tmp")
+
+        with zipfile.ZipFile(tmp_zip, "w") as zf:
+            for f in sorted(sdir.iterdir()):
+                if not f.is_file() or f.name.endswith(".tmp"):
+                    continue
+                if f.name in MEDIA_FILES:
+                    media[f.name] = self._add_media(zf, f)
+                else:
+                    zf.write(f, f.name, compress_type=zipfile.ZIP_DEFLATED)
+        tmp_zip.replace(zip_path)
+
+        results_path = sdir / "results.json"
+        results = {}
+        if results_path.exists():
+            shutil.copyfile(results_path, self.results_dir / f"{name}.json")
+            try:
+                results = json.loads(results_path.read_text())
+            except ValueError:
+                pass
+
+        now = time.time()
+        self.sessions[name] = {
+            "archive": zip_path.name,
+            "archive_bytes": zip_path.stat().st_size,
+            "original_bytes": original_bytes,
+            "archived_at": now,
+            "last_access": now,
+            "session_mtime": sdir.stat().st_mtime,
+            "media": media,
+            "status": results.get("status", "error"),
+            "summary": results.get("summary"),
+        }
+        # Index first: a crash before the rmtree leaves an indexed session
+        # whose directory compact() simply removes on the next pass
+        self._save_index()
+        shutil.rmtree(sdir)
+
+    def _add_media(self, zf, path: pathlib.Path) -> str:
+        """Store media per policy; returns what was done."""
+        if self.media_policy == "drop":
+            return "dropped"
+        if self.media_policy == "transcode":
+            proxy = path.with_name(path.stem + ".proxy.mp4")
+            try:
+                subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", str(path), *TRANSCODE_ARGS, str(proxy)],
+                               check=True, capture_output=True, timeout=600)
+                zf.write(proxy, path.name, compress_type=zipfile.ZIP_STORED)
+                return "transcoded"
+            except (OSError, subprocess.SubprocessError) as e:
+                print(f"Transcode failed for {path}, keeping original: {e}", file=sys.stderr)
+            finally:
+                proxy.unlink(missing_ok=True)
+        # Already compressed; deflate would only cost CPU
+        zf.write(path, path.name, compress_type=zipfile.ZIP_STORED)
+        return "kept"
+
+    # -- budget ----------------------------------------------------------
+
+    def _last_access(self, name, entry):
+        try:
+            atime = (self.root / entry["archive"]).stat().st_atime
+        except OSError:
+            atime = 0
+        return max(entry.get("last_access", 0), atime)
+
+    def evict(self):
+        """Delete least recently used archives until under ARCHIVE_BUDGET_MB; results are kept."""
+        if self.archive_budget <= 0:
+            return []
+        live = {name: entry for name, entry in self.sessions.items() if entry.get("archive")}
+        total = sum(entry["archive_bytes"] for entry in live.values())
+        evicted = []
+        for name in sorted(live, key=lambda n: self._last_access(n, live[n])):
+            if total <= self.archive_budget:
+                break
+            entry = live[name]
+            (self.root / entry["archive"]).unlink(missing_ok=True)
+            total -= entry["archive_bytes"]
+            entry.update(archive=None, archive_bytes=0, evicted_at=time.time())
+            evicted.append(name)
+        if evicted:
+            self._save_index()
+        return evicted
+
+    # -- access ----------------------------------------------------------
+
+    def extract(self, name, dest):
+        """Restore an archived session's files into dest and mark it recently used."""
+        entry = self.sessions[name]
+        if not entry.get("archive"):
+            raise FileNotFoundError(f"archive for {name} was evicted; only results remain")
+        with zipfile.ZipFile(self.root / entry["archive"]) as zf:
+            zf.extractall(dest)
+        entry["last_access"] = time.time()
+        self._save_index()
+        return pathlib.Path(dest)
+
+    def manifest_entries(self):
+        """Archived sessions in sessions-manifest entry form (cached until the index changes)."""
+        if self._manifest_entries is not None:
+            return self._manifest_entries
+        entries = {}
+        for name, entry in self.sessions.items():
+            files = {}
+            try:
+                files["results.json"] = (self.results_dir / f"{name}.json").stat().st_size
+            except OSError:
+                pass
+            if entry.get("archive"):
+                files["archive.zip"] = entry["archive_bytes"]
+            manifest_entry = {"files": files, "mtime": entry["session_mtime"], "status": "archived"}
+            summary = {k: v for k, v in (entry.get("summary") or {}).items() if k in SUMMARY_FIELDS and v is not None}
+            if summary:
+                manifest_entry["summary"] = summary
+            entries[name] = manifest_entry
+        self._manifest_entries = entries
+        return entries
@@ -13,10 +13,45 @@ Writes results.json with:
   - timestamp
   - HEF path + model name
   - duration_sec (benchmark runtime)
-  - parsed metrics (FPS, latency)
+  - parsed metrics (FPS, latency, power, per-network stats; see hailortcli_output.py)
   - raw_tail (ANSI-stripped output tail)
+  - cached / benchmarked_at (when the summary came from the benchmark cache)
+  - imu (IMU batch analysis outcome, when the session has imu.json)
+  - synchrony (handler/dog synchrony summary, when it also has handler_imu.json)
 
 Now includes atomic writes for results.json to prevent partial files.
+
+Benchmark results are cached in SESSIONS/.benchmark_cache.json keyed by HEF
+content hash, device ID and HailoRT version, so sessions reuse a fresh
+summary instead of holding the device for another benchmark run. Entries
+expire after BENCH_CACHE_TTL seconds; touch SESSIONS/.rebenchmark to force
+a new run for the next session.
+
+Prometheus metrics (pending sessions, per-stage durations, upload-to-result
+time, errors by type, scan-loop cost) are exported when WORKER_METRICS_PORT
+and/or WORKER_METRICS_TEXTFILE are set; see worker_metrics.py.
+
+Each scan also maintains SESSIONS/.manifest.json (file sizes, status and
+result summary per session, see sessions_manifest.py), which the Vapor API
+reads instead of walking the sessions tree per request.
+
+Sessions with an imu.json also get imu_latents.npz: per-window TCN-VAE
+latents and motif scores computed in large batches, locally or through the
+sidecar (see imu_batch.py; needs numpy, IMU_BACKEND=off disables). The
+outcome is recorded under "imu" in results.json.
+
+Sessions that also carry the handler's IMU (handler_imu.json) get
+synchrony.npz: per-window lag-aware handler/dog cross-correlation (see
+synchrony_stage.py; SYNCHRONY_STAGE=off disables), summarized under
+"synchrony" in results.json.
+
+When idle, finished sessions are compacted into SESSIONS/.archive per the
+ARCHIVE_* / SESSIONS_BUDGET_MB policy (see session_archive.py), at most once
+every ARCHIVE_INTERVAL seconds.
+
+CPU and memory profiles of the running worker are written to SESSIONS/.debug
+on SIGUSR1 / SIGUSR2 or when SESSIONS/.profile / .profile_memory appear (see
+worker_profiling.py).
 """
 
 import time
@@ -27,6 +62,27 @@ import os
 import re
 import sys
 import fcntl
+import hashlib
+
+import worker_metrics
+from sessions_manifest import SessionsManifest
+from session_archive import SessionArchive
+from hailortcli_output import parse_benchmark_output, stream_benchmark
+
+try:
+    from imu_batch import ImuBatchStage
+except ImportError:  # numpy missing on the system python
+    ImuBatchStage = None
+
+try:
+    from synchrony_stage import SynchronyStage
+except ImportError:
+    SynchronyStage = None
+
+try:
+    from worker_profiling import ProfileTriggers
+except ImportError:  # debug_profiler.py not reachable outside the repo checkout
+    ProfileTriggers = None
 
 # Path where session directories live
 SESSIONS = pathlib.Path(os.environ.get("SESSIONS_DIR", "/home/pi/appdata/sessions"))
@@ -44,21 +100,67 @@ LOCK_FILE = SESSIONS / ".worker.lock"
 # Regex to strip ANSI escape codes from CLI output
 ANSI = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')
 
+# Benchmark cache: results reused for the same HEF/device/HailoRT version
+BENCH_CACHE_FILE = pathlib.Path(os.environ.get("BENCH_CACHE_FILE", str(SESSIONS / ".benchmark_cache.json")))
+BENCH_CACHE_TTL = float(os.environ.get("BENCH_CACHE_TTL", "86400"))  # seconds, 0 disables
+FORCE_REBENCHMARK_FILE = SESSIONS / ".rebenchmark"
+
+# Archive compaction pass frequency (seconds) and sessions per pass
+ARCHIVE_INTERVAL = float(os.environ.get("ARCHIVE_INTERVAL", "3600"))
+ARCHIVE_BATCH = int(os.environ.get("ARCHIVE_BATCH", "20"))
+
+# Optional metrics export
+METRICS_PORT = os.environ.get("WORKER_METRICS_PORT")
+METRICS_TEXTFILE = os.environ.get("WORKER_METRICS_TEXTFILE")
+
+METRICS = worker_metrics.Registry()
+PENDING_SESSIONS = worker_metrics.Gauge(
+    METRICS, "session_worker_pending_sessions", "Sessions with video.mp4 but no results.json")
+STAGE_DURATION = worker_metrics.Histogram(
+    METRICS, "session_worker_stage_duration_seconds",
+    "Time spent per processing stage (settle, cache_lookup, benchmark, imu, synchrony, write, total)", ["stage"])
+UPLOAD_TO_RESULT = worker_metrics.Histogram(
+    METRICS, "session_worker_upload_to_result_seconds",
+    "Time from video.mp4 last modified to results.json written",
+    buckets=(1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 21600, 86400))
+SESSIONS_PROCESSED = worker_metrics.Counter(
+    METRICS, "session_worker_sessions_processed_total", "Sessions finished, by status and cache use",
+    ["status", "cached"])
+ERRORS = worker_metrics.Counter(
+    METRICS, "session_worker_errors_total",
+    "Errors by type (device_busy counts retries that leave the session pending)", ["type"])
+SCAN_DURATION = worker_metrics.Histogram(
+    METRICS, "session_worker_scan_duration_seconds", "Cost of one sessions directory scan",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5))
+SCAN_ENTRIES = worker_metrics.Gauge(
+    METRICS, "session_worker_scan_entries", "Directory entries visited by the last scan")
+ARCHIVED = worker_metrics.Counter(
+    METRICS, "session_worker_archived_sessions_total", "Sessions compacted into the archive")
+EVICTED = worker_metrics.Counter(
+    METRICS, "session_worker_evicted_archives_total", "Archives deleted to stay under ARCHIVE_BUDGET_MB")
+ARCHIVE_BYTES = worker_metrics.Gauge(
+    METRICS, "session_worker_archive_bytes", "Bytes held in session archives")
+IMU_WINDOWS = worker_metrics.Counter(
+    METRICS, "session_worker_imu_windows_total", "IMU windows run through the TCN-VAE encoder")
+
+# HEF hashes memoized by (path, size, mtime) so unchanged models are not re-read
+_hef_hashes = {}
+_hailort_identity = None
+_imu_stage = None
+_synchrony_stage = None
+
 
 def find_hef():
     """Locate a .hef model file, checking env override, known paths, then searching."""
     if HEF_ENV and pathlib.Path(HEF_ENV).exists():
         return HEF_ENV
 
-  candidates = [
-      "/usr/local/hailo/resources/models/hailo8/yolov8s.hef",      # YOLOv8 
-  small
-      "/usr/local/hailo/resources/models/hailo8/yolov5m_seg.hef",  # YOLOv5 
-  medium seg
-      "/usr/local/hailo/resources/models/hailo8/yolov11s.hef",     # YOLOv11 
-  small
-      "/opt/hailo/models/sample.hef",                              # Fallback
-  ]
+    candidates = [
+        "/usr/local/hailo/resources/models/hailo8/yolov8s.hef",      # YOLOv8 small
+        "/usr/local/hailo/resources/models/hailo8/yolov5m_seg.hef",  # YOLOv5 medium seg
+        "/usr/local/hailo/resources/models/hailo8/yolov11s.hef",     # YOLOv11 small
+        "/opt/hailo/models/sample.hef",                              # Fallback
+    ]
     for c in candidates:
         if pathlib.Path(c).exists():
             return c
@@ -78,15 +180,8 @@ def find_hef():
 
 
 def parse_benchmark(text: str):
-    """Parse FPS and latency metrics from hailortcli output."""
-    r_hw_only = re.search(r"FPS\s*\(hw_only\)\s*=\s*([0-9.]+)", text)
-    r_stream  = re.search(r"\(streaming\)\s*=\s*([0-9.]+)", text)
-    r_lat     = re.search(r"Latency\s*\(hw\)\s*=\s*([0-9.]+)\s*ms", text)
-    return {
-        "fps_hw_only": float(r_hw_only.group(1)) if r_hw_only else None,
-        "fps_streaming": float(r_stream.group(1)) if r_stream else None,
-        "latency_ms": float(r_lat.group(1)) if r_lat else None,
-    }
+    """Parse FPS, latency and power metrics from captured hailortcli output."""
+    return parse_benchmark_output(text).to_summary()
 
 
 def _tail(text: str, n: int) -> str:
@@ -106,8 +201,180 @@ def _write_json_atomic(path: pathlib.Path, data: dict):
     tmp_path.replace(path)
 
 
+def hef_sha256(hef: str) -> str:
+    """SHA-256 of the HEF file contents, memoized until the file changes."""
+    st = os.stat(hef)
+    key = (hef, st.st_size, st.st_mtime_ns)
+    if key not in _hef_hashes:
+        digest = hashlib.sha256()
+        with open(hef, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        _hef_hashes.clear()
+        _hef_hashes[key] = digest.hexdigest()
+    return _hef_hashes[key]
+
+
+def _run_cli(args):
+    """Run a short hailortcli query, returning ANSI-stripped stdout or ''."""
+    try:
+        out = subprocess.run(args, capture_output=True, text=True, check=False, timeout=10).stdout
+        return ANSI.sub("", out or "")
+    except Exception:
+        return ""
+
+
+def hailort_identity():
+    """(device_id, hailort_version), queried once per worker process.
+
+    A query that could not resolve both (e.g. the device was busy) is not
+    kept, so the next benchmark asks again.
+    """
+    global _hailort_identity
+    if _hailort_identity is not None:
+        return _hailort_identity
+    version = re.search(r"version\s*:?\s*v?([0-9][0-9.]*)", _run_cli(["hailortcli", "--version"]), re.I)
+    device_id = os.environ.get("HAILO_DEVICE_ID")
+    if not device_id:
+        ident = _run_cli(["hailortcli", "fw-control", "identify"])
+        serial = re.search(r"Serial Number:\s*(\S+)", ident)
+        board = re.search(r"Board Name:\s*(\S+)", ident)
+        device_id = (serial or board).group(1) if (serial or board) else "unknown"
+    identity = (device_id, version.group(1) if version else "unknown")
+    if "unknown" not in identity:
+        _hailort_identity = identity
+    return identity
+
+
+def benchmark_cache_key(hef: str) -> str:
+    device_id, version = hailort_identity()
+    return f"{hef_sha256(hef)}:{device_id}:{version}"
+
+
+def _load_bench_cache() -> dict:
+    try:
+        return json.loads(BENCH_CACHE_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def lookup_benchmark_cache(key: str):
+    """Return the cached entry for key if it is still fresh, else None."""
+    if BENCH_CACHE_TTL <= 0:
+        return None
+    entry = _load_bench_cache().get(key)
+    if entry and time.time() - entry.get("benchmarked_at", 0) < BENCH_CACHE_TTL:
+        return entry
+    return None
+
+
+def store_benchmark_cache(key: str, entry: dict):
+    """Add a successful benchmark to the cache, dropping expired entries."""
+    now = time.time()
+    cache = {
+        k: v for k, v in _load_bench_cache().items()
+        if now - v.get("benchmarked_at", 0) < max(BENCH_CACHE_TTL, 0)
+    }
+    cache[key] = entry
+    try:
+        _write_json_atomic(BENCH_CACHE_FILE, cache)
+    except OSError as e:
+        print(f"Could not write benchmark cache: {e}", file=sys.stderr)
+
+
+def consume_force_rebenchmark() -> bool:
+    """True (once) if a re-benchmark was requested via the control file."""
+    try:
+        FORCE_REBENCHMARK_FILE.unlink()
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        print(f"Could not clear {FORCE_REBENCHMARK_FILE}: {e}", file=sys.stderr)
+        return True
+
+
+def imu_stage():
+    """The IMU batch stage configured from the environment, or None if unavailable."""
+    global _imu_stage
+    if _imu_stage is None and ImuBatchStage is not None:
+        _imu_stage = ImuBatchStage.from_env(SESSIONS)
+    return _imu_stage if _imu_stage is not None and _imu_stage.enabled else None
+
+
+def run_imu_analysis(sdir: pathlib.Path):
+    """Batch-encode the session's imu.json; returns the results.json "imu" entry or None."""
+    try:
+        stage = imu_stage()
+    except ValueError as e:
+        ERRORS.inc(type="imu")
+        return {"status": "error", "error": str(e)}
+    if stage is None:
+        return None
+    with STAGE_DURATION.time(stage="imu"):
+        try:
+            info = stage.run(sdir)
+        except Exception as e:
+            ERRORS.inc(type="imu")
+            print(f"IMU analysis failed for session {sdir.name}: {e}", file=sys.stderr)
+            return {"status": "error", "error": str(e)}
+    if info and not info.get("reused"):
+        IMU_WINDOWS.inc(info["windows"])
+        print(f"Encoded {info['windows']} IMU windows for session {sdir.name} in {info['duration_sec']:.2f}s")
+    return info
+
+
+def synchrony_stage():
+    """The handler/dog synchrony stage configured from the environment, or None if unavailable."""
+    global _synchrony_stage
+    if _synchrony_stage is None and SynchronyStage is not None:
+        _synchrony_stage = SynchronyStage.from_env(SESSIONS)
+    return _synchrony_stage if _synchrony_stage is not None and _synchrony_stage.enabled else None
+
+
+def run_synchrony_analysis(sdir: pathlib.Path):
+    """Score handler_imu.json against imu.json; returns the results.json "synchrony" entry or None."""
+    try:
+        stage = synchrony_stage()
+    except ValueError as e:
+        ERRORS.inc(type="synchrony")
+        return {"status": "error", "error": str(e)}
+    if stage is None:
+        return None
+    with STAGE_DURATION.time(stage="synchrony"):
+        try:
+            info = stage.run(sdir)
+        except Exception as e:
+            ERRORS.inc(type="synchrony")
+            print(f"Synchrony analysis failed for session {sdir.name}: {e}", file=sys.stderr)
+            return {"status": "error", "error": str(e)}
+    if info and not info.get("reused"):
+        print(f"Scored synchrony over {info['windows']} windows for session {sdir.name} "
+              f"in {info['duration_sec']:.2f}s")
+    return info
+
+
+def _finish(sdir: pathlib.Path, result: dict, started: float):
+    """Run the IMU stages, write results.json and record the session's metrics."""
+    imu = run_imu_analysis(sdir)
+    if imu is not None:
+        result["imu"] = imu
+    synchrony = run_synchrony_analysis(sdir)
+    if synchrony is not None:
+        result["synchrony"] = synchrony
+    with STAGE_DURATION.time(stage="write"):
+        _write_json_atomic(sdir / "results.json", result)
+    STAGE_DURATION.observe(time.perf_counter() - started, stage="total")
+    SESSIONS_PROCESSED.inc(status=result["status"], cached=str(bool(result.get("cached"))).lower())
+    try:
+        UPLOAD_TO_RESULT.observe(max(0.0, time.time() - (sdir / "video.mp4").stat().st_mtime))
+    except OSError:
+        pass
+
+
 def run_for_session(sdir: pathlib.Path):
     """Run benchmark for given session directory and write atomic results.json."""
+    started = time.perf_counter()
     hef = find_hef()
     result = {
         "status": "starting",
@@ -118,32 +385,57 @@ def run_for_session(sdir: pathlib.Path):
 
     if not hef:
         result.update(status="error", error="No HEF found", raw_tail="")
-        _write_json_atomic(sdir / "results.json", result)
+        ERRORS.inc(type="no_hef")
+        _finish(sdir, result, started)
         return
 
     # Wait for video.mp4 to settle (size check)
     v = sdir / "video.mp4"
-    try:
-        s1 = v.stat().st_size
-        time.sleep(1.0)
-        s2 = v.stat().st_size
-        if s2 != s1:
+    with STAGE_DURATION.time(stage="settle"):
+        try:
+            s1 = v.stat().st_size
             time.sleep(1.0)
-    except FileNotFoundError:
-        pass
+            s2 = v.stat().st_size
+            if s2 != s1:
+                time.sleep(1.0)
+        except FileNotFoundError:
+            pass
+
+    start = time.time()
+    with STAGE_DURATION.time(stage="cache_lookup"):
+        try:
+            cache_key = benchmark_cache_key(hef)
+        except OSError as e:
+            print(f"Could not hash {hef}, skipping benchmark cache: {e}", file=sys.stderr)
+            cache_key = None
+
+        cached = None if (cache_key is None or consume_force_rebenchmark()) else lookup_benchmark_cache(cache_key)
+    if cached:
+        result.update(
+            status="ok",
+            summary=cached["summary"],
+            raw_tail=cached["raw_tail"],
+            model=pathlib.Path(hef).stem,
+            duration_sec=round(time.time() - start, 2),
+            cached=True,
+            benchmarked_at=cached["benchmarked_at"],
+        )
+        print(f"Reused cached benchmark for session {sdir.name}")
+        _finish(sdir, result, started)
+        return
 
     print(f"Starting benchmark for session {sdir.name}")
     start = time.time()
     try:
-        # Add timeout and better error handling for device issues
-        bench = subprocess.run(
+        # Add timeout and better error handling for device issues.
+        # stdout is parsed as it streams; only the last lines are kept.
+        bench, stdout_tail = stream_benchmark(
             ["hailortcli", "benchmark", "-t", "3", hef],  # Reduced from 5 to 3 seconds
-            capture_output=True, text=True, check=True, timeout=30
+            timeout=30
         )
         dur = time.time() - start
-        tail = _tail(bench.stdout, 12)
-        clean_tail = ANSI.sub("", tail)
-        summary = parse_benchmark(bench.stdout)
+        clean_tail = _tail(stdout_tail, 12)
+        summary = bench.to_summary()
 
         result.update(
             status="ok",
@@ -151,8 +443,18 @@ def run_for_session(sdir: pathlib.Path):
             raw_tail=clean_tail,
             model=pathlib.Path(hef).stem,
             duration_sec=round(dur, 2),
+            cached=False,
+            benchmarked_at=time.time(),
         )
         print(f"Completed benchmark for session {sdir.name} in {dur:.2f}s")
+        if cache_key:
+            store_benchmark_cache(cache_key, {
+                "summary": summary,
+                "raw_tail": clean_tail,
+                "hef": hef,
+                "benchmarked_at": result["benchmarked_at"],
+                "benchmark_duration_sec": round(dur, 2),
+            })
 
     except subprocess.TimeoutExpired as e:
         dur = time.time() - start
@@ -163,6 +465,7 @@ def run_for_session(sdir: pathlib.Path):
             model=pathlib.Path(hef).stem,
             duration_sec=round(dur, 2),
         )
+        ERRORS.inc(type="timeout")
         print(f"Benchmark timeout for session {sdir.name}")
         
     except subprocess.CalledProcessError as e:
@@ -180,6 +483,8 @@ def run_for_session(sdir: pathlib.Path):
                 model=pathlib.Path(hef).stem,
                 duration_sec=round(dur, 2),
             )
+            ERRORS.inc(type="device_busy")
+            STAGE_DURATION.observe(dur, stage="benchmark")
             print(f"Hailo device busy for session {sdir.name} - will retry")
             # Don't write results.json yet - let it retry later
             return
@@ -192,6 +497,7 @@ def run_for_session(sdir: pathlib.Path):
                 model=pathlib.Path(hef).stem,
                 duration_sec=round(dur, 2),
             )
+            ERRORS.inc(type="benchmark_failed")
             print(f"Benchmark failed for session {sdir.name}: {e.returncode}")
 
     except Exception as e:
@@ -203,9 +509,43 @@ def run_for_session(sdir: pathlib.Path):
             model=pathlib.Path(hef).stem,
             duration_sec=round(dur, 2),
         )
+        ERRORS.inc(type="unexpected")
         print(f"Unexpected error for session {sdir.name}: {e}")
 
-    _write_json_atomic(sdir / "results.json", result)
+    STAGE_DURATION.observe(time.time() - start, stage="benchmark")
+    _finish(sdir, result, started)
+
+
+def _export_metrics():
+    """Refresh the textfile collector output, if configured."""
+    if not METRICS_TEXTFILE:
+        return
+    try:
+        METRICS.write_textfile(METRICS_TEXTFILE)
+    except OSError as e:
+        print(f"Could not write metrics textfile: {e}", file=sys.stderr)
+
+
+def run_compaction(manifest: SessionsManifest, archive: SessionArchive):
+    """Archive old finished sessions and enforce the archive budget."""
+    with STAGE_DURATION.time(stage="compaction"):
+        archived = archive.compact(archive.candidates(manifest.sessions), limit=ARCHIVE_BATCH)
+        evicted = archive.evict()
+    ARCHIVED.inc(len(archived))
+    EVICTED.inc(len(evicted))
+    ARCHIVE_BYTES.set(sum(e["archive_bytes"] for e in archive.sessions.values()))
+    if archived or evicted:
+        print(f"Archived {len(archived)} sessions, evicted {len(evicted)} archives")
+        manifest.refresh(archived=archive.manifest_entries())
+        _save_manifest(manifest)
+
+
+def _save_manifest(manifest: SessionsManifest):
+    """Persist the sessions manifest; a failed write only costs API fallbacks."""
+    try:
+        manifest.save()
+    except OSError as e:
+        print(f"Could not write sessions manifest: {e}", file=sys.stderr)
 
 
 def main():
@@ -216,31 +556,32 @@ def main():
 
     print(f"Worker watching: {SESSIONS}")
     print(f"Worker running as user: {os.getuid()}")
+    if METRICS_PORT:
+        worker_metrics.start_http_server(METRICS, int(METRICS_PORT))
+        print(f"Worker metrics on :{METRICS_PORT}/metrics")
+    manifest = SessionsManifest(SESSIONS)
+    archive = SessionArchive.from_env(SESSIONS)
+    last_compaction = 0.0
+    profiling = ProfileTriggers.from_env(SESSIONS).install() if ProfileTriggers is not None else None
     
     while True:
         try:
-            # Find sessions that need processing
-            pending_sessions = []
+            if profiling is not None:
+                profiling.poll()
             
-            for sdir in SESSIONS.iterdir():
-                if not sdir.is_dir():
-                    continue
-                    
-                # Check permissions and ownership before processing
-                try:
-                    stat_info = sdir.stat()
-                except PermissionError as e:
-                    print(f"Permission denied accessing {sdir.name}: {e}", file=sys.stderr)
-                    continue
-                except Exception as e:
-                    print(f"Error checking {sdir.name}: {e}", file=sys.stderr)
-                    continue
-                
-                video_file = sdir / "video.mp4"
-                results_file = sdir / "results.json"
-                
-                if video_file.exists() and not results_file.exists():
-                    pending_sessions.append(sdir)
+            # Find sessions that need processing; finished sessions whose
+            # directory is unchanged are skipped without stat-ing their files
+            scan_start = time.perf_counter()
+            pending_sessions = manifest.refresh(archived=archive.manifest_entries())
+            for name, error in manifest.errors:
+                ERRORS.inc(type="permission" if isinstance(error, PermissionError) else "scan")
+            _save_manifest(manifest)
+            entries = manifest.entries_scanned
+            
+            SCAN_DURATION.observe(time.perf_counter() - scan_start)
+            SCAN_ENTRIES.set(entries)
+            PENDING_SESSIONS.set(len(pending_sessions))
+            _export_metrics()
             
             if pending_sessions:
                 print(f"Found {len(pending_sessions)} pending sessions")
@@ -252,11 +593,14 @@ def main():
                 try:
                     run_for_session(session_to_process)
                     print(f"Completed session: {session_to_process.name}")
+                    manifest.record(session_to_process)
+                    _save_manifest(manifest)
                     
                     # Add a small delay between sessions to let the device recover
                     time.sleep(1)
                     
                 except PermissionError as e:
+                    ERRORS.inc(type="permission")
                     print(f"Permission denied processing {session_to_process.name}: {e}", file=sys.stderr)
                     # Write a simple error results.json if we can
                     try:
@@ -272,13 +616,20 @@ def main():
                         pass  # Can't even write error file
                         
                 except Exception as e:
+                    ERRORS.inc(type="unexpected")
                     print(f"Error processing {session_to_process.name}: {e}", file=sys.stderr)
+                
+                _export_metrics()
             else:
-                # No pending sessions - shorter sleep
+                # No pending sessions - compact when due, then shorter sleep
+                if archive.enabled and time.time() - last_compaction >= ARCHIVE_INTERVAL:
+                    last_compaction = time.time()
+                    run_compaction(manifest, archive)
                 time.sleep(INTERVAL)
                 continue
                 
         except Exception as e:
+            ERRORS.inc(type="loop")
             print("loop error:", e, file=sys.stderr)
 
         time.sleep(INTERVAL)
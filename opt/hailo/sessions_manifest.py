@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Sessions Manifest
+-----------------
+
+Compact index of every session directory, maintained by session_worker.py
+so the Vapor API and other tools can list sessions without walking
+SESSIONS_DIR and stat-ing each file per request.
+
+SESSIONS/.manifest.json (written atomically, only when something changed):
+  {
+    "version": 1,
+    "updated": <unix time>,
+    "sessions": {
+      "<id>": {
+        "files": {"video.mp4": <bytes>, "imu.json": ..., "meta.json": ..., "results.json": ...,
+                  "imu_latents.npz": ...},
+        "mtime": <session dir mtime>,
+        "status": "pending" | "incomplete" | "ok" | "error" | "archived",
+        "summary": {...results.json summary...}   # when results exist
+      }
+    }
+  }
+
+After each save the manifest file's mtime is set to SESSIONS_DIR's mtime.
+Readers treat the manifest as current while the directory mtime is not newer
+than the manifest's; otherwise (e.g. a new upload since the last refresh) the
+manifest may be missing a session and they should fall back to a scan.
+"""
+
+import json
+import os
+import pathlib
+import sys
+import time
+
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 1
+SESSION_FILES = ("video.mp4", "imu.json", "meta.json", "results.json", "imu_latents.npz",
+                 "handler_imu.json", "synchrony.npz")
+
+# Fields copied from results.json into the manifest entry
+RESULT_FIELDS = ("ts", "model", "duration_sec", "cached", "error")
+SUMMARY_FIELDS = ("fps_hw_only", "fps_streaming", "latency_ms", "power_avg_w")
+
+
+def load_manifest(sessions_dir):
+    """Read SESSIONS/.manifest.json, or None if missing or unreadable."""
+    try:
+        manifest = json.loads((pathlib.Path(sessions_dir) / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+class SessionsManifest:
+    """Incrementally refreshed manifest of SESSIONS_DIR."""
+
+    def __init__(self, sessions_dir):
+        self.sessions_dir = pathlib.Path(sessions_dir)
+        self.path = self.sessions_dir / MANIFEST_NAME
+        existing = load_manifest(self.sessions_dir) or {}
+        self.sessions = existing.get("sessions", {})
+        self.entries_scanned = 0
+        self.errors = []
+        self._dirty = not existing
+
+    def refresh(self, archived=None):
+        """
+        Rescan SESSIONS_DIR and return pending session paths, oldest first.
+
+        Finished sessions whose directory mtime is unchanged are not
+        re-stat'ed. Pending ones always are, since a growing video.mp4 does
+        not touch the directory mtime. `archived` maps names of sessions
+        moved to the archive (see session_archive.py) to their entries.
+        """
+        archived = archived or {}
+        self.errors = []
+        self.entries_scanned = 0
+        if self._manifest_mtime_ns() < self.sessions_dir.stat().st_mtime_ns:
+            # Something was added, removed or rewritten since the last save;
+            # re-save even if no session changed so readers see it as current
+            self._dirty = True
+        seen = set()
+
+        with os.scandir(self.sessions_dir) as it:
+            for entry in it:
+                self.entries_scanned += 1
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if not entry.is_dir():
+                        continue
+                    mtime = entry.stat().st_mtime
+                except OSError as e:
+                    self.errors.append((entry.name, e))
+                    print(f"Error checking {entry.name}: {e}", file=sys.stderr)
+                    continue
+
+                seen.add(entry.name)
+                known = self.sessions.get(entry.name)
+                if known and known["mtime"] == mtime and known["status"] not in ("pending", "incomplete"):
+                    continue
+                self._update(entry.name, mtime)
+
+        for name in set(self.sessions) - seen:
+            if name not in archived:
+                del self.sessions[name]
+                self._dirty = True
+        for name, entry in archived.items():
+            if name not in seen and self.sessions.get(name) != entry:
+                self.sessions[name] = entry
+                self._dirty = True
+
+        pending = [name for name, s in self.sessions.items() if s["status"] == "pending"]
+        pending.sort(key=lambda name: self.sessions[name]["mtime"])
+        return [self.sessions_dir / name for name in pending]
+
+    def record(self, sdir):
+        """Refresh one session (e.g. right after its results.json was written)."""
+        sdir = pathlib.Path(sdir)
+        try:
+            self._update(sdir.name, sdir.stat().st_mtime)
+        except OSError as e:
+            print(f"Could not update manifest for {sdir.name}: {e}", file=sys.stderr)
+
+    def _update(self, name, mtime):
+        sdir = self.sessions_dir / name
+        files = {}
+        for filename in SESSION_FILES:
+            try:
+                files[filename] = (sdir / filename).stat().st_size
+            except OSError:
+                pass
+
+        entry = {"files": files, "mtime": mtime}
+        if "results.json" in files:
+            entry.update(self._result_fields(sdir / "results.json"))
+        else:
+            entry["status"] = "pending" if "video.mp4" in files else "incomplete"
+
+        if self.sessions.get(name) != entry:
+            self.sessions[name] = entry
+            self._dirty = True
+
+    @staticmethod
+    def _result_fields(path):
+        try:
+            results = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return {"status": "error", "error": "unreadable results.json"}
+        fields = {"status": results.get("status", "error")}
+        fields.update({k: results[k] for k in RESULT_FIELDS if results.get(k) is not None})
+        summary = results.get("summary") or {}
+        summary = {k: summary[k] for k in SUMMARY_FIELDS if summary.get(k) is not None}
+        if summary:
+            fields["summary"] = summary
+        return fields
+
+    def save(self):
+        """Write the manifest atomically if anything changed since the last save."""
+        if not self._dirty:
+            return False
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "updated": time.time(),
+            "sessions": self.sessions,
+        }
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(manifest, separators=(",", ":"), sort_keys=True))
+        tmp_path.replace(self.path)
+        # The rename itself bumped the directory mtime; mark the manifest as
+        # covering it
+        st = self.sessions_dir.stat()
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self._dirty = False
+        return True
+
+    def _manifest_mtime_ns(self):
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return -1
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Handler/Dog Synchrony Stage
+---------------------------
+
+Worker stage for session_worker.py: for sessions that carry the handler's
+IMU next to the dog's (handler_imu.json beside imu.json, same layout and
+sample rate), computes lag-aware cross-correlation over the model's sliding
+windows with synchrony_fft.py and writes SESSIONS/<id>/synchrony.npz
+(atomically):
+  lag           (windows,) int32 best lag in samples (positive: handler trails)
+  peak_r        (windows,) float32 channel-mean correlation at that lag
+  zero_lag_r    (windows,) float32 correlation without lag
+  score         (windows,) float32 (peak_r + 1) / 2
+  window_start  (windows,) int64 sample index of each window
+  window_size, hop, max_lag, sample_rate
+
+The session summary (mean score, median lag, ...) is recorded under
+"synchrony" in results.json.
+
+Configuration (environment):
+  SYNCHRONY_STAGE        on | off (default on; needs numpy)
+  SYNCHRONY_MAX_LAG_SEC  largest lag searched either way (default 0.3)
+  IMU_SAMPLE_RATE        sample rate of both streams in Hz (default 100)
+  IMU_MODEL_DIR          model_config.json with the window length and overlap
+                         (shared with imu_batch.py)
+"""
+
+import os
+import pathlib
+import time
+
+import numpy as np
+
+from imu_batch import _import_root, load_window_config, read_imu
+
+SYNCHRONY_NAME = "synchrony.npz"
+HANDLER_IMU_NAME = "handler_imu.json"
+
+
+def write_synchrony(path, result, window_size, hop, max_lag, sample_rate):
+    path = pathlib.Path(path)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **result, window_size=np.int32(window_size), hop=np.int32(hop),
+                 max_lag=np.int32(max_lag), sample_rate=np.float32(sample_rate))
+    tmp_path.replace(path)
+
+
+class SynchronyStage:
+    """Per-session handler/dog synchrony scoring"""
+
+    def __init__(self, model_dir, enabled=True, max_lag_sec=None, sample_rate=None):
+        self.sync = _import_root("synchrony_fft")
+        self.enabled = enabled
+        self.sample_rate = float(sample_rate or self.sync.DEFAULT_SAMPLE_RATE)
+        self.window_size, self.hop = load_window_config(pathlib.Path(model_dir) / "model_config.json")
+        max_lag_sec = self.sync.DEFAULT_MAX_LAG_SEC if max_lag_sec is None else max_lag_sec
+        self.max_lag = min(self.sync.max_lag_samples(self.sample_rate, max_lag_sec), self.window_size // 2)
+
+    @classmethod
+    def from_env(cls, sessions_dir):
+        setting = os.environ.get("SYNCHRONY_STAGE", "on")
+        if setting not in ("on", "off"):
+            raise ValueError(f"SYNCHRONY_STAGE must be on or off, got {setting!r}")
+        model_dir = os.environ.get("IMU_MODEL_DIR", str(pathlib.Path(sessions_dir).parent / "models" / "tcn_vae"))
+        max_lag_sec = os.environ.get("SYNCHRONY_MAX_LAG_SEC")
+        return cls(
+            model_dir,
+            enabled=setting == "on",
+            max_lag_sec=float(max_lag_sec) if max_lag_sec else None,
+            sample_rate=float(os.environ.get("IMU_SAMPLE_RATE", "0")) or None,
+        )
+
+    def _same_settings(self, existing):
+        """True if a stored synchrony.npz was computed with this stage's settings"""
+        return (int(existing["window_size"]) == self.window_size and int(existing["hop"]) == self.hop
+                and int(existing["max_lag"]) == self.max_lag
+                and np.isclose(float(existing["sample_rate"]), self.sample_rate))
+
+    def run(self, sdir):
+        """Score sdir/imu.json against sdir/handler_imu.json; None unless both exist"""
+        sdir = pathlib.Path(sdir)
+        dog_path, handler_path = sdir / "imu.json", sdir / HANDLER_IMU_NAME
+        out_path = sdir / SYNCHRONY_NAME
+        try:
+            inputs_mtime = max(dog_path.stat().st_mtime, handler_path.stat().st_mtime)
+        except FileNotFoundError:
+            return None
+
+        try:
+            if out_path.stat().st_mtime >= inputs_mtime:
+                with np.load(out_path) as existing:
+                    # Scores from another window, lag or rate setting are stale
+                    if self._same_settings(existing):
+                        result = {key: existing[key] for key in ("lag", "peak_r", "zero_lag_r", "score")}
+                        return {"status": "ok", "file": SYNCHRONY_NAME, "reused": True,
+                                **self.sync.summarize(result, self.sample_rate)}
+        except (OSError, ValueError, KeyError):
+            pass
+
+        start = time.time()
+        dog = read_imu(dog_path)
+        handler = read_imu(handler_path)
+        result = self.sync.session_synchrony(dog, handler, self.window_size, self.hop, self.max_lag)
+        write_synchrony(out_path, result, self.window_size, self.hop, self.max_lag, self.sample_rate)
+        return {
+            "status": "ok",
+            "file": SYNCHRONY_NAME,
+            "samples": min(len(dog), len(handler)),
+            "max_lag_ms": round(self.max_lag * 1000 / self.sample_rate, 1),
+            **self.sync.summarize(result, self.sample_rate),
+            "duration_sec": round(time.time() - start, 2),
+        }
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Worker Profiling Triggers
+-------------------------
+
+On-demand CPU and memory profiles of a running session_worker.py without a
+restart, written to SESSIONS/.debug/:
+  worker-cpu-<time>.folded / .svg   sampling profile (folded stacks + flame graph)
+  worker-memory-<time>.json         tracemalloc top allocation sites
+
+Triggers:
+  kill -USR1 <pid>                  CPU profile
+  kill -USR2 <pid>                  memory profile
+  touch SESSIONS/.profile           CPU profile, picked up by the scan loop
+  touch SESSIONS/.profile_memory    memory profile, picked up by the scan loop
+A control file may contain the capture length in seconds. Signals also
+reach the worker while a long benchmark or IMU stage holds the scan loop.
+
+Captures run on a background thread while the worker keeps going; one at a
+time. When idle the cost is two failed file opens per scan (see
+debug_profiler.py at the repo root for the samplers).
+
+Configuration (environment):
+  WORKER_PROFILE_SECONDS   default capture length (default 30)
+"""
+
+import json
+import os
+import pathlib
+import signal
+import sys
+import threading
+import time
+
+try:
+    import debug_profiler
+except ImportError:
+    # Worker runs from the repo checkout (opt/hailo)
+    sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+    import debug_profiler
+
+DEBUG_DIR_NAME = ".debug"
+CPU_TRIGGER_NAME = ".profile"
+MEMORY_TRIGGER_NAME = ".profile_memory"
+MAX_SECONDS = 600
+
+
+def _write_atomic(path, text):
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(text)
+    tmp_path.replace(path)
+
+
+class ProfileTriggers:
+    """Signal and control-file triggered profiles of the current process"""
+
+    def __init__(self, sessions_dir, seconds=30.0):
+        self.sessions_dir = pathlib.Path(sessions_dir)
+        self.out_dir = self.sessions_dir / DEBUG_DIR_NAME
+        self.seconds = seconds
+        self._busy = threading.Lock()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, sessions_dir):
+        return cls(sessions_dir, seconds=float(os.environ.get("WORKER_PROFILE_SECONDS", "30")))
+
+    def install(self):
+        """Register the SIGUSR1 / SIGUSR2 handlers (main thread only)"""
+        signal.signal(signal.SIGUSR1, lambda signum, frame: self.trigger("cpu"))
+        signal.signal(signal.SIGUSR2, lambda signum, frame: self.trigger("memory"))
+        return self
+
+    def _consume(self, name):
+        """Capture seconds requested by a control file (removed), or None if absent"""
+        path = self.sessions_dir / name
+        try:
+            text = path.read_text().strip()
+            path.unlink()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"Could not consume {path}: {e}", file=sys.stderr)
+            return None
+        try:
+            return float(text) if text else self.seconds
+        except ValueError:
+            return self.seconds
+
+    def poll(self):
+        """Start captures requested through control files; returns the kinds started"""
+        started = []
+        for kind, name in (("cpu", CPU_TRIGGER_NAME), ("memory", MEMORY_TRIGGER_NAME)):
+            seconds = self._consume(name)
+            if seconds is None:
+                continue
+            if self.trigger(kind, seconds):
+                started.append(kind)
+            else:
+                print(f"Profile request ({kind}) ignored, a capture is already running", file=sys.stderr)
+        return started
+
+    def trigger(self, kind, seconds=None):
+        """Start a capture in the background; False if one is already running.
+
+        Safe to call from a signal handler: it only starts a thread.
+        """
+        if not self._busy.acquire(blocking=False):
+            return False
+        seconds = min(max(self.seconds if seconds is None else seconds, 0.1), MAX_SECONDS)
+        self._thread = threading.Thread(target=self._capture, args=(kind, seconds),
+                                        name=f"profile-{kind}", daemon=True)
+        self._thread.start()
+        return True
+
+    def wait(self, timeout=None):
+        """Block until the running capture (if any) has been written"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _capture(self, kind, seconds):
+        try:
+            print(f"Profiling worker ({kind}) for {seconds:g}s")
+            self.out_dir.mkdir(exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            if kind == "cpu":
+                profiler = debug_profiler.profile(seconds)
+                base = self.out_dir / f"worker-cpu-{stamp}"
+                _write_atomic(base.with_suffix(".folded"), profiler.folded())
+                _write_atomic(base.with_suffix(".svg"), profiler.svg(f"Session worker CPU profile (pid {os.getpid()})"))
+                written = base.with_suffix(".svg")
+            else:
+                report = debug_profiler.memory_report(seconds)
+                written = self.out_dir / f"worker-memory-{stamp}.json"
+                _write_atomic(written, json.dumps(report, indent=2))
+            print(f"Wrote {written}")
+        except Exception as e:
+            print(f"Profile capture ({kind}) failed: {e}", file=sys.stderr)
+        finally:
+            self._busy.release()
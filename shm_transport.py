@@ -0,0 +1,284 @@
+"""
+Shared-Memory Inference Transport
+Same-host path between the session worker and the Hailo sidecar: IMU windows
+are written once into a POSIX shared-memory ring and the sidecar encodes
+them straight from the mapped buffer, so no HTTP request or JSON encoding
+sits between the two processes. The HTTP /infer and /infer/batch endpoints
+stay for remote clients.
+
+Layout: the client (worker) creates one SharedMemory block of `slots`
+slots, each holding
+    input   float32 (slot_windows, window, channels)
+    latent  float32 (slot_windows, latent_dim)
+    scores  float32 (slot_windows, num_motifs)
+
+Signaling runs over a Unix stream socket:
+    client -> {"op": "info"}\\n         server -> {"window", "channels", "latent_dim", "num_motifs"}\\n
+    client -> {"op": "attach", "shm", "slots", "slot_windows"}\\n   server -> {"ok": true}\\n
+    then per batch: client -> REQUEST (slot, n)   server -> REPLY (slot, n, status)
+
+The client keeps up to `slots` batches in flight, so it fills the next slot
+while the sidecar encodes the previous one. Replies come back in request
+order on a connection.
+"""
+
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+REQUEST = struct.Struct("<II")    # slot, windows
+REPLY = struct.Struct("<IIi")     # slot, windows, status
+STATUS_OK = 0
+STATUS_ERROR = 1
+STATUS_BAD_REQUEST = 2
+
+# Blocks created by clients in this process (tests and benchmarks run both ends in one)
+_created = set()
+
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) < size:
+        raise ConnectionError("peer closed the connection")
+    return data
+
+
+def _send_json(sock, message):
+    sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def _recv_json(stream):
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("peer closed the connection")
+    return json.loads(line)
+
+
+def _attach(name):
+    """Attach to an existing block without letting this process's resource
+    tracker unlink it at exit (the creating client owns it)"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(name=name)
+        if name not in _created:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class SlotRing:
+    """NumPy views over the slots of one shared-memory block"""
+
+    def __init__(self, buf, slots, slot_windows, window, channels, latent_dim, num_motifs):
+        self.slots = slots
+        self.slot_windows = slot_windows
+        shapes = ((window, channels), (latent_dim,), (num_motifs,))
+        offset = 0
+        views = []
+        for shape in shapes:
+            count = slots * slot_windows * int(np.prod(shape))
+            views.append(np.ndarray((slots, slot_windows) + shape, dtype=np.float32, buffer=buf, offset=offset))
+            offset += count * 4
+        self.inputs, self.latents, self.scores = views
+
+    @staticmethod
+    def nbytes(slots, slot_windows, window, channels, latent_dim, num_motifs):
+        return slots * slot_windows * (window * channels + latent_dim + num_motifs) * 4
+
+
+class ShmServer:
+    """Sidecar side: serves every connecting client from its own ring.
+
+    infer_batch((n, window, channels) float32) -> (latents, scores) is called
+    on a view of the shared buffer and must not keep a reference to it.
+    """
+
+    def __init__(self, socket_path, infer_batch, window, channels, latent_dim, num_motifs):
+        self.socket_path = socket_path
+        self.infer_batch = infer_batch
+        self.info = {"window": window, "channels": channels, "latent_dim": latent_dim, "num_motifs": num_motifs}
+        self._sock = None
+        self.connections = 0
+
+    def start(self):
+        """Bind the socket and accept clients from a daemon thread"""
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(self.socket_path)
+        self._sock.listen()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+    def _accept_loop(self):
+        while self._sock is not None:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        shm = ring = None
+        self.connections += 1
+        try:
+            with conn, conn.makefile("rb") as stream:
+                if _recv_json(stream).get("op") != "info":
+                    return
+                _send_json(conn, self.info)
+                attach = _recv_json(stream)
+                try:
+                    shm = _attach(attach["shm"])
+                    ring = SlotRing(shm.buf, attach["slots"], attach["slot_windows"], **self.info)
+                except (KeyError, OSError, TypeError, ValueError) as e:
+                    _send_json(conn, {"ok": False, "error": str(e)})
+                    return
+                _send_json(conn, {"ok": True})
+
+                while True:
+                    slot, n = REQUEST.unpack(_read_exact(stream, REQUEST.size))
+                    conn.sendall(REPLY.pack(slot, n, self._run(ring, slot, n)))
+        except ConnectionError:
+            pass
+        except Exception as e:
+            logger.error(f"Shared-memory client failed: {e}")
+        finally:
+            self.connections -= 1
+            # The views must go before the mapping can be closed
+            ring = None
+            if shm is not None:
+                shm.close()
+
+    def _run(self, ring, slot, n):
+        if slot >= ring.slots or n > ring.slot_windows:
+            return STATUS_BAD_REQUEST
+        try:
+            latents, scores = self.infer_batch(ring.inputs[slot, :n])
+            ring.latents[slot, :n] = latents
+            ring.scores[slot, :n] = scores
+        except Exception as e:
+            logger.error(f"Shared-memory inference failed: {e}")
+            return STATUS_ERROR
+        return STATUS_OK
+
+
+class ShmClient:
+    """Worker side: owns the shared-memory block and submits batches.
+
+    Not thread-safe; use one client per thread.
+    """
+
+    def __init__(self, socket_path, slots=4, slot_windows=16, timeout=60):
+        self.slots = slots
+        self.slot_windows = slot_windows
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(socket_path)
+        self._stream = self._sock.makefile("rb")
+        self.shm = None
+        try:
+            _send_json(self._sock, {"op": "info"})
+            self.info = _recv_json(self._stream)
+            self.shm = shared_memory.SharedMemory(create=True, size=SlotRing.nbytes(slots, slot_windows, **self.info))
+            _created.add(self.shm.name)
+            self.ring = SlotRing(self.shm.buf, slots, slot_windows, **self.info)
+            _send_json(self._sock, {"op": "attach", "shm": self.shm.name, "slots": slots,
+                                    "slot_windows": slot_windows})
+            reply = _recv_json(self._stream)
+            if not reply.get("ok"):
+                raise ConnectionError(f"sidecar could not attach shared memory: {reply.get('error')}")
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def infer(self, windows):
+        """Encode (n, window, channels) windows; returns (n, latent_dim) and (n, num_motifs)"""
+        windows = np.asarray(windows, dtype=np.float32)
+        expected = (self.info["window"], self.info["channels"])
+        if windows.shape[1:] != expected:
+            raise ValueError(f"expected (n, {expected[0]}, {expected[1]}) windows, got {windows.shape}")
+        latents = np.empty((len(windows), self.info["latent_dim"]), dtype=np.float32)
+        scores = np.empty((len(windows), self.info["num_motifs"]), dtype=np.float32)
+
+        if self.ring is None:
+            raise ConnectionError("shared-memory client is closed")
+
+        chunks = [(i, min(i + self.slot_windows, len(windows))) for i in range(0, len(windows), self.slot_windows)]
+        in_flight = []
+        failed = None
+        try:
+            for index, (start, stop) in enumerate(chunks):
+                if len(in_flight) == self.slots:
+                    failed = self._collect(in_flight.pop(0), latents, scores)
+                    if failed is not None:
+                        break
+                slot = index % self.slots
+                # The one copy of the samples: straight into the mapped slot
+                self.ring.inputs[slot, :stop - start] = windows[start:stop]
+                self._sock.sendall(REQUEST.pack(slot, stop - start))
+                in_flight.append((slot, start, stop))
+            # Read every outstanding reply, even after a failed slot, so the
+            # next call on this connection starts from a clean stream
+            for pending in in_flight:
+                reply = self._collect(pending, latents, scores)
+                failed = failed or reply
+        except BaseException:
+            # A half-read stream cannot be resynchronised: drop the connection
+            self.close()
+            raise
+        if failed is not None:
+            slot, status = failed
+            raise RuntimeError(f"sidecar inference failed for slot {slot} (status {status})")
+        return latents, scores
+
+    __call__ = infer
+
+    def _collect(self, pending, latents, scores):
+        """Read one reply; returns (slot, status) if the sidecar failed it"""
+        slot, start, stop = pending
+        reply_slot, n, status = REPLY.unpack(_read_exact(self._stream, REPLY.size))
+        if reply_slot != slot or n != stop - start:
+            raise ConnectionError(f"out of order reply: slot {reply_slot} for {slot}")
+        if status != STATUS_OK:
+            return slot, status
+        latents[start:stop] = self.ring.latents[slot, :n]
+        scores[start:stop] = self.ring.scores[slot, :n]
+        return None
+
+    def close(self):
+        self.ring = None
+        try:
+            self._stream.close()
+            self._sock.close()
+        except (AttributeError, OSError):
+            pass
+        if self.shm is not None:
+            _created.discard(self.shm.name)
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
@@ -0,0 +1,142 @@
+"""
+Handler/Dog Synchrony (NumPy FFT)
+Sliding-window, lag-aware cross-correlation between two 9-channel IMU
+streams, e.g. the dog's imu_data and the handler's handler_imu_data.
+
+For every window and every lag in [-max_lag, max_lag] the Pearson
+correlation of the overlapping samples is computed per channel, then
+averaged over the selected channels:
+
+    r[k] = corr(a[t], b[t + k])     positive k: b trails a by k samples
+
+The raw products come from one batched real FFT per block of windows
+(zero-padded so lags do not wrap around), and the overlap means and
+variances from prefix sums, so the cost per window is O(N log N) per
+channel regardless of max_lag.
+
+Per window the result holds:
+  lag          lag (samples) with the highest mean correlation
+  peak_r       that correlation, in [-1, 1]
+  zero_lag_r   the correlation without any lag
+  score        (peak_r + 1) / 2, on the [0, 1] scale of synchrony_score
+
+Used by the conversion scripts (convert_for_pisrv.py --synchrony) and by
+the session worker's synchrony stage (opt/hailo/synchrony_stage.py).
+"""
+
+import numpy as np
+
+IMU_CHANNELS = 9
+DEFAULT_MAX_LAG_SEC = 0.3
+DEFAULT_SAMPLE_RATE = 100
+
+# Windows per FFT block: keeps the spectra and prefix sums cache-friendly
+# (a few MB) and was the fastest size measured for 100-sample windows
+DEFAULT_BATCH_SIZE = 512
+
+
+def sliding_windows(stream, window, hop):
+    """(n, channels) stream -> zero-copy (windows, window, channels) view and window start samples"""
+    stream = np.asarray(stream)
+    if len(stream) < window:
+        return np.empty((0, window, stream.shape[1]), dtype=stream.dtype), np.empty(0, dtype=np.int64)
+    view = np.lib.stride_tricks.sliding_window_view(stream, window, axis=0)[::hop]
+    return view.transpose(0, 2, 1), np.arange(len(view), dtype=np.int64) * hop
+
+
+def max_lag_samples(sample_rate=DEFAULT_SAMPLE_RATE, max_lag_sec=DEFAULT_MAX_LAG_SEC):
+    return int(round(max_lag_sec * sample_rate))
+
+
+def lagged_correlation(a, b, max_lag, channels=None):
+    """(w, n, c) window pairs -> (w, 2 * max_lag + 1) channel-mean Pearson correlation per lag"""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    if a.shape != b.shape or a.ndim != 3:
+        raise ValueError(f"expected two (windows, samples, channels) arrays of one shape, got {a.shape} and {b.shape}")
+    n = a.shape[1]
+    if not 0 <= max_lag < n // 2 + 1:
+        raise ValueError(f"max_lag must be in [0, {n // 2}] for {n}-sample windows, got {max_lag}")
+    if channels is not None:
+        a, b = a[:, :, channels], b[:, :, channels]
+
+    # (w, c, n), centered per window so the raw sums below stay well conditioned
+    a = a.transpose(0, 2, 1)
+    b = b.transpose(0, 2, 1)
+    a = a - a.mean(axis=2, keepdims=True)
+    b = b - b.mean(axis=2, keepdims=True)
+
+    # sum_t a[t] b[t + k] for every lag; padding to n + max_lag keeps lags from wrapping
+    nfft = 1 << int(n + max_lag - 1).bit_length()
+    spectrum = np.conj(np.fft.rfft(a, nfft)) * np.fft.rfft(b, nfft)
+    raw = np.fft.irfft(spectrum, nfft)
+    lags = np.arange(-max_lag, max_lag + 1)
+    s_ab = raw[..., lags % nfft]
+
+    # Overlap of each lag: a[a0:a1] against b[b0:b1], count n - |k|
+    a0 = np.maximum(-lags, 0)
+    a1 = n - np.maximum(lags, 0)
+    b0 = np.maximum(lags, 0)
+    b1 = n + np.minimum(lags, 0)
+    count = (n - np.abs(lags)).astype(np.float64)
+
+    zero = np.zeros(a.shape[:2] + (1,))
+    ca = np.concatenate([zero, np.cumsum(a, axis=2)], axis=2)
+    ca2 = np.concatenate([zero, np.cumsum(a * a, axis=2)], axis=2)
+    cb = np.concatenate([zero, np.cumsum(b, axis=2)], axis=2)
+    cb2 = np.concatenate([zero, np.cumsum(b * b, axis=2)], axis=2)
+    s_a = ca[..., a1] - ca[..., a0]
+    s_b = cb[..., b1] - cb[..., b0]
+    var_a = ca2[..., a1] - ca2[..., a0] - s_a * s_a / count
+    var_b = cb2[..., b1] - cb2[..., b0] - s_b * s_b / count
+
+    cov = s_ab - s_a * s_b / count
+    denom = np.sqrt(np.clip(var_a, 0, None) * np.clip(var_b, 0, None))
+    # Flat channels (zero variance over the overlap) count as uncorrelated
+    r = np.divide(cov, denom, out=np.zeros_like(cov), where=denom > 1e-12 * n)
+    return np.clip(r, -1, 1).mean(axis=1)
+
+
+def synchrony(a, b, max_lag, channels=None, batch_size=DEFAULT_BATCH_SIZE):
+    """(w, n, c) window pairs -> dict of per-window lag, peak_r, zero_lag_r and score arrays"""
+    windows = len(a)
+    out = {
+        "lag": np.empty(windows, dtype=np.int32),
+        "peak_r": np.empty(windows, dtype=np.float32),
+        "zero_lag_r": np.empty(windows, dtype=np.float32),
+    }
+    for i in range(0, windows, batch_size):
+        r = lagged_correlation(a[i:i + batch_size], b[i:i + batch_size], max_lag, channels)
+        best = r.argmax(axis=1)
+        out["lag"][i:i + len(r)] = best - max_lag
+        out["peak_r"][i:i + len(r)] = r[np.arange(len(r)), best]
+        out["zero_lag_r"][i:i + len(r)] = r[:, max_lag]
+    out["score"] = (out["peak_r"] + 1) / 2
+    return out
+
+
+def session_synchrony(a, b, window, hop, max_lag, channels=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Score two (n, c) streams of one session over sliding windows.
+
+    The streams are compared sample for sample up to the shorter one's length.
+    Returns the synchrony() dict plus window_start.
+    """
+    n = min(len(a), len(b))
+    a_windows, starts = sliding_windows(np.asarray(a)[:n], window, hop)
+    b_windows, _ = sliding_windows(np.asarray(b)[:n], window, hop)
+    out = synchrony(a_windows, b_windows, max_lag, channels, batch_size)
+    out["window_start"] = starts
+    return out
+
+
+def summarize(result, sample_rate=DEFAULT_SAMPLE_RATE):
+    """Session-level summary of a synchrony() result, JSON-serializable"""
+    if not len(result["score"]):
+        return {"windows": 0}
+    return {
+        "windows": int(len(result["score"])),
+        "mean_score": round(float(result["score"].mean()), 4),
+        "median_lag_ms": round(float(np.median(result["lag"])) * 1000 / sample_rate, 1),
+        "mean_peak_r": round(float(result["peak_r"].mean()), 4),
+        "mean_zero_lag_r": round(float(result["zero_lag_r"].mean()), 4),
+    }
@@ -0,0 +1,467 @@
+"""
+TCN-VAE Encoder Inference (NumPy)
+CPU implementation of the TCN-VAE encoder used by the Hailo sidecar, plus an
+incremental mode for streams of overlapping windows.
+
+Architecture (from model_config.json):
+  - one TemporalBlock per entry in hidden_dims, dilation 2**i, kernel 3:
+      causal conv -> ReLU -> causal conv -> ReLU, plus residual
+      (1x1 conv when the channel count changes), then ReLU
+  - mean over time -> fc_mu (latent_dim) -> motif_head (softmax scores)
+
+Weights are read from an .npz with PyTorch-style names and layouts
+(e.g. blocks.0.conv1.weight with shape (out, in, kernel)), or from the
+trained .pth state dict when torch is installed.
+
+quantize_int8() builds the CPU fallback used when the Hailo accelerator is
+busy or absent: int8 weights per output channel and int8 activations
+quantized per row at run time (dynamic quantization). With torch installed,
+torch_int8_engine() runs the same model through torch's quantized kernels
+(fbgemm on x86, qnnpack on ARM).
+"""
+
+import copy
+import json
+import logging
+import re
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+KERNEL_SIZE = 3
+DEFAULT_NUM_MOTIFS = 12
+
+
+class CausalConv:
+    """Dilated causal Conv1d evaluated as a single matmul over gathered taps"""
+
+    def __init__(self, weight, bias, dilation):
+        out_channels, in_channels, kernel = weight.shape
+        self.dilation = dilation
+        self.kernel = kernel
+        self.in_channels = in_channels
+        # (kernel * in, out), rows ordered [tap][in_channel]; tap kernel-1
+        # multiplies the current sample
+        self.matrix = np.ascontiguousarray(weight.transpose(2, 1, 0).reshape(kernel * in_channels, out_channels),
+                                           dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+
+    @property
+    def context(self):
+        """How many earlier positions an output depends on"""
+        return (self.kernel - 1) * self.dilation
+
+    def pad(self, x):
+        """Prepend the causal zero padding to x (time, in)"""
+        if not self.context:
+            return x
+        return np.concatenate((np.zeros((self.context, x.shape[1]), dtype=np.float32), x))
+
+    def spans(self, padded, ranges):
+        """Outputs for the time positions in ranges [(start, stop), ...], given pad(x)"""
+        return self._project(self._gather(padded, ranges))
+
+    def _gather(self, padded, ranges):
+        """im2col: one row of kernel * in taps per output position"""
+        rows = sum(stop - start for start, stop in ranges)
+        cols = np.empty((rows, self.kernel * self.in_channels), dtype=np.float32)
+        row = 0
+        for start, stop in ranges:
+            n = stop - start
+            for j in range(self.kernel):
+                offset = start + j * self.dilation
+                cols[row:row + n, j * self.in_channels:(j + 1) * self.in_channels] = padded[offset:offset + n]
+            row += n
+        return cols
+
+    def _project(self, cols):
+        out = cols @ self.matrix
+        out += self.bias
+        return out
+
+    def __call__(self, x):
+        if x.ndim == 3:
+            return self._batched(x)
+        return self.spans(self.pad(x), ((0, len(x)),))
+
+    def _batched(self, x):
+        """(batch, time, in) -> (batch, time, out) as one matmul over all windows"""
+        batch, length, _ = x.shape
+        if self.context:
+            x = np.concatenate((np.zeros((batch, self.context, self.in_channels), dtype=np.float32), x), axis=1)
+        cols = np.empty((batch, length, self.kernel * self.in_channels), dtype=np.float32)
+        for j in range(self.kernel):
+            offset = j * self.dilation
+            cols[:, :, j * self.in_channels:(j + 1) * self.in_channels] = x[:, offset:offset + length]
+        return self._project(cols.reshape(batch * length, -1)).reshape(batch, length, -1)
+
+
+class Int8CausalConv(CausalConv):
+    """CausalConv with dynamically quantized int8 weights and activations"""
+
+    def __init__(self, conv):
+        self.dilation = conv.dilation
+        self.kernel = conv.kernel
+        self.in_channels = conv.in_channels
+        self.bias = conv.bias
+        # Symmetric per-output-channel weight scales
+        self.weight_scale = np.maximum(np.abs(conv.matrix).max(axis=0), 1e-12) / 127.0
+        self.weight_int8 = np.round(conv.matrix / self.weight_scale).astype(np.int8)
+        # int8 x int8 products summed in float32 are exact while
+        # kernel * in * 127**2 < 2**24, which holds for every layer here
+        self.matrix = self.weight_int8.astype(np.float32)
+
+    def _project(self, cols):
+        scale = np.maximum(np.abs(cols).max(axis=1, keepdims=True), 1e-12) / 127.0
+        quantized = np.round(cols / scale)
+        out = quantized @ self.matrix
+        out *= scale
+        out *= self.weight_scale
+        out += self.bias
+        return out
+
+
+class TemporalBlock:
+    """Two causal convolutions with a residual connection"""
+
+    def __init__(self, weights, prefix, dilation):
+        self.conv1 = CausalConv(weights[f"{prefix}.conv1.weight"], weights[f"{prefix}.conv1.bias"], dilation)
+        self.conv2 = CausalConv(weights[f"{prefix}.conv2.weight"], weights[f"{prefix}.conv2.bias"], dilation)
+        self.downsample = None
+        if f"{prefix}.downsample.weight" in weights:
+            self.downsample = CausalConv(weights[f"{prefix}.downsample.weight"],
+                                         weights[f"{prefix}.downsample.bias"], 1)
+
+    @property
+    def context(self):
+        return self.conv1.context + self.conv2.context
+
+    def __call__(self, x):
+        h = np.maximum(self.conv1(x), 0)
+        h = np.maximum(self.conv2(h), 0)
+        residual = x if self.downsample is None else self.downsample(x)
+        return np.maximum(h + residual, 0)
+
+
+class TCNEncoder:
+    """TCN-VAE encoder: (window, channels) -> latent mean and motif scores"""
+
+    def __init__(self, weights, hidden_dims):
+        self.blocks = [TemporalBlock(weights, f"blocks.{i}", 2 ** i) for i in range(len(hidden_dims))]
+        self.fc_mu = (np.asarray(weights["fc_mu.weight"], dtype=np.float32).T,
+                      np.asarray(weights["fc_mu.bias"], dtype=np.float32))
+        self.motif_head = (np.asarray(weights["motif_head.weight"], dtype=np.float32).T,
+                           np.asarray(weights["motif_head.bias"], dtype=np.float32))
+
+    @classmethod
+    def from_config(cls, config_path, weights_path=None, num_motifs=DEFAULT_NUM_MOTIFS, seed=0):
+        """Build from model_config.json; random weights if weights_path is missing"""
+        with open(config_path) as f:
+            config = json.load(f)
+        hidden_dims = config["hidden_dims"]
+
+        if weights_path and Path(weights_path).exists():
+            weights = load_weights(weights_path)
+        else:
+            logger.warning("TCN weights %s not found, using untrained random weights", weights_path)
+            weights = random_weights(config["input_dim"], hidden_dims, config["latent_dim"], num_motifs, seed)
+        return cls(weights, hidden_dims)
+
+    @property
+    def receptive_field(self):
+        return 1 + sum(block.context for block in self.blocks)
+
+    def features(self, window):
+        x = np.asarray(window, dtype=np.float32)
+        for block in self.blocks:
+            x = block(x)
+        return x
+
+    def head(self, features, latent_out=None, scores_out=None):
+        """Pool per-timestep features into (latent, motif_scores).
+
+        latent_out / scores_out: optional float32 arrays of the output shapes
+        to write into instead of allocating (the sidecar's buffer pool).
+        """
+        pooled = features.mean(axis=-2)
+        latent = np.matmul(pooled, self.fc_mu[0], out=latent_out)
+        latent += self.fc_mu[1]
+        logits = latent @ self.motif_head[0]
+        logits += self.motif_head[1]
+        scores = np.subtract(logits, logits.max(axis=-1, keepdims=True), out=scores_out)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=-1, keepdims=True)
+        return latent, scores
+
+    def __call__(self, window, latent_out=None, scores_out=None):
+        return self.head(self.features(window), latent_out, scores_out)
+
+    def batch(self, windows, batch_size=64):
+        """Encode (n, window, channels) windows; returns (n, latent_dim) and (n, num_motifs).
+
+        Each chunk of batch_size windows runs every convolution as a single
+        matmul, so per-call overhead is paid once per chunk instead of once
+        per window. Memory grows with batch_size (about 80 KB of im2col
+        buffer per 100-sample window at 256 channels).
+        """
+        windows = np.asarray(windows, dtype=np.float32)
+        latents, scores = [], []
+        for start in range(0, len(windows), batch_size):
+            latent, score = self.head(self.features(windows[start:start + batch_size]))
+            latents.append(latent)
+            scores.append(score)
+        if not latents:
+            return (np.empty((0, len(self.fc_mu[1])), dtype=np.float32),
+                    np.empty((0, len(self.motif_head[1])), dtype=np.float32))
+        return np.concatenate(latents), np.concatenate(scores)
+
+    def quantize_int8(self):
+        """Copy of this encoder with every convolution quantized to int8"""
+        quantized = copy.copy(self)
+        quantized.blocks = []
+        for block in self.blocks:
+            block = copy.copy(block)
+            block.conv1 = Int8CausalConv(block.conv1)
+            block.conv2 = Int8CausalConv(block.conv2)
+            if block.downsample is not None:
+                block.downsample = Int8CausalConv(block.downsample)
+            quantized.blocks.append(block)
+        return quantized
+
+
+class IncrementalTCN:
+    """Streaming wrapper that reuses activations shared by overlapping windows.
+
+    When a window is the previous one shifted by `hop` samples, every
+    intermediate activation at position p equals the cached one at p + hop
+    as long as p's receptive field does not reach the zero padding before
+    the window start. Only those early positions and the `hop` new ones are
+    recomputed; the result matches full recomputation.
+    """
+
+    def __init__(self, encoder, hop):
+        self.encoder = encoder
+        self.hop = hop
+        self._window = None
+        self._cache = None
+        self.incremental_windows = 0
+        self.full_windows = 0
+
+    def reset(self):
+        self._window = None
+        self._cache = None
+
+    def __call__(self, window):
+        window = np.asarray(window, dtype=np.float32)
+        if self._can_shift(window):
+            features = self._shifted_features(window)
+            self.incremental_windows += 1
+        else:
+            features = self._full_features(window)
+            self.full_windows += 1
+        self._window = window.copy()
+        return self.encoder.head(features)
+
+    def _can_shift(self, window):
+        previous = self._window
+        return (previous is not None and previous.shape == window.shape and self.hop < len(window)
+                and np.array_equal(previous[self.hop:], window[:-self.hop]))
+
+    def _full_features(self, x):
+        cache = []
+        for block in self.encoder.blocks:
+            h1 = np.maximum(block.conv1(x), 0)
+            h2 = np.maximum(block.conv2(h1), 0)
+            residual = x if block.downsample is None else block.downsample(x)
+            x = np.maximum(h2 + residual, 0)
+            cache.append((h1, x))
+        self._cache = cache
+        return x
+
+    def _update(self, cached, compute, length, dirty):
+        """Shift cached activations by hop and recompute dirty + new positions"""
+        keep = length - self.hop
+        dirty = min(dirty, keep)
+        ranges = ((0, dirty), (keep, length)) if dirty else ((keep, length),)
+        out = np.empty_like(cached)
+        out[dirty:keep] = cached[self.hop + dirty:]
+        fresh = compute(ranges)
+        out[:dirty] = fresh[:dirty]
+        out[keep:] = fresh[dirty:]
+        return out
+
+    def _shifted_features(self, x):
+        length = len(x)
+        dirty = 0
+        cache = []
+        for block, (h1_cached, out_cached) in zip(self.encoder.blocks, self._cache):
+            x_padded = block.conv1.pad(x)
+            dirty1 = min(dirty + block.conv1.context, length)
+            h1 = self._update(h1_cached, lambda r: np.maximum(block.conv1.spans(x_padded, r), 0), length, dirty1)
+
+            h1_padded = block.conv2.pad(h1)
+
+            def conv2_residual(ranges):
+                h2 = np.maximum(block.conv2.spans(h1_padded, ranges), 0)
+                if block.downsample is None:
+                    h2 += np.concatenate([x[a:b] for a, b in ranges])
+                else:
+                    h2 += block.downsample.spans(x, ranges)
+                return np.maximum(h2, 0, out=h2)
+
+            dirty2 = min(dirty1 + block.conv2.context, length)
+            out = self._update(out_cached, conv2_residual, length, dirty2)
+            cache.append((h1, out))
+            x, dirty = out, dirty2
+        self._cache = cache
+        return x
+
+
+def load_weights(path):
+    """Weights dict from an .npz, or from a .pth state dict (requires torch)"""
+    path = Path(path)
+    if path.suffix == ".npz":
+        with np.load(path) as archive:
+            return {name: archive[name] for name in archive.files}
+
+    import torch
+
+    state = torch.load(path, map_location="cpu")
+    if hasattr(state, "state_dict"):
+        state = state.state_dict()
+    state = state.get("state_dict", state) if isinstance(state, dict) else state
+    return normalize_state_dict({name: tensor.detach().cpu().numpy() for name, tensor in state.items()})
+
+
+def normalize_state_dict(state):
+    """Map common TCN state dict layouts onto the blocks.N.convX naming.
+
+    Strips wrapper prefixes (module., encoder., tcn.), renames network.N to
+    blocks.N and folds weight_norm (weight_g, weight_v) into plain weights.
+    """
+    renamed = {}
+    for name, value in state.items():
+        name = re.sub(r"^(module\.|encoder\.|tcn\.)+", "", name)
+        name = re.sub(r"^network\.", "blocks.", name)
+        renamed[name] = np.asarray(value, dtype=np.float32)
+
+    weights = {}
+    for name, value in renamed.items():
+        if name.endswith(".weight_v"):
+            base = name[:-len(".weight_v")]
+            g = renamed[f"{base}.weight_g"]
+            norm = np.sqrt((value ** 2).sum(axis=tuple(range(1, value.ndim)), keepdims=True))
+            weights[f"{base}.weight"] = g * value / norm
+        elif not name.endswith(".weight_g"):
+            weights[name] = value
+    return weights
+
+
+def int8_accuracy(reference, quantized, windows):
+    """Compare a quantized engine against the float encoder on windows"""
+    latent_error = []
+    cosine = []
+    score_error = []
+    top_match = 0
+    for window in windows:
+        expected_latent, expected_scores = reference(window)
+        latent, scores = quantized(window)
+        latent_error.append(float(np.abs(latent - expected_latent).max()))
+        cosine.append(float(latent @ expected_latent /
+                            max(np.linalg.norm(latent) * np.linalg.norm(expected_latent), 1e-12)))
+        score_error.append(float(np.abs(scores - expected_scores).max()))
+        top_match += int(np.argmax(scores) == np.argmax(expected_scores))
+    return {
+        "windows": len(windows),
+        "latent_max_abs_error": max(latent_error),
+        "latent_min_cosine": min(cosine),
+        "motif_score_max_abs_error": max(score_error),
+        "top_motif_agreement": top_match / len(windows),
+    }
+
+
+def torch_int8_engine(encoder):
+    """The encoder as a torch module with dynamic int8 quantization.
+
+    Convolutions are expressed as nn.Linear over gathered taps (the same
+    im2col as CausalConv) because quantize_dynamic only covers Linear layers.
+    Returns a callable window -> (latent, motif_scores) like TCNEncoder.
+    """
+    import torch
+    from torch import nn
+
+    def linear(matrix, bias):
+        layer = nn.Linear(*matrix.shape)
+        layer.weight.data = torch.from_numpy(np.ascontiguousarray(matrix.T))
+        layer.bias.data = torch.from_numpy(np.array(bias, dtype=np.float32))
+        return layer
+
+    class Conv(nn.Module):
+        def __init__(self, conv):
+            super().__init__()
+            self.kernel, self.dilation, self.context = conv.kernel, conv.dilation, conv.context
+            self.linear = linear(conv.matrix, conv.bias)
+
+        def forward(self, x):
+            padded = nn.functional.pad(x, (0, 0, self.context, 0))
+            taps = [padded[j * self.dilation:j * self.dilation + len(x)] for j in range(self.kernel)]
+            return self.linear(torch.cat(taps, dim=1))
+
+    class Block(nn.Module):
+        def __init__(self, block):
+            super().__init__()
+            self.conv1 = Conv(block.conv1)
+            self.conv2 = Conv(block.conv2)
+            self.downsample = Conv(block.downsample) if block.downsample is not None else None
+
+        def forward(self, x):
+            h = torch.relu(self.conv2(torch.relu(self.conv1(x))))
+            residual = x if self.downsample is None else self.downsample(x)
+            return torch.relu(h + residual)
+
+    class Encoder(nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.blocks = nn.Sequential(*(Block(block) for block in encoder.blocks))
+            self.fc_mu = linear(*encoder.fc_mu)
+            self.motif_head = linear(*encoder.motif_head)
+
+        def forward(self, x):
+            latent = self.fc_mu(self.blocks(x).mean(dim=0))
+            return latent, torch.softmax(self.motif_head(latent), dim=0)
+
+    model = torch.ao.quantization.quantize_dynamic(Encoder().eval(), {nn.Linear}, dtype=torch.qint8)
+
+    def run(window):
+        with torch.inference_mode():
+            latent, scores = model(torch.from_numpy(np.asarray(window, dtype=np.float32)))
+        return latent.numpy(), scores.numpy()
+
+    return run
+
+
+def random_weights(input_dim, hidden_dims, latent_dim, num_motifs, seed=0):
+    """He-initialized weights in the .npz naming scheme"""
+    rng = np.random.default_rng(seed)
+
+    def conv(out_c, in_c, kernel):
+        scale = np.sqrt(2.0 / (in_c * kernel))
+        return rng.normal(0, scale, (out_c, in_c, kernel)).astype(np.float32), np.zeros(out_c, np.float32)
+
+    weights = {}
+    in_c = input_dim
+    for i, out_c in enumerate(hidden_dims):
+        prefix = f"blocks.{i}"
+        weights[f"{prefix}.conv1.weight"], weights[f"{prefix}.conv1.bias"] = conv(out_c, in_c, KERNEL_SIZE)
+        weights[f"{prefix}.conv2.weight"], weights[f"{prefix}.conv2.bias"] = conv(out_c, out_c, KERNEL_SIZE)
+        if in_c != out_c:
+            weights[f"{prefix}.downsample.weight"], weights[f"{prefix}.downsample.bias"] = conv(out_c, in_c, 1)
+        in_c = out_c
+
+    weights["fc_mu.weight"] = rng.normal(0, np.sqrt(1.0 / in_c), (latent_dim, in_c)).astype(np.float32)
+    weights["fc_mu.bias"] = np.zeros(latent_dim, np.float32)
+    weights["motif_head.weight"] = rng.normal(0, np.sqrt(1.0 / latent_dim), (num_motifs, latent_dim)).astype(np.float32)
+    weights["motif_head.bias"] = np.zeros(num_motifs, np.float32)
+    return weights
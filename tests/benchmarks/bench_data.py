@@ -0,0 +1,77 @@
+"""
+Paths and synthetic data generators shared by the benchmarks and their
+conftest.py. Importing it puts the repo root, the scripts and the worker
+modules on sys.path.
+"""
+
+import random
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+SCRIPTS_DIR = REPO_ROOT / "Documents" / "Projects" / "PiSrv_Docker" / "scripts"
+WORKER_DIR = REPO_ROOT / "opt" / "hailo"
+
+for path in (REPO_ROOT, SCRIPTS_DIR, WORKER_DIR):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000}
+
+# Distinct windows shared by generated records; keeps 1M-window datasets
+# within a few GB while still exercising every row of every window
+WINDOW_POOL_SIZE = 64
+
+HAILORTCLI_SUMMARY = """\
+Starting Measurements...
+Measuring FPS in hw_only mode
+Network tcn_encoder/tcn_encoder: 100% | 4218 | FPS: 1405.92 | ETA: 00:00:00
+Measuring FPS and Power in streaming mode
+Network tcn_encoder/tcn_encoder: 100% | 4170 | FPS: 1389.71 | ETA: 00:00:00
+Measuring HW Latency
+Network tcn_encoder/tcn_encoder: 100% | 1530 | HW Latency: 1.87 ms | ETA: 00:00:00
+
+=======
+Summary
+=======
+FPS     (hw_only)                 = 1405.92
+        (streaming)               = 1389.71
+Latency (hw)                      = 1.86912 ms
+Device 0000:01:00.0:
+        Power in streaming mode (average) = 1.4213 W
+                                (max)     = 1.46211 W
+"""
+
+
+def make_window(rng, rows=100):
+    """One 100x9 IMU window with realistic accelerometer/gyro/magnetometer ranges"""
+    return [
+        [rng.uniform(-2, 2), rng.uniform(-2, 2), 9.81 + rng.uniform(-0.5, 0.5),
+         rng.uniform(-20, 20), rng.uniform(-20, 20), rng.uniform(-20, 20),
+         rng.uniform(-25, 25), rng.uniform(-25, 25), rng.uniform(-25, 25)]
+        for _ in range(rows)
+    ]
+
+
+def make_records(count, seed=0):
+    """Synchrony MVP records carrying one IMU window each"""
+    rng = random.Random(seed)
+    pool = [make_window(rng) for _ in range(WINDOW_POOL_SIZE)]
+    return [
+        {
+            "id": i,
+            "session_id": f"session-{i // 1000}",
+            "timestamp": 1_700_000_000.0 + i * 0.5,
+            "synchrony_score": rng.random(),
+            "imu_data": pool[i % WINDOW_POOL_SIZE],
+        }
+        for i in range(count)
+    ]
+
+
+def make_infer_requests(count, seed=0):
+    """/analysis/infer request bodies as written by convert_for_pisrv.py"""
+    return [
+        {"x": record["imu_data"], "metadata": {"source": "ios_synchrony", "record_id": record["id"]}}
+        for record in make_records(count, seed)
+    ]
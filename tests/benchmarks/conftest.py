@@ -0,0 +1,47 @@
+"""
+Pytest hooks and fixtures for the Python benchmarks; synthetic data
+generators live in bench_data.py.
+
+Scales are selected with --bench-scale (comma separated, default 1k):
+    python -m pytest tests/benchmarks --bench-scale=1k,100k
+"""
+
+import tracemalloc
+
+import pytest
+
+from bench_data import SCALES
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-scale",
+        default="1k",
+        help="Comma separated dataset scales to benchmark: " + ", ".join(SCALES),
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "scale" in metafunc.fixturenames:
+        names = [s.strip() for s in metafunc.config.getoption("--bench-scale").split(",") if s.strip()]
+        unknown = [s for s in names if s not in SCALES]
+        if unknown:
+            raise pytest.UsageError(f"unknown --bench-scale {unknown}, expected {list(SCALES)}")
+        metafunc.parametrize("scale", [SCALES[s] for s in names], ids=names)
+
+
+@pytest.fixture
+def measure_peak_memory(benchmark):
+    """Run fn once under tracemalloc and record its peak in extra_info"""
+
+    def measure(fn, *args, **kwargs):
+        tracemalloc.start()
+        try:
+            fn(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info["peak_memory_bytes"] = peak
+        return peak
+
+    return measure
@@ -0,0 +1,58 @@
+"""Random access into a synchrony JSONL export: building the .idx offset
+index (one newline scan), reopening it, and reading 100 uniformly sampled
+records through the mmap vs a sequential scan to the same records."""
+
+import json
+
+import pytest
+
+from bench_data import make_records
+from jsonl_index import IndexedJsonl, index_path
+from synchrony_io import iter_jsonl
+
+SAMPLES = 100
+
+
+@pytest.fixture
+def jsonl(tmp_path, scale):
+    path = tmp_path / "synchrony_mvp_data.jsonl"
+    with open(path, "w") as f:
+        for record in make_records(scale):
+            f.write(json.dumps(record) + "\n")
+    return path
+
+
+def test_build_index(benchmark, jsonl, scale):
+    def build():
+        index_path(jsonl).unlink(missing_ok=True)
+        with IndexedJsonl(jsonl) as data:
+            return len(data)
+
+    benchmark.extra_info["bytes"] = jsonl.stat().st_size
+    assert benchmark(build) == scale
+
+
+def test_open_existing_index(benchmark, jsonl, scale):
+    IndexedJsonl(jsonl).close()
+
+    def reopen():
+        with IndexedJsonl(jsonl) as data:
+            return len(data)
+
+    assert benchmark(reopen) == scale
+
+
+def test_sample_indexed(benchmark, jsonl, scale):
+    with IndexedJsonl(jsonl) as data:
+        picks = benchmark(data.sample, SAMPLES, 0)
+    assert len(picks) == min(SAMPLES, scale)
+
+
+def test_sample_sequential_scan(benchmark, jsonl):
+    with IndexedJsonl(jsonl) as data:
+        wanted = {i for i, _ in data.sample(SAMPLES, 0)}
+
+    def scan():
+        return [record for i, record in enumerate(iter_jsonl(jsonl)) if i in wanted]
+
+    assert len(benchmark.pedantic(scan, rounds=3)) == len(wanted)
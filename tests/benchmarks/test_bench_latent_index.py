@@ -0,0 +1,43 @@
+"""Latent similarity search: exact brute force over the float16 memmap vs
+IVF-PQ with re-ranking, on clustered synthetic latents at each --bench-scale.
+extra_info records the store size and IVF-PQ recall@10 against brute force."""
+
+import numpy as np
+import pytest
+
+from latent_index import LatentSearch
+
+K = 10
+QUERIES = 16
+
+
+@pytest.fixture
+def search(tmp_path, scale):
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(256, 64)) * 3
+    search = LatentSearch(tmp_path, ivf_min=10 ** 12)
+    per_session = 10_000
+    for i, start in enumerate(range(0, scale, per_session)):
+        n = min(per_session, scale - start)
+        latents = centers[rng.integers(0, len(centers), n)] + rng.normal(size=(n, 64))
+        search.add_session(f"s{i}", latents, np.arange(n) * 50)
+    search.ivf.train()
+    queries = np.asarray(search.store.vectors[:: max(1, scale // QUERIES)][:QUERIES], dtype=np.float32)
+    return search, queries + 0.1 * rng.normal(size=queries.shape)
+
+
+def test_brute_force(benchmark, search):
+    search, queries = search
+    benchmark.extra_info["size"] = len(search.store)
+    _, ids = benchmark(search.brute.search, queries, K)
+    assert ids.shape == (len(queries), K)
+
+
+def test_ivfpq(benchmark, search):
+    search, queries = search
+    _, exact = search.brute.search(queries, K)
+    _, ids = benchmark(search.ivf.search, queries, K)
+    benchmark.extra_info.update(
+        size=len(search.store),
+        recall_at_10=float(np.mean([len(set(a) & set(b)) / K for a, b in zip(exact, ids)])),
+    )
@@ -0,0 +1,38 @@
+"""Benchmarks for the synchrony dataset conversion and analysis scripts."""
+
+import pytest
+
+from bench_data import make_infer_requests, make_records
+
+convert_for_pisrv = pytest.importorskip("convert_for_pisrv")
+analyze_synchrony_data = pytest.importorskip("analyze_synchrony_data")
+
+
+@pytest.fixture
+def records(scale):
+    return make_records(scale)
+
+
+@pytest.fixture
+def infer_requests(scale):
+    return make_infer_requests(scale)
+
+
+def test_extract_imu_windows(benchmark, measure_peak_memory, records):
+    measure_peak_memory(convert_for_pisrv.extract_imu_windows, records)
+    windows = benchmark(convert_for_pisrv.extract_imu_windows, records)
+    assert len(windows) == len(records)
+
+
+def test_validate_pisrv_format(benchmark, measure_peak_memory, infer_requests):
+    measure_peak_memory(convert_for_pisrv.validate_pisrv_format, infer_requests)
+    report = benchmark(convert_for_pisrv.validate_pisrv_format, infer_requests)
+    assert report["valid_windows"] == len(infer_requests)
+
+
+def test_generate_statistics(benchmark, measure_peak_memory, records):
+    measure_peak_memory(analyze_synchrony_data.generate_statistics, records, "MVP")
+    stats = benchmark.pedantic(
+        analyze_synchrony_data.generate_statistics, args=(records, "MVP"), rounds=3
+    )
+    assert stats["record_count"] == len(records)
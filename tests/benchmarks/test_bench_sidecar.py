@@ -0,0 +1,99 @@
+"""Benchmarks for the Hailo sidecar endpoints through FastAPI's TestClient,
+and the /infer hot path before and after pooled buffers + orjson (handler
+work only, without the HTTP stack; peak_memory_bytes per request in
+extra_info)."""
+
+import json
+
+import pytest
+
+from bench_data import REPO_ROOT, make_infer_requests
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+import numpy as np
+
+import hailo_sidecar_metrics_template as sidecar
+from tcn_inference import TCNEncoder
+
+MODEL_CONFIG = REPO_ROOT / "appdata" / "models" / "tcn_vae" / "model_config.json"
+
+
+@pytest.fixture(scope="module")
+def client():
+    # Not used as a context manager: skips the startup background collector
+    return TestClient(sidecar.app)
+
+
+@pytest.fixture(scope="module")
+def infer_body():
+    return {"x": make_infer_requests(1)[0]["x"]}
+
+
+def test_healthz(benchmark, client):
+    response = benchmark(client.get, "/healthz")
+    assert response.status_code == 200
+    assert response.json()["live"] is True
+
+
+def test_infer(benchmark, measure_peak_memory, client, infer_body):
+    measure_peak_memory(client.post, "/infer", json=infer_body)
+    response = benchmark(client.post, "/infer", json=infer_body)
+    assert response.status_code == 200
+    assert len(response.json()["latent"]) == 64
+
+
+def test_metrics(benchmark, client, infer_body):
+    client.post("/infer", json=infer_body)
+    response = benchmark(client.get, "/metrics")
+    assert response.status_code == 200
+
+
+def test_stream_hop(benchmark, client):
+    hop = sidecar.WINDOW_HOP
+    frame = np.zeros((hop, 9), dtype="<f4").tobytes()
+    with client.websocket_connect("/stream") as ws:
+        for _ in range(sidecar.WINDOW_SIZE // hop):
+            ws.send_bytes(frame)
+        ws.receive_json()
+
+        def one_hop():
+            ws.send_bytes(frame)
+            return ws.receive_json()
+
+        message = benchmark(one_hop)
+    assert len(message["latent"]) == 64
+
+
+def _infer_dict_lists(body):
+    """/infer as it was: dict body, a fresh array, list outputs, jsonable_encoder + json.dumps"""
+    request = json.loads(body)
+    latent, scores = sidecar.run_tcn_vae(np.asarray(request.get("x", []), dtype=np.float32))
+    return json.dumps(jsonable_encoder({"latent": latent, "motif_scores": scores})).encode("utf-8")
+
+
+def _infer_pooled(body):
+    """/infer now: parse into a pooled buffer, encode in place, orjson from the arrays"""
+    with sidecar.INFER_BUFFERS.buffers() as buffers:
+        window = sidecar.parse_infer_body(body, "application/json", buffers.window)
+        latent, scores = sidecar.run_tcn_vae_into(window, buffers.latent, buffers.scores)
+        return sidecar.json_bytes({"latent": latent, "motif_scores": scores})
+
+
+@pytest.mark.parametrize("engine", ["mock", "numpy"])
+@pytest.mark.parametrize("path", [_infer_dict_lists, _infer_pooled], ids=["dict-lists", "pooled-orjson"])
+def test_infer_hot_path(benchmark, measure_peak_memory, monkeypatch, infer_body, engine, path):
+    sidecar.MODEL.load()
+    if engine == "numpy":
+        encoder = TCNEncoder.from_config(MODEL_CONFIG, num_motifs=sidecar.NUM_MOTIFS)
+        monkeypatch.setattr(sidecar.MODEL, "engine", encoder)
+    else:
+        monkeypatch.setattr(sidecar.MODEL, "engine", None)
+    body = json.dumps(infer_body).encode("utf-8")
+    # Warm-up fills the buffer pool, so the measured request is a steady-state one
+    path(body)
+    measure_peak_memory(path, body)
+    response = json.loads(benchmark(path, body))
+    assert len(response["latent"]) == 64
@@ -0,0 +1,97 @@
+"""Sidecar throughput vs SIDECAR_WORKERS: the real NumPy encoder behind
+/infer, driven by concurrent keep-alive clients. extra_info records
+requests per second, the worker count and the host's CPU count; on an N-core
+host throughput should grow close to linearly up to N workers."""
+
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from bench_data import REPO_ROOT
+
+pytest.importorskip("fastapi")
+pytest.importorskip("uvicorn")
+
+from tcn_inference import random_weights
+
+MODEL_CONFIG = REPO_ROOT / "appdata" / "models" / "tcn_vae" / "model_config.json"
+CLIENTS = 8
+REQUESTS = 200
+
+
+@pytest.fixture(scope="module")
+def weights(tmp_path_factory):
+    path = tmp_path_factory.mktemp("weights") / "tcn_encoder.npz"
+    np.savez(path, **random_weights(9, [64, 128, 256], 64, 12))
+    return path
+
+
+@pytest.fixture(scope="module")
+def infer_body():
+    window = np.random.default_rng(0).normal(size=(100, 9))
+    return json.dumps({"x": window.tolist()}).encode()
+
+
+def _start(workers, weights, tmp_path):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, SIDECAR_WORKERS=str(workers), FASTAPI_HOST="127.0.0.1", FASTAPI_PORT=str(port),
+               PROMETHEUS_MULTIPROC_DIR=str(tmp_path), LOG_LEVEL="warning", INFERENCE_BACKEND="cpu-fp32",
+               MODEL_CONFIG_PATH=str(MODEL_CONFIG), TCN_WEIGHTS_PATH=str(weights))
+    proc = subprocess.Popen([sys.executable, "hailo_sidecar_metrics_template.py"], cwd=REPO_ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/readyz")
+            if conn.getresponse().status == 200:
+                return proc, port
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    pytest.fail("sidecar did not become ready")
+
+
+def _client(port, body, count):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    for _ in range(count):
+        conn.request("POST", "/infer", body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 200
+    conn.close()
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4])
+def test_infer_throughput(benchmark, workers, weights, infer_body, tmp_path):
+    proc, port = _start(workers, weights, tmp_path)
+    try:
+        durations = []
+
+        def run():
+            start = time.perf_counter()
+            with ThreadPoolExecutor(CLIENTS) as pool:
+                list(pool.map(lambda _: _client(port, infer_body, REQUESTS // CLIENTS), range(CLIENTS)))
+            durations.append(time.perf_counter() - start)
+
+        run()  # warm every worker
+        durations.clear()
+        benchmark.pedantic(run, rounds=3, iterations=1)
+        benchmark.extra_info.update(
+            workers=workers,
+            cpu_count=os.cpu_count(),
+            requests_per_second=REQUESTS * len(durations) / sum(durations),
+        )
+    finally:
+        proc.terminate()
+        proc.wait(timeout=15)
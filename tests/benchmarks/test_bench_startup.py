@@ -0,0 +1,65 @@
+"""Sidecar cold-start benchmark: module import, model load and first inference,
+each measured in a fresh interpreter so nothing is already imported."""
+
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from bench_data import REPO_ROOT
+
+pytest.importorskip("fastapi")
+
+from tcn_inference import random_weights
+
+MODEL_CONFIG = REPO_ROOT / "appdata" / "models" / "tcn_vae" / "model_config.json"
+
+COLD_START = """
+import json, time
+start = time.perf_counter()
+import hailo_sidecar_metrics_template as sidecar
+imported = time.perf_counter()
+heavy = [m for m in ("torch", "psutil") if m in __import__("sys").modules]
+sidecar.MODEL.load()
+loaded = time.perf_counter()
+window = __import__("numpy").zeros((sidecar.WINDOW_SIZE, 9), dtype="float32")
+sidecar.run_tcn_vae(window)
+inferred = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - start,
+    "model_load_seconds": loaded - imported,
+    "first_inference_seconds": inferred - loaded,
+    "backend": sidecar.MODEL.backend,
+    "heavy_modules_at_import": heavy,
+}))
+"""
+
+
+@pytest.fixture(scope="module")
+def weights_path(tmp_path_factory):
+    config = json.loads(MODEL_CONFIG.read_text())
+    path = tmp_path_factory.mktemp("model") / "tcn_encoder.npz"
+    np.savez(path, **random_weights(config["input_dim"], config["hidden_dims"], config["latent_dim"], 12))
+    return path
+
+
+def _cold_start(weights_path):
+    env = {
+        "PATH": "/usr/bin:/bin",
+        "PYTHONPATH": str(REPO_ROOT),
+        "MODEL_CONFIG_PATH": str(MODEL_CONFIG),
+        "TCN_WEIGHTS_PATH": str(weights_path),
+        "INFERENCE_BACKEND": "cpu-int8",
+    }
+    output = subprocess.run([sys.executable, "-c", COLD_START], env=env, cwd=REPO_ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_cold_start(benchmark, weights_path):
+    timings = benchmark.pedantic(_cold_start, args=(weights_path,), rounds=3, iterations=1)
+    benchmark.extra_info.update(timings)
+    assert timings["backend"] == "cpu-int8"
+    assert timings["heavy_modules_at_import"] == []
@@ -0,0 +1,79 @@
+"""Benchmarks for the TCN-VAE CPU encoder: full window vs incremental hop, and
+the int8 fallback (NumPy and, when installed, torch dynamic quantization).
+
+pytest-benchmark records machine_info (x86_64 / aarch64) with every run.
+"""
+
+import numpy as np
+import pytest
+
+from bench_data import REPO_ROOT
+from tcn_inference import IncrementalTCN, TCNEncoder, int8_accuracy, torch_int8_engine
+
+MODEL_CONFIG = REPO_ROOT / "appdata" / "models" / "tcn_vae" / "model_config.json"
+WINDOW = 100
+HOP = 50
+
+
+@pytest.fixture(scope="module")
+def encoder():
+    return TCNEncoder.from_config(MODEL_CONFIG)
+
+
+@pytest.fixture(scope="module")
+def stream():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(WINDOW + HOP * 64, 9)).astype(np.float32)
+
+
+def _windows(stream):
+    return [stream[start:start + WINDOW] for start in range(0, len(stream) - WINDOW + 1, HOP)]
+
+
+def test_full_window(benchmark, encoder, stream):
+    windows = _windows(stream)
+
+    def run():
+        for window in windows:
+            encoder(window)
+
+    benchmark(run)
+
+
+def test_incremental_hop(benchmark, encoder, stream):
+    windows = _windows(stream)
+    engine = IncrementalTCN(encoder, HOP)
+
+    def run():
+        engine.reset()
+        for window in windows:
+            engine(window)
+
+    benchmark(run)
+    assert engine.incremental_windows > 0
+
+
+@pytest.mark.parametrize("batch_size", [16, 64])
+def test_batched_windows(benchmark, encoder, stream, batch_size):
+    windows = np.stack(_windows(stream))
+    benchmark(encoder.batch, windows, batch_size)
+
+
+def _bench_int8(benchmark, encoder, engine, stream):
+    windows = _windows(stream)
+    benchmark.extra_info.update(int8_accuracy(encoder, engine, windows[:16]))
+
+    def run():
+        for window in windows:
+            engine(window)
+
+    benchmark(run)
+
+
+def test_int8_window(benchmark, encoder, stream):
+    _bench_int8(benchmark, encoder, encoder.quantize_int8(), stream)
+
+
+def test_int8_window_torch(benchmark, encoder, stream):
+    pytest.importorskip("torch")
+    _bench_int8(benchmark, encoder, torch_int8_engine(encoder), stream)
@@ -0,0 +1,69 @@
+"""Worker -> sidecar transport: loopback HTTP + JSON (/infer/batch) vs the
+shared-memory ring (shm_transport.py), both served by the sidecar's batch
+encoder. Without model weights the sidecar returns mock outputs, so the
+numbers isolate transport cost; extra_info records windows per call."""
+
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("fastapi")
+uvicorn = pytest.importorskip("uvicorn")
+
+import hailo_sidecar_metrics_template as sidecar
+from imu_batch import SidecarEngine
+from shm_transport import ShmClient, ShmServer
+
+WINDOWS = 64
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def http_url():
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(sidecar.app, host="127.0.0.1", port=port, log_level="error",
+                                           lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture(scope="module")
+def shm_socket(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("shm") / "infer.sock")
+    server = ShmServer(path, sidecar.encode_shm_batch, sidecar.WINDOW_SIZE, sidecar.IMU_CHANNELS,
+                       sidecar.LATENT_DIM, sidecar.NUM_MOTIFS).start()
+    yield path
+    server.close()
+
+
+@pytest.fixture(scope="module")
+def windows():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(WINDOWS, sidecar.WINDOW_SIZE, sidecar.IMU_CHANNELS)).astype(np.float32)
+
+
+def test_http_batch(benchmark, http_url, windows):
+    engine = SidecarEngine(http_url)
+    benchmark.extra_info["windows"] = WINDOWS
+    latents, _ = benchmark(engine, windows)
+    assert latents.shape == (WINDOWS, sidecar.LATENT_DIM)
+
+
+def test_shm_batch(benchmark, shm_socket, windows):
+    benchmark.extra_info["windows"] = WINDOWS
+    with ShmClient(shm_socket, slots=4, slot_windows=WINDOWS // 4) as client:
+        latents, _ = benchmark(client.infer, windows)
+    assert latents.shape == (WINDOWS, sidecar.LATENT_DIM)
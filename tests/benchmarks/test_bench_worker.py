@@ -0,0 +1,31 @@
+"""Benchmarks for session_worker.py output parsing and idle profiling triggers."""
+
+import pytest
+
+from bench_data import HAILORTCLI_SUMMARY
+
+session_worker = pytest.importorskip("session_worker")
+
+
+def _long_output(progress_lines):
+    progress = "".join(
+        f"Network tcn_encoder/tcn_encoder: {i % 100}% | {i} | FPS: 1400.{i % 100:02d} | ETA: 00:00:01\n"
+        for i in range(progress_lines)
+    )
+    return progress + HAILORTCLI_SUMMARY
+
+
+@pytest.mark.parametrize("progress_lines", [0, 1_000, 100_000], ids=["summary", "1k-lines", "100k-lines"])
+def test_parse_benchmark(benchmark, measure_peak_memory, progress_lines):
+    text = _long_output(progress_lines)
+    measure_peak_memory(session_worker.parse_benchmark, text)
+    summary = benchmark(session_worker.parse_benchmark, text)
+    assert summary["fps_hw_only"] == pytest.approx(1405.92)
+
+
+def test_profile_triggers_idle_poll(benchmark, tmp_path):
+    """Per-scan cost of the profiling control files when nothing was requested"""
+    from worker_profiling import ProfileTriggers
+
+    triggers = ProfileTriggers(tmp_path)
+    assert benchmark(triggers.poll) == []
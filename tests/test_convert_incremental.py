@@ -0,0 +1,95 @@
+"""convert_for_pisrv.py --incremental: appending runs produce the same
+outputs as a full rebuild, a changed source prefix forces a rebuild and a
+partially written last line waits for the next run."""
+
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numpy")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS_DIR = REPO_ROOT / "Documents" / "Projects" / "PiSrv_Docker" / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import convert_for_pisrv  # noqa: E402
+import generate_synthetic_dataset  # noqa: E402
+
+MVP = "synchrony_mvp_data.jsonl"
+OUTPUTS = ("infer_requests.json", "motif_requests.json", "validation_report.json")
+
+
+@pytest.fixture
+def export(tmp_path):
+    """A generated export split into its MVP lines, plus a source dir to grow"""
+    generated = tmp_path / "generated"
+    generate_synthetic_dataset.generate_dataset(generated, records=12, write_csv=False)
+    source = tmp_path / "source"
+    source.mkdir()
+    shutil.copy(generated / "synchrony_data.jsonl", source)
+    lines = (generated / MVP).read_bytes().splitlines(keepends=True)
+    return source, lines
+
+
+def _convert(source, output, incremental):
+    convert_for_pisrv.main(source, output, incremental=incremental)
+    summary = json.loads((output / "conversion_summary.json").read_text())
+    return summary, {name: json.loads((output / name).read_text()) for name in OUTPUTS}
+
+
+def _rebuild(tmp_path, source):
+    return _convert(source, tmp_path / "rebuild", incremental=False)[1]
+
+
+def test_incremental_runs_match_a_full_rebuild(tmp_path, export):
+    source, lines = export
+    output = tmp_path / "incremental"
+    (source / MVP).write_bytes(b"".join(lines[:5]))
+    first, _ = _convert(source, output, incremental=True)
+
+    with open(source / MVP, "ab") as f:
+        f.write(b"".join(lines[5:]))
+    second, outputs = _convert(source, output, incremental=True)
+
+    assert not first["incremental"] and second["incremental"]
+    assert second["new_records"] == 7 and second["source_records"] == 12
+    assert outputs == _rebuild(tmp_path, source)
+    # Nothing new: outputs are left alone
+    assert _convert(source, output, incremental=True)[1] == outputs
+
+
+def test_changed_source_prefix_triggers_a_rebuild(tmp_path, export):
+    source, lines = export
+    output = tmp_path / "incremental"
+    (source / MVP).write_bytes(b"".join(lines[:6]))
+    _convert(source, output, incremental=True)
+
+    record = json.loads(lines[0])
+    record["synchrony_score"] = 0.123
+    (source / MVP).write_bytes(json.dumps(record).encode() + b"\n" + b"".join(lines[1:]))
+    summary, outputs = _convert(source, output, incremental=True)
+
+    assert not summary["incremental"] and summary["new_records"] == 12
+    assert outputs["motif_requests.json"][0]["sync_score"] == 0.123
+    assert outputs == _rebuild(tmp_path, source)
+
+
+def test_partial_last_line_is_deferred(tmp_path, export):
+    source, lines = export
+    output = tmp_path / "incremental"
+    cut = len(lines[8]) // 2
+    (source / MVP).write_bytes(b"".join(lines[:8]) + lines[8][:cut])
+    first, _ = _convert(source, output, incremental=True)
+
+    state = json.loads((output / convert_for_pisrv.STATE_FILE).read_text())
+    assert first["source_records"] == 8 and state["offset"] == len(b"".join(lines[:8]))
+
+    with open(source / MVP, "ab") as f:
+        f.write(lines[8][cut:] + b"".join(lines[9:]))
+    second, outputs = _convert(source, output, incremental=True)
+
+    assert second["incremental"] and second["new_records"] == 4
+    assert outputs == _rebuild(tmp_path, source)
@@ -0,0 +1,124 @@
+"""On-demand profiling: the sampler and tracemalloc report find the busy
+code, the sidecar /debug endpoints are guarded, and the worker writes
+profiles when triggered by a control file or a signal."""
+
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import xml.dom.minidom
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "opt" / "hailo"))
+sys.path.insert(0, str(REPO_ROOT))
+
+import debug_profiler  # noqa: E402
+import tracemalloc  # noqa: E402
+from worker_profiling import ProfileTriggers  # noqa: E402
+
+
+def _spin(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=_spin, args=(stop,), name="busy")
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+def test_sampler_records_busy_thread(busy_thread):
+    profiler = debug_profiler.profile(0.3, interval=0.002)
+
+    assert profiler.samples > 10
+    busy = [stack for stack in profiler.stacks if stack[0] == "thread busy"]
+    assert busy and any(frame.startswith("_spin (test_debug_profiler.py") for frame in busy[0])
+    assert not any("debug-profiler" in stack[0] for stack in profiler.stacks)
+    line = profiler.folded().splitlines()[0]
+    assert line.rsplit(" ", 1)[1].isdigit() and ";" in line
+    xml.dom.minidom.parseString(profiler.svg())
+
+
+def test_memory_report_traces_only_the_window():
+    assert not tracemalloc.is_tracing()
+    trace = debug_profiler.MemoryTrace().start()
+    held = [bytearray(1 << 16) for _ in range(16)]
+
+    report = trace.report(top=5)
+
+    assert not tracemalloc.is_tracing()
+    assert report["tracing_started"] and report["traced_current_bytes"] >= len(held) << 16
+    assert "test_debug_profiler.py" in report["top"][0]["site"] and report["top"][0]["count"] >= 16
+    with pytest.raises(ValueError):
+        debug_profiler.MemoryTrace().start().report(group_by="module")
+    assert not tracemalloc.is_tracing()
+
+
+def test_sidecar_debug_endpoints_are_guarded(monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    import hailo_sidecar_metrics_template as sidecar
+
+    client = TestClient(sidecar.app)
+    monkeypatch.setattr(sidecar, "SIDECAR_DEBUG_TOKEN", "")
+    assert client.get("/debug/profile?seconds=0.1").status_code == 404
+    monkeypatch.setattr(sidecar, "SIDECAR_DEBUG_TOKEN", "s3cret")
+    assert client.get("/debug/memory", headers={"X-Debug-Token": "nope"}).status_code == 403
+
+    headers = {"X-Debug-Token": "s3cret"}
+    svg = client.get("/debug/profile?seconds=0.2", headers=headers)
+    assert svg.status_code == 200 and svg.headers["content-type"] == "image/svg+xml"
+    assert int(svg.headers["x-profile-samples"]) > 0
+    folded = client.get("/debug/profile?seconds=0.1&format=folded", headers=headers)
+    assert folded.text.startswith("thread ")
+    assert client.get("/debug/profile?seconds=3600", headers=headers).status_code == 422
+
+    memory = client.get("/debug/memory?seconds=0.1&top=3", headers=headers).json()
+    assert memory["pid"] == os.getpid() and len(memory["top"]) <= 3
+    assert not tracemalloc.is_tracing()
+
+
+def _wait_for(pattern, directory, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        found = [p for p in directory.glob(pattern) if not p.name.endswith(".tmp")]
+        if found:
+            return found
+        time.sleep(0.05)
+    return []
+
+
+def test_worker_profiles_on_control_file_and_signal(tmp_path):
+    triggers = ProfileTriggers(tmp_path, seconds=0.2)
+    assert triggers.poll() == []
+
+    (tmp_path / ".profile").write_text("0.2")
+    assert triggers.poll() == ["cpu"]
+    assert not (tmp_path / ".profile").exists()
+    # One capture at a time
+    assert triggers.trigger("memory") is False
+    triggers.wait()
+    assert {p.suffix for p in (tmp_path / ".debug").glob("worker-cpu-*")} == {".folded", ".svg"}
+
+    previous = signal.getsignal(signal.SIGUSR2)
+    try:
+        triggers.install()
+        os.kill(os.getpid(), signal.SIGUSR2)
+        reports = _wait_for("worker-memory-*.json", tmp_path / ".debug")
+    finally:
+        triggers.wait()
+        signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+        signal.signal(signal.SIGUSR2, previous)
+    assert reports and "top" in json.loads(reports[0].read_text())
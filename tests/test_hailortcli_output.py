@@ -0,0 +1,54 @@
+"""hailortcli benchmark parsing against the fixture corpus in tests/data/hailortcli."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "opt" / "hailo"))
+
+from hailortcli_output import parse_benchmark_output, stream_benchmark  # noqa: E402
+
+FIXTURES = REPO_ROOT / "tests" / "data" / "hailortcli"
+OUTPUTS = sorted(FIXTURES.glob("*.txt"))
+
+
+@pytest.mark.parametrize("output", OUTPUTS, ids=[p.stem for p in OUTPUTS])
+def test_parse_fixture(output):
+    expected = json.loads(output.with_suffix(".expected.json").read_text())
+    assert parse_benchmark_output(output.read_text()).to_summary() == expected
+
+
+def _cat(path, exit_code=0, stderr="", sleep=0):
+    script = (
+        "import sys, time\n"
+        f"sys.stdout.write(open({str(path)!r}, newline='').read())\n"
+        "sys.stdout.flush()\n"
+        f"sys.stderr.write({stderr!r})\n"
+        f"time.sleep({sleep})\n"
+        f"sys.exit({exit_code})\n"
+    )
+    return [sys.executable, "-c", script]
+
+
+def test_stream_matches_captured_parse():
+    output = FIXTURES / "benchmark_progress_redraw.txt"
+    result, tail = stream_benchmark(_cat(output), timeout=30)
+
+    assert result.to_summary() == parse_benchmark_output(output.read_text()).to_summary()
+    assert tail.splitlines()[-1].strip() == "(max)     = 1.46211 W"
+    assert "\x1b" not in tail
+
+
+def test_stream_raises_like_subprocess_run():
+    output = FIXTURES / "benchmark_truncated.txt"
+    with pytest.raises(subprocess.CalledProcessError) as failed:
+        stream_benchmark(_cat(output, exit_code=1, stderr="HAILO_OUT_OF_PHYSICAL_DEVICES"), timeout=30)
+    assert "HAILO_OUT_OF_PHYSICAL_DEVICES" in failed.value.stderr
+    assert "FPS: 1404.10" in failed.value.stdout
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        stream_benchmark(_cat(output, sleep=30), timeout=0.5)
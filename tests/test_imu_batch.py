@@ -0,0 +1,134 @@
+"""The IMU batch stage streams imu.json and matches per-window encoder output."""
+
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "opt" / "hailo"))
+sys.path.insert(0, str(REPO_ROOT))
+
+import imu_batch  # noqa: E402
+import session_worker  # noqa: E402
+from tcn_inference import TCNEncoder, random_weights  # noqa: E402
+
+MODEL_CONFIG = REPO_ROOT / "appdata" / "models" / "tcn_vae" / "model_config.json"
+
+
+def _samples(n, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, 9)).astype(np.float32)
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    model_dir = tmp_path / "models"
+    model_dir.mkdir()
+    shutil.copy(MODEL_CONFIG, model_dir / "model_config.json")
+    np.savez(model_dir / "weights.npz", **random_weights(9, [64, 128, 256], 64, 12, seed=3))
+    return model_dir
+
+
+@pytest.mark.parametrize("layout", ["rows", "x", "samples_objects"])
+def test_read_imu_layouts(tmp_path, layout):
+    samples = _samples(50)
+    rows = samples.tolist()
+    if layout == "rows":
+        doc = rows
+    elif layout == "x":
+        doc = {"session": "abc", "rate_hz": 100, "meta": {"x": 1}, "x": rows}
+    else:
+        fields = imu_batch.SAMPLE_FIELDS
+        doc = {"sessionId": "abc", "samples": [dict(t=i / 100, **dict(zip(fields, row))) for i, row in enumerate(rows)]}
+    path = tmp_path / "imu.json"
+    path.write_text(json.dumps(doc, indent=1))
+
+    # A tiny chunk size forces values to straddle buffer refills
+    parsed = imu_batch.read_imu(path, chunk_size=7)
+
+    np.testing.assert_allclose(parsed, samples, rtol=1e-6)
+
+
+def test_read_imu_rejects_missing_samples(tmp_path):
+    path = tmp_path / "imu.json"
+    path.write_text(json.dumps({"meta": {}}))
+    with pytest.raises(ValueError):
+        imu_batch.read_imu(path)
+
+
+def test_window_view_matches_model_config():
+    samples = _samples(260)
+    windows, starts = imu_batch.window_view(samples, 100, 50)
+
+    assert starts.tolist() == [0, 50, 100, 150]
+    np.testing.assert_array_equal(windows[2], samples[100:200])
+
+
+def test_stage_writes_latents_matching_per_window(tmp_path, model_dir):
+    samples = _samples(100 + 50 * 9, seed=1)
+    sdir = tmp_path / "session"
+    sdir.mkdir()
+    (sdir / "imu.json").write_text(json.dumps({"x": samples.tolist()}))
+
+    stage = imu_batch.ImuBatchStage(model_dir, backend="local", weights_path=model_dir / "weights.npz", batch_size=4)
+    info = stage.run(sdir)
+
+    assert info["windows"] == 10 and info["backend"] == "local"
+    with np.load(sdir / imu_batch.LATENTS_NAME) as out:
+        assert out["latent"].shape == (10, 64)
+        assert out["motif_scores"].shape == (10, 12)
+        assert int(out["hop"]) == 50
+        encoder = TCNEncoder.from_config(model_dir / "model_config.json", model_dir / "weights.npz")
+        start = int(out["window_start"][7])
+        expected_latent, _ = encoder(samples[start:start + 100])
+        np.testing.assert_allclose(out["latent"][7], expected_latent, rtol=1e-4, atol=1e-5)
+
+    # Unchanged imu.json is not re-encoded on a retry
+    assert stage.run(sdir) == {"status": "ok", "file": imu_batch.LATENTS_NAME, "windows": 10, "reused": True}
+
+
+def test_worker_records_imu_outcome(tmp_path, model_dir, monkeypatch):
+    sdir = tmp_path / "session"
+    sdir.mkdir()
+    (sdir / "imu.json").write_text(json.dumps(_samples(150).tolist()))
+    stage = imu_batch.ImuBatchStage(model_dir, backend="local", weights_path=model_dir / "weights.npz")
+    monkeypatch.setattr(session_worker, "_imu_stage", stage)
+
+    session_worker._finish(sdir, {"status": "ok", "session": sdir.name}, 0.0)
+
+    results = json.loads((sdir / "results.json").read_text())
+    assert results["imu"]["windows"] == 2
+    assert (sdir / "imu_latents.npz").exists()
+
+
+def test_worker_reports_stage_errors(tmp_path, model_dir, monkeypatch):
+    sdir = tmp_path / "session"
+    sdir.mkdir()
+    (sdir / "imu.json").write_text("{not json")
+    monkeypatch.setattr(session_worker, "_imu_stage", imu_batch.ImuBatchStage(model_dir, backend="local"))
+
+    info = session_worker.run_imu_analysis(sdir)
+
+    assert info["status"] == "error"
+
+
+def test_sidecar_batch_endpoint():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    import hailo_sidecar_metrics_template as sidecar
+
+    client = TestClient(sidecar.app)
+    response = client.post("/infer/batch", json={"x": np.zeros((3, 100, 9)).tolist()})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["latent"]) == 3 and len(body["latent"][0]) == 64
+    assert len(body["motif_scores"]) == 3
+
+    assert client.post("/infer/batch", json={"x": [[1, 2, 3]]}).status_code == 422
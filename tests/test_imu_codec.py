@@ -0,0 +1,132 @@
+"""The IMU codec round-trips windows (exactly, or within the declared
+precision), frames are self-delimiting and the sidecar accepts codec bodies."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+import imu_codec  # noqa: E402
+
+
+def _windows(count=8, samples=100, seed=0):
+    """Smooth 9-channel IMU-like windows recorded with 4 decimals"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(samples)[None, :, None] / 100
+    x = np.sin(2 * np.pi * 1.7 * t + rng.uniform(0, 6, size=(count, 1, 9))) + 0.01 * rng.normal(size=(count, samples, 9))
+    return np.round(x * np.array([1, 1, 1, 50, 50, 50, 30, 30, 30]), 4).astype(np.float32)
+
+
+@pytest.mark.parametrize("compression", imu_codec.available_compressions())
+def test_lossless_round_trip_is_exact(compression):
+    x = _windows()
+    x[0, 0, 0] = np.nan
+    x[1, 5, 3] = -0.0
+
+    decoded = imu_codec.decode(imu_codec.encode(x, compression=compression))
+
+    assert decoded.dtype == np.float32 and decoded.shape == x.shape
+    np.testing.assert_array_equal(decoded.view(np.uint32), x.view(np.uint32))
+    # A single (samples, channels) window keeps its shape
+    assert imu_codec.decode(imu_codec.encode(x[2])).shape == (100, 9)
+
+
+def test_quantized_error_within_half_step_and_narrow_deltas():
+    x = _windows()
+    steps = np.array([1e-3] * 3 + [1e-2] * 6)
+
+    frame = imu_codec.encode(x, precision=steps)
+    decoded = imu_codec.decode(frame)
+
+    assert (np.abs(decoded - x) <= steps / 2 + 1e-5 * np.abs(x)).all()
+    assert imu_codec.HEADER.unpack_from(frame)[4] == 2
+    # Smooth data at a coarse step fits one byte per delta and compresses further
+    assert imu_codec.HEADER.unpack_from(imu_codec.encode(x, precision=0.1))[4] == 1
+    assert len(frame) < len(imu_codec.encode(x))
+    with pytest.raises(ValueError):
+        imu_codec.encode(x, precision=0)
+
+
+def test_frames_append_and_corruption_is_detected():
+    a, b = _windows(2, seed=1), _windows(3, seed=2)
+    data = imu_codec.encode(a) + imu_codec.encode(b, precision=1e-4)
+
+    first, second = imu_codec.iter_frames(data)
+
+    np.testing.assert_array_equal(first, a)
+    np.testing.assert_allclose(second, b, atol=1e-4)
+    with pytest.raises(imu_codec.CodecError):
+        imu_codec.decode(data)
+    with pytest.raises(imu_codec.CodecError):
+        imu_codec.decode(data[:40])
+    corrupt = bytearray(imu_codec.encode(a, compression="zlib"))
+    corrupt[-5] ^= 0xFF
+    with pytest.raises(imu_codec.CodecError):
+        imu_codec.decode(bytes(corrupt))
+    with pytest.raises(imu_codec.CodecError):
+        imu_codec.decode_text("not base64!")
+
+
+def test_report_and_json_requests():
+    x = _windows(4)
+
+    report = imu_codec.report(x, precision=1e-4)
+
+    assert report["ratio_vs_json"] > report["ratio_vs_raw"] > 1
+    assert report["max_abs_error"] <= 1e-4 and report["encode_mb_per_s"] > 0
+    request = {imu_codec.JSON_FIELD: imu_codec.encode_text(x[0])}
+    np.testing.assert_array_equal(imu_codec.windows_from_request(request), x[0])
+    np.testing.assert_array_equal(imu_codec.windows_from_request({"x": x[0].tolist()}), x[0])
+
+
+def test_sidecar_accepts_codec_bodies():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    import hailo_sidecar_metrics_template as sidecar
+
+    client = TestClient(sidecar.app)
+    x = _windows(3)
+    headers = {"Content-Type": imu_codec.MEDIA_TYPE}
+
+    binary = client.post("/infer", content=imu_codec.encode(x[0]), headers=headers).json()
+    as_json = client.post("/infer", json={"x": x[0].tolist()}).json()
+    assert binary["latent"] == pytest.approx(as_json["latent"])
+    encoded = client.post("/infer", json={"x_encoded": imu_codec.encode_text(x[0], precision=1e-4)})
+    assert encoded.status_code == 200
+
+    batch = client.post("/infer/batch", content=imu_codec.encode(x, precision=1e-4), headers=headers)
+    assert batch.status_code == 200 and len(batch.json()["latent"]) == 3
+    assert client.post("/infer", content=b"IMUC garbage", headers=headers).status_code == 422
+    assert client.post("/infer/batch", json={"x_encoded": "????"}).status_code == 422
+
+
+@pytest.mark.parametrize("compression", imu_codec.available_compressions())
+def test_oversized_payload_is_rejected_without_inflating_it(compression):
+    import tracemalloc
+
+    # A (100, 9) lossless header in front of a 64 MB payload of zeros
+    compress, _ = imu_codec._backend(compression)
+    bomb = compress(bytes(64 << 20), None) if compression != "none" else bytes(1 << 20)
+    frame = imu_codec.HEADER.pack(imu_codec.MAGIC, imu_codec.VERSION, imu_codec.MODE_LOSSLESS,
+                                  imu_codec._BACKENDS[compression][0], 4, 2, 1, 100, 9, len(bomb)) + bomb
+
+    tracemalloc.start()
+    try:
+        with pytest.raises(imu_codec.CodecError, match="does not match its shape"):
+            imu_codec.decode(frame)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 1 << 20
+    # A header declaring more than the decode limit is refused before decompressing
+    huge = imu_codec.HEADER.pack(imu_codec.MAGIC, imu_codec.VERSION, imu_codec.MODE_LOSSLESS,
+                                 imu_codec._BACKENDS[compression][0], 4, 3, 1 << 20, 100, 9, 0)
+    with pytest.raises(imu_codec.CodecError, match="decode limit"):
+        imu_codec.decode(huge)
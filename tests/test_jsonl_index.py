@@ -0,0 +1,114 @@
+"""The JSONL offset index gives random access, survives appends and splits
+files on record boundaries."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numpy")
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1] / "Documents" / "Projects" / "PiSrv_Docker" / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from jsonl_index import IndexedJsonl, index_path, map_chunks  # noqa: E402
+
+
+def _write(path, records, mode="w", tail=""):
+    with open(path, mode) as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        f.write(tail)
+
+
+def _ids(records):
+    return [record["id"] for record in records]
+
+
+def count_and_sum(records):
+    ids = _ids(records)
+    return len(ids), sum(ids)
+
+
+@pytest.fixture
+def jsonl(tmp_path):
+    path = tmp_path / "synchrony_data.jsonl"
+    _write(path, [{"id": i, "payload": "x" * (i % 37)} for i in range(500)])
+    return path
+
+
+def test_random_access_and_reuse(jsonl):
+    with IndexedJsonl(jsonl) as data:
+        assert len(data) == 500
+        assert data[0]["id"] == 0 and data[250]["id"] == 250 and data[-1]["id"] == 499
+        assert _ids(data[10:13]) == [10, 11, 12]
+        with pytest.raises(IndexError):
+            data[500]
+
+    built = index_path(jsonl).stat().st_mtime_ns
+    with IndexedJsonl(jsonl) as data:
+        assert len(data) == 500
+    # Unchanged file: the index is reused, not rewritten
+    assert index_path(jsonl).stat().st_mtime_ns == built
+
+
+def test_sample_tail_and_fields(jsonl):
+    with IndexedJsonl(jsonl, fields=("id",)) as data:
+        sample = data.sample(20, seed=1)
+        assert [i for i, _ in sample] == sorted({i for i, _ in sample})
+        assert all(record == {"id": i} for i, record in sample)
+        assert data.sample(20, seed=1) == sample
+        assert [i for i, _ in data.tail(3)] == [497, 498, 499]
+
+
+def test_appends_extend_the_index_and_skip_partial_lines(jsonl):
+    with IndexedJsonl(jsonl) as data:
+        assert len(data) == 500
+
+    # The exporter is mid-way through writing record 502
+    _write(jsonl, [{"id": 500}, {"id": 501}], mode="a", tail='\n\n{"id": 50')
+    with IndexedJsonl(jsonl) as data:
+        assert _ids(data[498:]) == [498, 499, 500, 501]
+        partial_end = data.end
+    assert partial_end < jsonl.stat().st_size
+
+    with open(jsonl, "a") as f:
+        f.write('2}\n')
+    with IndexedJsonl(jsonl) as data:
+        assert [record["id"] for _, record in data.tail(2)] == [501, 502]
+        assert data.end == jsonl.stat().st_size
+
+
+@pytest.mark.parametrize("scan_chunk", [7, 1 << 20])
+def test_whitespace_lines_are_not_indexed(tmp_path, monkeypatch, scan_chunk):
+    import jsonl_index
+
+    monkeypatch.setattr(jsonl_index, "SCAN_CHUNK", scan_chunk)
+    path = tmp_path / "synchrony_data.jsonl"
+    path.write_text('{"id": 0}\n' + " " * 10 + "\n\t \r\n" + '  {"id": 1}\n\n' + " " * 300 + '\n{"id": 2}\n')
+
+    with IndexedJsonl(path) as data:
+        assert _ids(data) == [0, 1, 2]
+
+
+def test_rewritten_file_rebuilds_the_index(jsonl):
+    with IndexedJsonl(jsonl) as data:
+        assert len(data) == 500
+    _write(jsonl, [{"id": i * 10} for i in range(600)])
+
+    with IndexedJsonl(jsonl) as data:
+        assert len(data) == 600 and data[-1]["id"] == 5990
+
+
+def test_chunks_split_on_records(jsonl):
+    with IndexedJsonl(jsonl) as data:
+        chunks = data.chunks(4)
+        assert chunks[0][0] == 0 and chunks[-1][1] == 500
+        assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+        assert data.chunks(4, start=480)[0][0] == 480
+
+    results = map_chunks(jsonl, count_and_sum, workers=3, fields=("id",))
+
+    assert len(results) == 3
+    assert (sum(n for n, _ in results), sum(s for _, s in results)) == (500, sum(range(500)))
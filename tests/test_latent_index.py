@@ -0,0 +1,174 @@
+"""Latent store appends and both indexes find the true nearest neighbors."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from latent_index import BruteForceIndex, LatentSearch, LatentStore  # noqa: E402
+
+
+def _clustered(rng, n, centers):
+    return centers[rng.integers(0, len(centers), n)] + rng.normal(size=(n, centers.shape[1]))
+
+
+@pytest.fixture
+def populated(tmp_path):
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(40, 64)) * 3
+    search = LatentSearch(tmp_path, ivf_min=10 ** 9)
+    for i in range(20):
+        search.add_session(f"s{i}", _clustered(rng, 300, centers), np.arange(300) * 50)
+    return search, rng
+
+
+def test_store_appends_and_is_idempotent(tmp_path):
+    store = LatentStore(tmp_path)
+    latents = np.random.default_rng(0).normal(size=(5, 64))
+
+    assert store.add("a", latents, np.arange(5) * 50) == 5
+    assert store.add("a", latents, np.arange(5) * 50) == 0
+    assert store.add("b", latents[:2], [0, 50]) == 2
+
+    # A second reader (e.g. the sidecar) sees the same rows
+    reader = LatentStore(tmp_path)
+    assert len(reader) == 7 and reader.sessions == ["a", "b"]
+    assert reader.rows[5:].tolist() == [[1, 0], [1, 50]]
+    np.testing.assert_allclose(reader.vectors[:5], latents.astype(np.float16))
+
+
+def test_store_recovers_from_an_interrupted_add(tmp_path):
+    store = LatentStore(tmp_path)
+    rng = np.random.default_rng(2)
+    a, b, c = rng.normal(size=(4, 64)), rng.normal(size=(3, 64)), rng.normal(size=(2, 64))
+    store.add("a", a, np.arange(4))
+    # Crash while adding "b": vectors appended, rows only partly, sessions.json untouched
+    with open(store.vectors_path, "ab") as f:
+        f.write(b.astype(np.float16).tobytes())
+    with open(store.rows_path, "ab") as f:
+        f.write(np.array([[1, 0], [1, 1]], dtype=np.int32).tobytes() + b"\x01\x00")
+
+    reader = LatentStore(tmp_path)
+    assert len(reader) == 4 and reader.sessions == ["a"]
+
+    # Retried after the crash, then another session: both stay aligned
+    assert store.add("b", b, np.arange(3) * 10) == 3
+    assert store.add("c", c, np.arange(2) * 20) == 2
+    assert store.vectors_path.stat().st_size == 9 * 64 * 2 and store.rows_path.stat().st_size == 9 * 8
+    reader.refresh()
+    assert reader.sessions == ["a", "b", "c"]
+    assert reader.rows[:, 0].tolist() == [0] * 4 + [1] * 3 + [2] * 2
+    assert reader.rows[4:7, 1].tolist() == [0, 10, 20]
+    np.testing.assert_allclose(reader.vectors[7:], c.astype(np.float16))
+    means, counts = reader.session_means()
+    assert counts.tolist() == [4, 3, 2]
+
+
+def test_brute_force_matches_exact_search(populated):
+    search, rng = populated
+    queries = rng.normal(size=(5, 64)) * 3
+    vectors = np.asarray(search.store.vectors, dtype=np.float32)
+    expected = np.argsort(((vectors[None] - queries[:, None]) ** 2).sum(axis=2), axis=1)[:, :10]
+
+    # Small chunks exercise the merge across chunks
+    distances, ids = BruteForceIndex(search.store, chunk_rows=1000).search(queries, k=10)
+
+    np.testing.assert_array_equal(ids, expected)
+    assert (np.diff(distances, axis=1) >= 0).all()
+
+
+def test_ivfpq_recall_and_incremental_insertion(populated):
+    search, rng = populated
+    search.ivf.train()
+    assert search.search(np.zeros(64), 1)[1] == "ivfpq"
+
+    # Added after training: encoded incrementally, not retrained
+    extra = _clustered(rng, 300, np.asarray(search.store.vectors[:40], dtype=np.float32))
+    search.add_session("late", extra, np.arange(300) * 50)
+    assert search.ivf.trained_size == 6000
+
+    queries = np.asarray(search.store.vectors[::151], dtype=np.float32) + 0.1 * rng.normal(size=(42, 64))
+    _, exact = search.brute.search(queries, 10)
+    _, approx = search.ivf.search(queries, 10)
+    recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(exact, approx)])
+    assert recall >= 0.9
+
+
+def test_index_trains_once_store_is_large_enough(tmp_path):
+    rng = np.random.default_rng(1)
+    search = LatentSearch(tmp_path, ivf_min=1000)
+    search.add_session("a", rng.normal(size=(600, 64)), np.arange(600))
+    assert not search.ivf.trained
+    search.add_session("b", rng.normal(size=(600, 64)), np.arange(600))
+    assert search.ivf.trained
+
+    # Another process opening the store uses the persisted index
+    assert LatentSearch(tmp_path).search(np.zeros(64), 3)[1] == "ivfpq"
+
+
+def test_similar_sessions_excludes_the_query_session(tmp_path):
+    rng = np.random.default_rng(2)
+    search = LatentSearch(tmp_path)
+    base = rng.normal(size=(100, 64))
+    search.add_session("walk-1", base, np.arange(100))
+    search.add_session("walk-2", base + 0.05, np.arange(100))
+    search.add_session("other", base + 10, np.arange(100))
+
+    matches, _ = search.similar_sessions("walk-1", k=2)
+
+    assert [m["session"] for m in matches] == ["walk-2", "other"]
+    assert matches[0]["windows"] == 100
+    with pytest.raises(KeyError):
+        search.similar_sessions("missing")
+
+
+def test_sidecar_search_endpoint(tmp_path, monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    import hailo_sidecar_metrics_template as sidecar
+
+    client = TestClient(sidecar.app)
+    monkeypatch.setattr(sidecar, "LATENT_STORE_DIR", "")
+    monkeypatch.setattr(sidecar, "_latent_search", None)
+    assert client.post("/search", json={"latent": [0.0] * 64}).status_code == 503
+
+    latents = np.random.default_rng(3).normal(size=(10, 64))
+    LatentStore(tmp_path).add("abc", latents, np.arange(10) * 50)
+    monkeypatch.setattr(sidecar, "LATENT_STORE_DIR", str(tmp_path))
+
+    body = client.post("/search", json={"latent": latents[4].tolist(), "k": 3}).json()
+    assert body["index"] == "brute_force" and body["size"] == 10
+    assert body["neighbors"][0] == {"session": "abc", "window_start": 200, "distance": pytest.approx(0, abs=0.05)}
+
+    assert client.post("/search", json={"session": "nope"}).status_code == 404
+    assert client.post("/search", json={"latent": [1, 2]}).status_code == 422
+    for k in ("a", None, [3]):
+        assert client.post("/search", json={"latent": latents[4].tolist(), "k": k}).status_code == 422
+
+
+def test_imu_stage_indexes_sessions(tmp_path):
+    sys.path.insert(0, str(REPO_ROOT / "opt" / "hailo"))
+    import imu_batch
+
+    def engine(windows):
+        return windows.mean(axis=1).repeat(8, axis=1)[:, :64].astype(np.float32), np.zeros((len(windows), 12))
+
+    sdir = tmp_path / "s1"
+    sdir.mkdir()
+    (sdir / "imu.json").write_text(json.dumps(np.random.default_rng(4).normal(size=(300, 9)).tolist()))
+    stage = imu_batch.ImuBatchStage(tmp_path, latent_store=tmp_path / ".latents")
+    stage._engine = engine
+    engine.name = "test"
+
+    assert stage.run(sdir)["indexed"] == 5
+    # Reused latents are not indexed twice
+    assert "indexed" not in stage.run(sdir)
+    assert LatentStore(tmp_path / ".latents").sessions == ["s1"]
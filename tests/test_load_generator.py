@@ -0,0 +1,124 @@
+"""test_pisrv_integration.py load generator against the local sidecar
+stub: closed and open loop, percentiles, failed client threads, and the
+'stub' mode of the full integration run."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("requests")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS_DIR = REPO_ROOT / "Documents" / "Projects" / "PiSrv_Docker" / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import test_pisrv_integration as integration  # noqa: E402
+from sidecar_stub import start_stub_server  # noqa: E402
+
+REQUESTS = [{"x": [[float(i)] * 9] * 100} for i in range(3)]
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(latency_ms=0.0):
+        server, base_url = start_stub_server(latency_ms=latency_ms)
+        servers.append(server)
+        return base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert [integration._percentile(values, p) for p in (7, 50, 90, 99, 100)] == [7, 50, 90, 99, 100]
+    assert integration._percentile([1, 2, 3, 4], 50) == 2 and integration._percentile([1, 2, 3, 4], 51) == 3
+    assert integration._percentile([7], 99) == 7
+    assert integration._percentile([], 50) is None
+
+
+def test_closed_loop_stops_at_total_requests(stub):
+    summary = integration.LoadGenerator(stub(), REQUESTS, concurrency=4, duration=10, total_requests=25).run()
+
+    assert summary["mode"] == "closed-loop"
+    assert summary["total_requests"] == summary["successful_requests"] == 25
+    assert summary["status_codes"] == {"200": 25} and summary["errors"] == {}
+    assert summary["latency_ms"]["p50"] <= summary["latency_ms"]["p99"] <= summary["latency_ms"]["max"]
+
+
+def test_open_loop_latency_includes_queueing(stub):
+    # 20 ms per request on one connection, scheduled every 10 ms: requests queue up
+    summary = integration.LoadGenerator(stub(latency_ms=20), REQUESTS, concurrency=1, rps=100,
+                                        duration=0.295).run()
+
+    assert summary["mode"] == "open-loop" and summary["target_rps"] == 100
+    assert summary["total_requests"] == summary["successful_requests"] == 30
+    # Measured from the scheduled send time, so the backlog shows in the tail
+    assert summary["latency_ms"]["max"] > 150
+    assert summary["throughput_rps"] < 60
+
+
+def test_codec_bodies_and_http_errors(stub, monkeypatch):
+    pytest.importorskip("numpy")
+    codec = integration.LoadGenerator(stub(), REQUESTS, concurrency=2, total_requests=6,
+                                      codec_options={"precision": 1e-4})
+    summary = codec.run()
+    assert summary["content_type"] == integration.CODEC_CONTENT_TYPE
+    assert summary["successful_requests"] == 6 and summary["mean_body_bytes"] < len(json.dumps(REQUESTS[0]))
+
+    rejected = integration.LoadGenerator(stub(), REQUESTS, concurrency=2, total_requests=4)
+    rejected.bodies = [b'{"y": []}']
+    assert rejected.run()["errors"] == {"HTTP 422": 4}
+
+
+def test_failed_client_threads_are_reported(stub, monkeypatch):
+    generator = integration.LoadGenerator(stub(), REQUESTS, concurrency=3, total_requests=30)
+    send = generator._send
+    calls = []
+
+    def flaky_send(body, scheduled_at):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("client crashed")
+        send(body, scheduled_at)
+
+    monkeypatch.setattr(generator, "_send", flaky_send)
+    summary = generator.run()
+
+    assert summary["errors"] == {"client thread RuntimeError: client crashed": 1}
+    assert summary["failed_requests"] == 1
+    with pytest.raises(ValueError):
+        integration.LoadGenerator(stub(), [])
+
+
+def test_stub_mode_end_to_end(tmp_path):
+    pytest.importorskip("numpy")
+    import convert_for_pisrv
+    import generate_synthetic_dataset
+
+    generate_synthetic_dataset.generate_dataset(tmp_path, records=8, write_csv=False)
+    convert_for_pisrv.main(tmp_path, tmp_path / "out")
+
+    integration.main("stub", tmp_path / "out", load_options={"concurrency": 2, "total_requests": 10, "duration": 5})
+
+    results = json.loads((tmp_path / "out" / "integration_test_results.json").read_text())
+    assert results["tests"]["health"]["healthy"] and results["tests"]["motifs"]["success"]
+    assert results["tests"]["infer"]["failed_samples"] == 0
+    assert results["tests"]["load"]["successful_requests"] == 10
+
+
+def test_infer_path_is_configurable(stub):
+    base_url = stub()
+
+    assert integration.test_infer_endpoint(base_url, REQUESTS[0], infer_path="/infer")["success"] is True
+    missing = integration.test_infer_endpoint(base_url, REQUESTS[0], infer_path="/missing")
+    assert missing["status"] == 404 and missing["endpoint"] == "/missing"
+    summary = integration.LoadGenerator(base_url, REQUESTS, concurrency=2, total_requests=4,
+                                        infer_path="/missing").run()
+    assert summary["status_codes"] == {"404": 4}
@@ -0,0 +1,32 @@
+"""The replay tool rebuilds the same IMU stream from plain and --codec
+converter output."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("requests")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS_DIR = REPO_ROOT / "Documents" / "Projects" / "PiSrv_Docker" / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import convert_for_pisrv  # noqa: E402
+import generate_synthetic_dataset  # noqa: E402
+import replay_session  # noqa: E402
+
+
+def test_load_session_stream_reads_codec_output(tmp_path):
+    generate_synthetic_dataset.generate_dataset(tmp_path, records=6, write_csv=False)
+    convert_for_pisrv.main(tmp_path, tmp_path / "plain")
+    convert_for_pisrv.main(tmp_path, tmp_path / "codec", codec=True)
+
+    plain = replay_session.load_session_stream(tmp_path / "plain")
+    encoded = replay_session.load_session_stream(tmp_path / "codec")
+
+    assert plain.shape == (600, 9)
+    np.testing.assert_array_equal(encoded, plain)
+    windows, hop = replay_session.cut_windows(encoded, 100, 0.5)
+    assert hop == 50 and windows.shape == (11, 100, 9)
@@ -0,0 +1,108 @@
+"""Archive compaction of finished sessions: media policy, index, budgets and manifest view."""
+
+import json
+import os
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "opt" / "hailo"))
+
+import session_archive  # noqa: E402
+from session_archive import SessionArchive  # noqa: E402
+from sessions_manifest import SessionsManifest  # noqa: E402
+
+DAY = 86400
+
+
+def _finished(root, name, age_days, video_bytes=1000):
+    sdir = root / name
+    sdir.mkdir()
+    (sdir / "video.mp4").write_bytes(os.urandom(video_bytes))
+    (sdir / "meta.json").write_text(json.dumps({"note": "x" * 500}))
+    (sdir / "results.json").write_text(json.dumps({"status": "ok", "summary": {"fps_hw_only": 1405.9}}))
+    old = time.time() - age_days * DAY
+    os.utime(sdir, (old, old))
+    return sdir
+
+
+def _manifest(root):
+    manifest = SessionsManifest(root)
+    manifest.refresh()
+    return manifest
+
+
+@pytest.mark.parametrize("policy,expected", [("keep", "kept"), ("drop", "dropped")])
+def test_old_sessions_are_packed_with_index_and_results(tmp_path, policy, expected):
+    _finished(tmp_path, "old", age_days=10)
+    _finished(tmp_path, "new", age_days=1)
+    archive = SessionArchive(tmp_path, after_days=7, media_policy=policy)
+
+    assert archive.compact(archive.candidates(_manifest(tmp_path).sessions)) == ["old"]
+
+    assert not (tmp_path / "old").exists() and (tmp_path / "new").exists()
+    with zipfile.ZipFile(tmp_path / ".archive" / "old.zip") as zf:
+        members = {info.filename: info.compress_type for info in zf.infolist()}
+    assert members["meta.json"] == zipfile.ZIP_DEFLATED
+    assert ("video.mp4" in members) == (policy == "keep")
+    if policy == "keep":
+        assert members["video.mp4"] == zipfile.ZIP_STORED
+    assert json.loads((tmp_path / ".archive" / "results" / "old.json").read_text())["status"] == "ok"
+    assert SessionArchive(tmp_path).sessions["old"]["media"] == {"video.mp4": expected}
+
+
+def test_transcode_falls_back_to_original_without_ffmpeg(tmp_path, monkeypatch):
+    def missing_ffmpeg(*args, **kwargs):
+        raise FileNotFoundError("ffmpeg")
+
+    monkeypatch.setattr(session_archive.subprocess, "run", missing_ffmpeg)
+    _finished(tmp_path, "old", age_days=10)
+    archive = SessionArchive(tmp_path, after_days=7, media_policy="transcode")
+
+    archive.compact(["old"])
+
+    assert archive.sessions["old"]["media"] == {"video.mp4": "kept"}
+
+
+def test_sessions_budget_archives_least_recently_modified_first(tmp_path):
+    for i, age in enumerate((3, 2, 1)):
+        _finished(tmp_path, f"s{i}", age_days=age, video_bytes=10_000)
+    archive = SessionArchive(tmp_path, after_days=0, sessions_budget=25_000)
+
+    assert archive.candidates(_manifest(tmp_path).sessions) == ["s0"]
+
+
+def test_archive_budget_evicts_lru_but_keeps_results(tmp_path):
+    for i in range(3):
+        _finished(tmp_path, f"s{i}", age_days=10, video_bytes=10_000)
+    archive = SessionArchive(tmp_path, after_days=7, archive_budget=25_000)
+    archive.compact(["s0", "s1", "s2"])
+    archive.extract("s0", tmp_path / "restored")  # s0 becomes most recently used
+    for name, t in (("s1", 1), ("s2", 2)):
+        archive.sessions[name]["last_access"] = t
+        os.utime(tmp_path / ".archive" / f"{name}.zip", (t, t))
+
+    assert archive.evict() == ["s1"]
+
+    assert not (tmp_path / ".archive" / "s1.zip").exists()
+    assert (tmp_path / ".archive" / "results" / "s1.json").exists()
+    assert (tmp_path / "restored" / "video.mp4").exists()
+    with pytest.raises(FileNotFoundError):
+        archive.extract("s1", tmp_path / "gone")
+
+
+def test_manifest_lists_archived_sessions(tmp_path):
+    _finished(tmp_path, "old", age_days=10)
+    archive = SessionArchive(tmp_path, after_days=7)
+    manifest = _manifest(tmp_path)
+    archive.compact(archive.candidates(manifest.sessions))
+
+    assert manifest.refresh(archived=archive.manifest_entries()) == []
+    entry = manifest.sessions["old"]
+    assert entry["status"] == "archived"
+    assert entry["summary"] == {"fps_hw_only": 1405.9}
+    assert set(entry["files"]) == {"results.json", "archive.zip"}
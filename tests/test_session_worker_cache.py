@@ -0,0 +1,113 @@
+"""session_worker reuses cached hailortcli benchmark results per HEF/device/version."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "opt" / "hailo"))
+
+import session_worker  # noqa: E402
+
+BENCHMARK_OUTPUT = """\
+Summary
+  FPS     (hw_only)                 = 1405.92
+          (streaming)               = 1398.41
+  Latency (hw)                      = 0.68 ms
+"""
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    hef = tmp_path / "model.hef"
+    hef.write_bytes(b"hef-v1")
+    calls = []
+
+    def fake_run(args, **kwargs):
+        calls.append(args[1])
+        stdout = {"--version": "HailoRT-CLI version 4.17.0"}.get(args[1], "")
+        return subprocess.CompletedProcess(args, 0, stdout=stdout, stderr="")
+
+    def fake_stream_benchmark(args, timeout):
+        calls.append(args[1])
+        return session_worker.parse_benchmark_output(BENCHMARK_OUTPUT), BENCHMARK_OUTPUT
+
+    monkeypatch.setattr(session_worker.subprocess, "run", fake_run)
+    monkeypatch.setattr(session_worker, "stream_benchmark", fake_stream_benchmark)
+    monkeypatch.setattr(session_worker, "find_hef", lambda: str(hef))
+    monkeypatch.setattr(session_worker, "BENCH_CACHE_FILE", tmp_path / ".benchmark_cache.json")
+    monkeypatch.setattr(session_worker, "FORCE_REBENCHMARK_FILE", tmp_path / ".rebenchmark")
+    monkeypatch.setattr(session_worker, "_hailort_identity", None)
+    monkeypatch.setenv("HAILO_DEVICE_ID", "0000:01:00.0")
+    return tmp_path, hef, calls
+
+
+def _run_session(root, name):
+    sdir = root / name
+    sdir.mkdir()
+    session_worker.run_for_session(sdir)
+    return json.loads((sdir / "results.json").read_text())
+
+
+def test_second_session_reuses_cached_benchmark(worker):
+    root, _, calls = worker
+
+    first = _run_session(root, "s1")
+    second = _run_session(root, "s2")
+
+    assert calls.count("benchmark") == 1
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["summary"] == first["summary"]
+    assert second["summary"]["fps_hw_only"] == pytest.approx(1405.92)
+
+
+def test_model_change_expiry_and_force_rebenchmark(worker, monkeypatch):
+    root, hef, calls = worker
+    _run_session(root, "s1")
+
+    hef.write_bytes(b"hef-v2-different-size")
+    assert _run_session(root, "s2")["cached"] is False
+
+    (root / ".rebenchmark").touch()
+    assert _run_session(root, "s3")["cached"] is False
+    assert not (root / ".rebenchmark").exists()
+
+    monkeypatch.setattr(session_worker, "BENCH_CACHE_TTL", 0)
+    assert _run_session(root, "s4")["cached"] is False
+    assert calls.count("benchmark") == 4
+
+
+def test_sessions_are_counted_in_worker_metrics(worker):
+    root, _, _ = worker
+    before = session_worker.METRICS.expose()
+
+    _run_session(root, "s1")
+    _run_session(root, "s2")
+
+    after = session_worker.METRICS.expose()
+    assert 'session_worker_sessions_processed_total{status="ok",cached="true"}' in after
+    assert after.count('stage_duration_seconds_count{stage="total"}') == 1
+    assert after != before
+
+
+def test_failed_identify_is_retried(worker, monkeypatch):
+    _, _, calls = worker
+    monkeypatch.delenv("HAILO_DEVICE_ID")
+    replies = iter(["", "Board Name: Hailo-8\nSerial Number: HLLWM2B220500123\n"])
+
+    def fake_run(args, **kwargs):
+        calls.append(args[1])
+        stdout = "HailoRT-CLI version 4.17.0" if args[1] == "--version" else next(replies)
+        return subprocess.CompletedProcess(args, 0, stdout=stdout, stderr="")
+
+    monkeypatch.setattr(session_worker.subprocess, "run", fake_run)
+
+    # Device busy: the unknown identity is used once but not kept
+    assert session_worker.hailort_identity() == ("unknown", "4.17.0")
+    assert session_worker.hailort_identity() == ("HLLWM2B220500123", "4.17.0")
+    assert session_worker.hailort_identity() == ("HLLWM2B220500123", "4.17.0")
+    assert calls.count("fw-control") == 2
@@ -0,0 +1,82 @@
+"""Worker-maintained sessions manifest: incremental refresh and freshness stamp."""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "opt" / "hailo"))
+
+from sessions_manifest import MANIFEST_NAME, SessionsManifest, load_manifest  # noqa: E402
+
+
+def _session(root, name, video=b"v" * 10, results=None):
+    sdir = root / name
+    sdir.mkdir()
+    if video is not None:
+        (sdir / "video.mp4").write_bytes(video)
+    if results is not None:
+        (sdir / "results.json").write_text(json.dumps(results))
+    return sdir
+
+
+def _is_current(root):
+    """What the Vapor reader checks before trusting the manifest"""
+    return os.stat(root).st_mtime_ns <= os.stat(root / MANIFEST_NAME).st_mtime_ns
+
+
+def test_refresh_lists_pending_and_finished_sessions(tmp_path):
+    _session(tmp_path, "a")
+    _session(tmp_path, "b", results={"status": "ok", "cached": True, "summary": {"fps_hw_only": 1405.9}})
+    _session(tmp_path, "c", video=None)
+
+    manifest = SessionsManifest(tmp_path)
+    pending = manifest.refresh()
+    manifest.save()
+
+    assert [p.name for p in pending] == ["a"]
+    sessions = load_manifest(tmp_path)["sessions"]
+    assert sessions["a"] == {"files": {"video.mp4": 10}, "mtime": os.stat(tmp_path / "a").st_mtime,
+                             "status": "pending"}
+    assert sessions["b"]["status"] == "ok"
+    assert sessions["b"]["summary"] == {"fps_hw_only": 1405.9}
+    assert sessions["c"]["status"] == "incomplete"
+    assert _is_current(tmp_path)
+
+
+def test_unchanged_tree_is_not_rewritten_and_finished_sessions_not_restatted(tmp_path, monkeypatch):
+    _session(tmp_path, "done", results={"status": "ok"})
+    manifest = SessionsManifest(tmp_path)
+    manifest.refresh()
+    assert manifest.save()
+
+    monkeypatch.setattr(SessionsManifest, "_update", lambda *args: (_ for _ in ()).throw(AssertionError))
+    manifest.refresh()
+    assert not manifest.save()
+
+
+def test_upload_makes_manifest_stale_until_next_refresh(tmp_path):
+    manifest = SessionsManifest(tmp_path)
+    manifest.refresh()
+    manifest.save()
+
+    sdir = _session(tmp_path, "new")
+    assert not _is_current(tmp_path)
+
+    assert manifest.refresh() == [sdir]
+    manifest.save()
+    assert _is_current(tmp_path)
+
+    (sdir / "results.json").write_text(json.dumps({"status": "error", "error": "benchmark timeout"}))
+    manifest.record(sdir)
+    manifest.save()
+    entry = load_manifest(tmp_path)["sessions"]["new"]
+    assert entry["status"] == "error" and entry["error"] == "benchmark timeout"
+
+    for f in sdir.iterdir():
+        f.unlink()
+    sdir.rmdir()
+    manifest.refresh()
+    manifest.save()
+    assert load_manifest(tmp_path)["sessions"] == {}
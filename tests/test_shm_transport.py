@@ -0,0 +1,114 @@
+"""Shared-memory transport round trips match direct inference."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from shm_transport import ShmClient, ShmServer  # noqa: E402
+
+WINDOW = 100
+
+
+def fake_encoder(windows):
+    """Latents that identify their window, so misplaced slots show up"""
+    means = windows.mean(axis=(1, 2))
+    return np.repeat(means[:, None], 64, axis=1), np.repeat(windows[:, -1, :1], 12, axis=1)
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = ShmServer(str(tmp_path / "infer.sock"), fake_encoder, WINDOW, 9, 64, 12).start()
+    yield server
+    server.close()
+
+
+def _windows(n, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, WINDOW, 9)).astype(np.float32)
+
+
+def test_round_trip_across_slots(server):
+    windows = _windows(37)
+    # 37 windows over 3 slots of 5: several batches in flight and slot reuse
+    with ShmClient(server.socket_path, slots=3, slot_windows=5) as client:
+        latents, scores = client.infer(windows)
+
+    expected_latents, expected_scores = fake_encoder(windows)
+    np.testing.assert_allclose(latents, expected_latents, rtol=1e-6)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-6)
+
+
+def test_client_unlinks_shared_memory(server):
+    client = ShmClient(server.socket_path)
+    name = client.shm.name
+    client.close()
+
+    from multiprocessing import shared_memory
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+def test_shape_mismatch_is_rejected(server):
+    with ShmClient(server.socket_path) as client, pytest.raises(ValueError):
+        client.infer(np.zeros((2, 50, 9), dtype=np.float32))
+
+
+def test_inference_errors_are_reported(tmp_path):
+    def broken(windows):
+        raise RuntimeError("device lost")
+
+    server = ShmServer(str(tmp_path / "infer.sock"), broken, WINDOW, 9, 64, 12).start()
+    try:
+        with ShmClient(server.socket_path) as client, pytest.raises(RuntimeError, match="status 1"):
+            client.infer(_windows(3))
+    finally:
+        server.close()
+
+
+def test_failed_slot_leaves_the_connection_usable(tmp_path):
+    def flaky(windows):
+        # Fails only the batches that carry the NaN marker
+        if np.isnan(windows).any():
+            raise RuntimeError("bad window")
+        return fake_encoder(windows)
+
+    server = ShmServer(str(tmp_path / "infer.sock"), flaky, WINDOW, 9, 64, 12).start()
+    try:
+        with ShmClient(server.socket_path, slots=3, slot_windows=2) as client:
+            poisoned = _windows(12)
+            poisoned[0, 0, 0] = np.nan
+            # The first slot fails while the others are still in flight
+            with pytest.raises(RuntimeError, match="status 1"):
+                client.infer(poisoned)
+
+            windows = _windows(12, seed=1)
+            latents, _ = client.infer(windows)
+        np.testing.assert_allclose(latents, fake_encoder(windows)[0], rtol=1e-6)
+    finally:
+        server.close()
+
+
+def test_imu_stage_over_shm(tmp_path, server):
+    import json
+
+    sys.path.insert(0, str(REPO_ROOT / "opt" / "hailo"))
+    import imu_batch
+
+    samples = np.random.default_rng(2).normal(size=(100 + 50 * 20, 9)).astype(np.float32)
+    sdir = tmp_path / "session"
+    sdir.mkdir()
+    (sdir / "imu.json").write_text(json.dumps(samples.tolist()))
+
+    stage = imu_batch.ImuBatchStage(tmp_path, shm_socket=server.socket_path, batch_size=8)
+    info = stage.run(sdir)
+    stage.reset()
+
+    assert info["backend"] == "shm" and info["windows"] == 21
+    with np.load(sdir / imu_batch.LATENTS_NAME) as out:
+        windows, _ = imu_batch.window_view(samples, 100, 50)
+        np.testing.assert_allclose(out["latent"], fake_encoder(windows)[0], rtol=1e-5)
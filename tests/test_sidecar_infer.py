@@ -0,0 +1,172 @@
+"""The sidecar /infer hot path parses into pooled buffers, writes the
+encoder outputs in place and serializes them unchanged, without blocking
+the event loop; a model that fails to load fails readiness."""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import hailo_sidecar_metrics_template as sidecar  # noqa: E402
+from tcn_inference import TCNEncoder  # noqa: E402
+
+MODEL_CONFIG = REPO_ROOT / "appdata" / "models" / "tcn_vae" / "model_config.json"
+
+
+@pytest.fixture
+def encoder(monkeypatch):
+    encoder = TCNEncoder.from_config(MODEL_CONFIG, weights_path=None, num_motifs=sidecar.NUM_MOTIFS, seed=2)
+    sidecar.MODEL.load()
+    monkeypatch.setattr(sidecar.MODEL, "engine", encoder)
+    monkeypatch.setattr(sidecar, "INFER_BUFFERS", sidecar.InferBufferPool(size=2))
+    return encoder
+
+
+def test_encoder_writes_into_output_arrays(encoder):
+    window = np.random.default_rng(0).normal(size=(100, 9)).astype(np.float32)
+    latent_out = np.empty(sidecar.LATENT_DIM, dtype=np.float32)
+    scores_out = np.empty(sidecar.NUM_MOTIFS, dtype=np.float32)
+
+    latent, scores = encoder(window, latent_out, scores_out)
+
+    assert latent is latent_out and scores is scores_out
+    expected = encoder(window)
+    np.testing.assert_array_equal(latent, expected[0])
+    np.testing.assert_array_equal(scores, expected[1])
+
+
+def test_infer_reuses_pooled_buffers(encoder):
+    client = TestClient(sidecar.app)
+    windows = np.random.default_rng(1).normal(size=(3, 100, 9)).astype(np.float32)
+
+    for window in windows:
+        body = client.post("/infer", json={"x": window.tolist()}).json()
+        latent, scores = encoder(window)
+        # float32 values survive the JSON round trip exactly
+        np.testing.assert_array_equal(np.asarray(body["latent"], dtype=np.float32), latent)
+        np.testing.assert_array_equal(np.asarray(body["motif_scores"], dtype=np.float32), scores)
+
+    (buffers,) = sidecar.INFER_BUFFERS._free
+    np.testing.assert_array_equal(buffers.window, windows[-1])
+
+
+def test_infer_other_shapes_are_not_broadcast(encoder, monkeypatch):
+    client = TestClient(sidecar.app)
+    row = np.random.default_rng(2).normal(size=(1, 9)).astype(np.float32)
+
+    body = client.post("/infer", json={"x": row.tolist()}).json()
+
+    np.testing.assert_allclose(body["latent"], encoder(row)[0], rtol=1e-6)
+    assert client.post("/infer", json={"x": [[1, 2], [3]]}).status_code == 422
+    # Without orjson the stdlib encoder produces the same response
+    monkeypatch.setattr(sidecar, "orjson", None)
+    fallback = client.post("/infer", json={"x": row.tolist()}).json()
+    np.testing.assert_allclose(fallback["latent"], body["latent"], rtol=1e-6)
+
+
+def test_infer_runs_the_encoder_off_the_event_loop(encoder, monkeypatch):
+    import asyncio
+    import httpx
+
+    def slow_engine(window):
+        time.sleep(0.3)
+        return encoder(window)
+
+    monkeypatch.setattr(sidecar.MODEL, "engine", slow_engine)
+    body = {"x": np.zeros((100, 9)).tolist()}
+    finished = []
+
+    async def request(client, method, path, **kwargs):
+        response = await client.request(method, path, **kwargs)
+        finished.append(path)
+        return response
+
+    async def run():
+        transport = httpx.ASGITransport(app=sidecar.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://sidecar") as client:
+            infer = asyncio.create_task(request(client, "POST", "/infer", json=body))
+            await asyncio.sleep(0.05)
+            ready = await request(client, "GET", "/readyz")
+            return (await infer).status_code, ready.status_code
+
+    assert asyncio.run(run()) == (200, 200)
+    # /readyz answered while the encoder was still running
+    assert finished == ["/readyz", "/infer"]
+
+
+def test_failed_model_load_fails_readiness(tmp_path, monkeypatch):
+    from tcn_inference import random_weights
+
+    weights = random_weights(9, [64, 128, 256], sidecar.LATENT_DIM, sidecar.NUM_MOTIFS)
+    del weights["fc_mu.weight"]
+    np.savez(tmp_path / "tcn_encoder.npz", **weights)
+    monkeypatch.setattr(sidecar, "MODEL_CONFIG_PATH", str(MODEL_CONFIG))
+    monkeypatch.setattr(sidecar, "TCN_WEIGHTS_PATH", str(tmp_path / "tcn_encoder.npz"))
+    monkeypatch.setattr(sidecar, "MODEL", sidecar.ModelState())
+    client = TestClient(sidecar.app)
+
+    sidecar.MODEL.load()
+
+    ready = client.get("/readyz")
+    assert ready.status_code == 503
+    assert ready.json()["backend"] == "mock" and "fc_mu.weight" in ready.json()["error"]
+    assert client.get("/healthz").json()["ready"] is False
+    # Still answers (mock outputs) so callers degrade instead of erroring
+    assert client.post("/infer", json={"x": np.zeros((100, 9)).tolist()}).status_code == 200
+
+
+def test_auto_backend_without_torch_serves_float(tmp_path, monkeypatch):
+    import importlib.util
+    from tcn_inference import Int8CausalConv, random_weights
+
+    np.savez(tmp_path / "tcn_encoder.npz", **random_weights(9, [64, 128, 256], sidecar.LATENT_DIM, sidecar.NUM_MOTIFS))
+    monkeypatch.setattr(sidecar, "MODEL_CONFIG_PATH", str(MODEL_CONFIG))
+    monkeypatch.setattr(sidecar, "TCN_WEIGHTS_PATH", str(tmp_path / "tcn_encoder.npz"))
+    monkeypatch.setattr(sidecar, "HAILO_DEVICE", str(tmp_path / "hailo0"))
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name, *args: None)
+
+    assert sidecar.select_backend("auto") == "cpu-fp32"
+    # Forced int8 quantizes /infer only; /stream keeps the faster float encoder
+    encoder, engine = sidecar.load_encoder("cpu-int8")
+    assert not isinstance(encoder.blocks[0].conv1, Int8CausalConv)
+    assert engine is not encoder
+
+
+@pytest.fixture
+def loaded_model(tmp_path, monkeypatch):
+    """The sidecar's real cpu-fp32 load path over random .npz weights"""
+    from tcn_inference import random_weights
+
+    np.savez(tmp_path / "tcn_encoder.npz", **random_weights(9, [64, 128, 256], sidecar.LATENT_DIM, sidecar.NUM_MOTIFS))
+    monkeypatch.setattr(sidecar, "MODEL_CONFIG_PATH", str(MODEL_CONFIG))
+    monkeypatch.setattr(sidecar, "TCN_WEIGHTS_PATH", str(tmp_path / "tcn_encoder.npz"))
+    monkeypatch.setattr(sidecar, "INFERENCE_BACKEND", "cpu-fp32")
+    monkeypatch.setattr(sidecar, "MODEL", sidecar.ModelState())
+    return sidecar.MODEL.load()
+
+
+def test_infer_rejects_non_window_shapes_with_a_loaded_model(loaded_model):
+    import imu_codec
+
+    assert loaded_model.backend == "cpu-fp32" and loaded_model.error is None
+    client = TestClient(sidecar.app)
+    two_windows = {imu_codec.JSON_FIELD: imu_codec.encode_text(np.zeros((2, 100, 9), dtype=np.float32))}
+
+    for body in ({"x": []}, {"x": [1, 2, 3]}, {"x": [[1, 2], [3, 4]]}, two_windows):
+        response = client.post("/infer", json=body)
+        assert response.status_code == 422, body
+        assert "expected one" in response.json()["error"]
+
+    window = np.random.default_rng(3).normal(size=(100, 9)).astype(np.float32)
+    body = client.post("/infer", json={"x": window.tolist()}).json()
+    np.testing.assert_allclose(body["latent"], loaded_model.engine(window)[0], rtol=1e-5, atol=1e-6)
@@ -0,0 +1,94 @@
+"""The sidecar /stream WebSocket cuts one window per hop from raw samples,
+whatever the frame boundaries, and rejects malformed frames without
+dropping the connection."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import hailo_sidecar_metrics_template as sidecar  # noqa: E402
+from tcn_inference import TCNEncoder  # noqa: E402
+
+MODEL_CONFIG = REPO_ROOT / "appdata" / "models" / "tcn_vae" / "model_config.json"
+WINDOW, HOP = sidecar.WINDOW_SIZE, sidecar.WINDOW_HOP
+
+
+def _stream(samples, seed=0):
+    return np.random.default_rng(seed).normal(size=(samples, 9)).astype(np.float32)
+
+
+@pytest.fixture
+def encoder(monkeypatch):
+    encoder = TCNEncoder.from_config(MODEL_CONFIG, weights_path=None, num_motifs=sidecar.NUM_MOTIFS, seed=3)
+    sidecar.MODEL.load()
+    monkeypatch.setattr(sidecar.MODEL, "encoder", encoder)
+    return encoder
+
+
+def test_windower_emits_once_per_hop_across_split_pushes():
+    stream = _stream(WINDOW + 4 * HOP)
+    windower = sidecar.StreamWindower(WINDOW, HOP)
+
+    # Splits straddle the first window and several hop boundaries
+    sizes = [WINDOW - 1, 1, HOP // 3, 2 * HOP + HOP // 2]
+    emitted = [windower.push(chunk) for chunk in np.split(stream, np.cumsum(sizes))]
+
+    assert [len(windows) for windows in emitted] == [0, 1, 0, 2, 2]
+    ends = [end for windows in emitted for end, _ in windows]
+    assert ends == list(range(WINDOW, len(stream) + 1, HOP))
+    for end, window in (w for windows in emitted for w in windows):
+        np.testing.assert_array_equal(window, stream[end - WINDOW:end])
+    assert windower.total_samples == len(stream)
+
+
+def test_stream_binary_and_json_frames(encoder):
+    stream = _stream(WINDOW + 3 * HOP, seed=1)
+    frames = np.split(stream, [30, WINDOW + 5, WINDOW + HOP, WINDOW + HOP + 1])
+    client = TestClient(sidecar.app)
+    replies = []
+
+    with client.websocket_connect("/stream") as ws:
+        for i, frame in enumerate(frames):
+            if i % 2:
+                ws.send_text(json.dumps({"samples": frame.tolist()}))
+            else:
+                ws.send_bytes(frame.astype("<f4").tobytes())
+            start = sum(len(f) for f in frames[:i])
+            # One reply per window completed by this frame
+            completed = len(range(WINDOW, start + len(frame) + 1, HOP)) - len(range(WINDOW, start + 1, HOP))
+            replies += [ws.receive_json() for _ in range(completed)]
+
+    assert [r["seq"] for r in replies] == list(range(4))
+    assert [r["end_sample"] for r in replies] == [WINDOW, WINDOW + HOP, WINDOW + 2 * HOP, WINDOW + 3 * HOP]
+    for reply in replies:
+        latent, scores = encoder(stream[reply["end_sample"] - WINDOW:reply["end_sample"]])
+        np.testing.assert_allclose(reply["latent"], latent, rtol=1e-4, atol=1e-5)
+        np.testing.assert_allclose(reply["motif_scores"], scores, rtol=1e-4, atol=1e-6)
+
+
+def test_stream_invalid_frames_get_an_error_reply(encoder):
+    client = TestClient(sidecar.app)
+
+    with client.websocket_connect("/stream") as ws:
+        ws.send_bytes(np.zeros(10, dtype="<f4").tobytes())
+        assert ws.receive_json()["error"].startswith("invalid frame: expected a multiple of 9")
+        ws.send_text(json.dumps({"x": []}))
+        assert ws.receive_json()["error"].startswith("invalid frame")
+        ws.send_text("not json")
+        assert ws.receive_json()["error"].startswith("invalid frame")
+
+        # The connection keeps going and nothing was buffered from the bad frames
+        ws.send_bytes(_stream(WINDOW, seed=2).tobytes())
+        reply = ws.receive_json()
+    assert reply["seq"] == 0 and reply["end_sample"] == WINDOW
@@ -0,0 +1,151 @@
+"""Forked sidecar workers share one port and report aggregated metrics."""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("uvicorn")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.read().decode()
+
+
+@pytest.fixture
+def sidecar(tmp_path):
+    port = _free_port()
+    env = dict(os.environ, SIDECAR_WORKERS="2", FASTAPI_HOST="127.0.0.1", FASTAPI_PORT=str(port),
+               PROMETHEUS_MULTIPROC_DIR=str(tmp_path), LOG_LEVEL="warning")
+    proc = subprocess.Popen([sys.executable, "hailo_sidecar_metrics_template.py"], cwd=REPO_ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while True:
+        try:
+            _get(url + "/healthz")
+            break
+        except OSError:
+            if time.time() > deadline or proc.poll() is not None:
+                proc.kill()
+                pytest.fail("sidecar did not start")
+            time.sleep(0.1)
+    yield proc, url
+    if proc.poll() is None:
+        proc.kill()
+        proc.wait()
+
+
+def test_metrics_aggregate_across_workers(sidecar):
+    proc, url = sidecar
+    body = json.dumps({"x": [[0.0] * 9] * 100}).encode()
+    for _ in range(10):
+        request = urllib.request.Request(url + "/infer", data=body, headers={"Content-Type": "application/json"})
+        urllib.request.urlopen(request, timeout=5).read()
+
+    metrics = _get(url + "/metrics")
+
+    assert 'hailo_inference_requests_total{model_type="tcn_vae",status="success"} 10.0' in metrics
+    # Loaded once in the parent before forking
+    assert 'hailo_inference_backend{backend="mock"} 1.0' in metrics
+
+
+def test_sigterm_stops_all_workers(sidecar):
+    proc, url = sidecar
+    children = subprocess.run(["ps", "--ppid", str(proc.pid), "-o", "pid="], capture_output=True, text=True)
+    assert len(children.stdout.split()) >= 2
+
+    proc.send_signal(signal.SIGTERM)
+
+    assert proc.wait(timeout=15) == 0
+    for pid in children.stdout.split():
+        with pytest.raises(ProcessLookupError):
+            os.kill(int(pid), 0)
+
+
+def _children(pid):
+    out = subprocess.run(["ps", "--ppid", str(pid), "-o", "pid="], capture_output=True, text=True).stdout
+    return {int(child) for child in out.split()}
+
+
+def _wait_for(condition, timeout=30):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            pytest.fail("timed out")
+        time.sleep(0.1)
+
+
+def _shm_connect(socket_path, **kwargs):
+    """ShmClient once the transport child is accepting (its socket file may be stale)"""
+    from shm_transport import ShmClient
+
+    clients = []
+
+    def connect():
+        try:
+            clients.append(ShmClient(str(socket_path), **kwargs))
+        except OSError:
+            return False
+        return True
+
+    _wait_for(connect)
+    return clients[0]
+
+
+@pytest.mark.skipif(not hasattr(socket, "SO_PEERCRED"), reason="needs SO_PEERCRED (Linux)")
+def test_worker_restart_with_a_connected_shm_client(tmp_path):
+    import struct
+
+    np = pytest.importorskip("numpy")
+    sys.path.insert(0, str(REPO_ROOT))
+
+    socket_path = tmp_path / "infer.sock"
+    proc = subprocess.Popen(
+        [sys.executable, "hailo_sidecar_metrics_template.py"], cwd=REPO_ROOT,
+        env=dict(os.environ, SIDECAR_WORKERS="2", FASTAPI_HOST="127.0.0.1", FASTAPI_PORT=str(_free_port()),
+                 PROMETHEUS_MULTIPROC_DIR=str(tmp_path), SHM_SOCKET_PATH=str(socket_path), LOG_LEVEL="warning"),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        windows = np.zeros((4, 100, 9), dtype=np.float32)
+        with _shm_connect(socket_path, slots=2, slot_windows=2) as client:
+            client.infer(windows)
+            shm_pid = struct.unpack("3i", client._sock.getsockopt(
+                socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))[0]
+            children = _children(proc.pid)
+            # The transport's threads live in a child, never in the forking parent
+            assert shm_pid != proc.pid and shm_pid in children and len(children) == 3
+
+            worker = min(children - {shm_pid})
+            os.kill(worker, signal.SIGKILL)
+            _wait_for(lambda: len(_children(proc.pid) - {worker}) == 3)
+
+            latents, scores = client.infer(windows)
+            assert latents.shape == (4, 64) and np.all(scores == 0.5)
+        assert proc.poll() is None
+
+        # A killed transport is restarted too; clients reconnect
+        os.kill(shm_pid, signal.SIGKILL)
+        _wait_for(lambda: len(_children(proc.pid) - {shm_pid}) == 3)
+        with _shm_connect(socket_path) as client:
+            assert client.infer(windows)[0].shape == (4, 64)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=15) == 0
@@ -0,0 +1,109 @@
+"""Streaming statistics match numpy within their documented accuracy, and
+the synchrony analysis scans each export in one pass."""
+
+import sys
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS_DIR = REPO_ROOT / "Documents" / "Projects" / "PiSrv_Docker" / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import analyze_synchrony_data  # noqa: E402
+import generate_synthetic_dataset  # noqa: E402
+import synchrony_io  # noqa: E402
+from streaming_stats import HyperLogLog, RunningMoments, TDigest, compute_statistics  # noqa: E402
+
+
+def test_running_moments_chan_merge_matches_numpy():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(1e6, 3, 5000), rng.normal(1e6 + 10, 1, 7), rng.uniform(-5, 5, 1)])
+    moments = RunningMoments()
+
+    for batch in np.split(values, [1, 2, 1000, 1007, 4000]):
+        moments.update(batch)
+
+    assert moments.count == len(values)
+    assert moments.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert moments.std == pytest.approx(values.std(ddof=1), rel=1e-9)
+    assert (moments.min, moments.max) == (values.min(), values.max())
+    single = RunningMoments()
+    single.update(values[:1])
+    assert single.std is None
+
+
+@pytest.mark.parametrize("distribution", ["normal", "lognormal"])
+def test_tdigest_quantile_rank_error(distribution):
+    rng = np.random.default_rng(1)
+    values = getattr(rng, distribution)(size=200_000)
+    digest = TDigest()
+
+    for batch in np.array_split(values, 37):
+        digest.update(batch)
+
+    ordered = np.sort(values)
+    for q in (0.001, 0.01, 0.25, 0.5, 0.75, 0.99, 0.999):
+        rank = np.searchsorted(ordered, digest.quantile(q)) / len(values)
+        # k1 scale: tighter near the tails
+        assert abs(rank - q) <= max(0.005, q * (1 - q) * 0.02), q
+    assert TDigest().quantile(0.5) is None
+
+
+@pytest.mark.parametrize("distinct", [300, 20_000, 500_000])
+def test_hyperloglog_relative_error(distinct):
+    hll = HyperLogLog()
+    values = list(range(distinct))
+
+    hll.update(values)
+    hll.update(values[: distinct // 2])  # duplicates do not count
+
+    # precision 14: standard error 1.04 / sqrt(2**14) ~ 0.8%
+    assert abs(hll.estimate() - distinct) / distinct < 0.03
+
+
+def test_compute_statistics_fields():
+    records = [{"score": i / 10, "name": f"s{i % 7}", "imu": [[0.0] * 9], "opt": None if i % 2 else i}
+               for i in range(1000)]
+
+    stats = compute_statistics(iter(records), chunk_size=64)
+
+    assert stats["record_count"] == 1000
+    score = stats["numeric_field_stats"]["score"]
+    assert score["mean"] == pytest.approx(49.95) and score["median"] == pytest.approx(49.95, abs=0.5)
+    assert stats["numeric_field_stats"]["opt"]["null_count"] == 500
+    assert stats["text_field_stats"]["name"]["unique_values"] == 7
+    assert stats["text_field_stats"]["imu"]["unique_values"] == "N/A (complex type)"
+
+
+def _scan_peak(path):
+    tracemalloc.start()
+    try:
+        structure, stats = analyze_synchrony_data.scan_jsonl(path, "MVP", chunk_size=50)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return structure, stats, peak
+
+
+def test_analysis_streams_each_export(tmp_path, monkeypatch):
+    # Files larger than the read chunk, so both scans hold the same buffers
+    monkeypatch.setattr(synchrony_io, "CHUNK_SIZE", 64 << 10)
+    small, large = tmp_path / "small", tmp_path / "large"
+    generate_synthetic_dataset.generate_dataset(small, records=200)
+    generate_synthetic_dataset.generate_dataset(large, records=1000)
+
+    _, _, small_peak = _scan_peak(small / "synchrony_mvp_data.jsonl")
+    structure, stats, large_peak = _scan_peak(large / "synchrony_mvp_data.jsonl")
+
+    assert structure["record_count"] == stats["record_count"] == 1000
+    assert "imu_data" in structure["fields"]
+    # Memory follows the chunk size, not the file size
+    assert large_peak < small_peak * 1.5
+    report = analyze_synchrony_data.main(large)
+    assert report["integrity_validation"]["mvp_format"] == {
+        "record_count_match": True, "jsonl_count": 1000, "csv_count": 1000, "issues": []}
+    assert report["statistics"]["full_format"]["record_count"] == 1000
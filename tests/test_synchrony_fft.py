@@ -0,0 +1,126 @@
+"""The FFT synchrony engine matches direct per-lag Pearson correlation and
+recovers the handler/dog lag in the worker stage and the converter."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS_DIR = REPO_ROOT / "Documents" / "Projects" / "PiSrv_Docker" / "scripts"
+sys.path.insert(0, str(REPO_ROOT / "opt" / "hailo"))
+sys.path.insert(0, str(REPO_ROOT))
+
+import synchrony_fft  # noqa: E402
+import session_worker  # noqa: E402
+from synchrony_stage import SYNCHRONY_NAME, SynchronyStage  # noqa: E402
+
+MODEL_DIR = REPO_ROOT / "appdata" / "models" / "tcn_vae"
+
+
+def _direct(a, b, max_lag, channels):
+    out = []
+    n = len(a)
+    for k in range(-max_lag, max_lag + 1):
+        x = a[max(-k, 0):n - max(k, 0)]
+        y = b[max(k, 0):n + min(k, 0)]
+        out.append(np.mean([np.corrcoef(x[:, c], y[:, c])[0, 1] for c in channels]))
+    return np.array(out)
+
+
+def _gait(n, lag=0, seed=0):
+    """Nine noisy periodic channels; with lag > 0 the stream trails by lag samples"""
+    rng = np.random.default_rng(seed)
+    t = (np.arange(n) - lag) / 100
+    clean = np.stack([np.sin(2 * np.pi * 1.7 * t + c) + 0.5 * np.sin(2 * np.pi * 0.6 * t * (c + 1))
+                      for c in range(9)], axis=1)
+    return clean + 0.2 * rng.normal(size=clean.shape)
+
+
+@pytest.mark.parametrize("channels", [None, [0, 1, 2]])
+def test_matches_direct_pearson_per_lag(channels):
+    rng = np.random.default_rng(0)
+    a = rng.normal(size=(4, 100, 9))
+    b = 0.5 * a + rng.normal(size=(4, 100, 9))
+
+    r = synchrony_fft.lagged_correlation(a, b, 30, channels)
+
+    for w in range(4):
+        np.testing.assert_allclose(r[w], _direct(a[w], b[w], 30, channels or range(9)), atol=1e-10)
+
+
+def test_recovers_lag_independent_of_batching():
+    dog, handler = _gait(20000), _gait(20000, lag=12, seed=1)
+
+    result = synchrony_fft.session_synchrony(dog, handler, 100, 50, 30, batch_size=7)
+
+    assert len(result["lag"]) == len(result["window_start"]) == 399
+    assert np.median(result["lag"]) == 12
+    assert result["score"].mean() > 0.9 > (result["zero_lag_r"].mean() + 1) / 2
+    unbatched = synchrony_fft.session_synchrony(dog, handler, 100, 50, 30)
+    np.testing.assert_array_equal(result["lag"], unbatched["lag"])
+    assert synchrony_fft.summarize(result)["median_lag_ms"] == 120.0
+
+
+def test_flat_channels_and_invalid_lags():
+    a = np.random.default_rng(2).normal(size=(2, 100, 9))
+    b = a.copy()
+    b[:, :, 8] = 1.0
+
+    r = synchrony_fft.lagged_correlation(a, b, 10)
+
+    # Eight identical channels and one without variance
+    assert np.isfinite(r).all()
+    assert r[:, 10] == pytest.approx(8 / 9)
+    with pytest.raises(ValueError):
+        synchrony_fft.lagged_correlation(a, b, 51)
+
+
+def test_worker_stage_writes_and_reuses_synchrony(tmp_path, monkeypatch):
+    sdir = tmp_path / "session"
+    sdir.mkdir()
+    (sdir / "imu.json").write_text(json.dumps({"x": _gait(1050).tolist()}))
+    (sdir / "handler_imu.json").write_text(json.dumps(_gait(1000, lag=-8, seed=1).tolist()))
+    monkeypatch.setattr(session_worker, "_synchrony_stage", SynchronyStage(MODEL_DIR))
+    monkeypatch.setattr(session_worker, "_imu_stage", None)
+    monkeypatch.setattr(session_worker, "ImuBatchStage", None)
+
+    session_worker._finish(sdir, {"status": "ok", "session": sdir.name}, 0.0)
+
+    info = json.loads((sdir / "results.json").read_text())["synchrony"]
+    assert info["windows"] == 19 and info["samples"] == 1000
+    assert info["median_lag_ms"] == -80.0
+    with np.load(sdir / SYNCHRONY_NAME) as out:
+        assert out["score"].shape == (19,) and int(out["max_lag"]) == 30
+    assert session_worker.run_synchrony_analysis(sdir)["reused"] is True
+    # A changed setting recomputes instead of reusing stale scores
+    stage = SynchronyStage(MODEL_DIR, max_lag_sec=0.2)
+    assert "reused" not in stage.run(sdir) and stage.run(sdir)["reused"] is True
+    with np.load(sdir / SYNCHRONY_NAME) as out:
+        assert int(out["max_lag"]) == 20
+    assert "reused" not in SynchronyStage(MODEL_DIR, max_lag_sec=0.2, sample_rate=50).run(sdir)
+    # Sessions without the handler's IMU are skipped
+    (sdir / "handler_imu.json").unlink()
+    assert session_worker.run_synchrony_analysis(sdir) is None
+
+
+def test_converter_recomputes_synchrony(tmp_path):
+    pytest.importorskip("pandas")
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    import convert_for_pisrv
+    from generate_synthetic_dataset import generate_dataset
+
+    generate_dataset(tmp_path, records=200, sessions=2, write_csv=False)
+    metadata = json.loads((tmp_path / "session_metadata.json").read_text())
+
+    by_record, totals, end = convert_for_pisrv.compute_synchrony(tmp_path / "synchrony_data.jsonl")
+
+    assert len(by_record) == 200 and end == (tmp_path / "synchrony_data.jsonl").stat().st_size
+    sessions = convert_for_pisrv.merge_synchrony_sessions({}, totals)
+    for session in metadata["sessions"]:
+        assert sessions[session["session_id"]]["mean_lag_ms"] == pytest.approx(session["lag_ms"], abs=15)
+    motifs = convert_for_pisrv.format_for_analysis_motifs([{"id": 0, "synchrony_score": 0.5}], by_record)
+    assert set(motifs[0]) >= {"sync_score", "sync_score_fft", "sync_lag_ms"}
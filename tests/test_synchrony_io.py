@@ -0,0 +1,69 @@
+"""The chunked JSONL loader yields the same records and offsets whatever
+the chunk size, defers an unfinished last line and rejects an unknown
+forced JSON backend."""
+
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS_DIR = REPO_ROOT / "Documents" / "Projects" / "PiSrv_Docker" / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import synchrony_io  # noqa: E402
+
+RECORDS = [
+    {"id": 0, "session_id": "a", "imu_data": [[0.5] * 9] * 200},  # spans many small chunks
+    {"id": 1, "session_id": "a", "note": "short"},
+    {"id": 2, "session_id": "b", "imu_data": [[1.25] * 9] * 3},
+]
+
+
+def _write(path, tail=b""):
+    lines = [json.dumps(record).encode() + b"\n" for record in RECORDS]
+    data = lines[0] + b"\n" + b"".join(lines[1:]) + tail  # with a blank line
+    path.write_bytes(data)
+    return data
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096, synchrony_io.CHUNK_SIZE])
+def test_records_and_offsets_do_not_depend_on_chunk_size(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(synchrony_io, "CHUNK_SIZE", chunk_size)
+    data = _write(tmp_path / "data.jsonl")
+    hasher = hashlib.sha256()
+
+    pairs = list(synchrony_io.iter_jsonl_with_offsets(tmp_path / "data.jsonl", hasher=hasher))
+
+    assert [record for record, _ in pairs] == RECORDS
+    assert [offset for _, offset in pairs] == [data.index(b"\n") + 1, data.index(b'"short"}') + 9, len(data)]
+    assert hasher.hexdigest() == hashlib.sha256(data).hexdigest()
+    # Resuming from an offset reads the rest only
+    resumed = list(synchrony_io.iter_jsonl(tmp_path / "data.jsonl", fields=("id",), start=pairs[0][1]))
+    assert resumed == [{"id": 1}, {"id": 2}]
+
+
+@pytest.mark.parametrize("chunk_size", [5, synchrony_io.CHUNK_SIZE])
+def test_unfinished_last_line(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(synchrony_io, "CHUNK_SIZE", chunk_size)
+    data = _write(tmp_path / "data.jsonl", tail=b'{"id": 3, "sess')
+    hasher = hashlib.sha256()
+
+    pairs = list(synchrony_io.iter_jsonl_with_offsets(tmp_path / "data.jsonl", hasher=hasher))
+
+    # Left for the next run, and not hashed
+    assert len(pairs) == 3 and pairs[-1][1] == len(data) - len(b'{"id": 3, "sess')
+    assert hasher.hexdigest() == hashlib.sha256(data[:pairs[-1][1]]).hexdigest()
+
+    # A complete last record without its newline is yielded
+    _write(tmp_path / "done.jsonl", tail=b'{"id": 3}')
+    assert synchrony_io.load_jsonl(tmp_path / "done.jsonl")[-1] == {"id": 3}
+
+
+def test_forced_backend():
+    assert synchrony_io._select_backend("json")[0] == "json"
+    assert synchrony_io._select_backend(None)[0] == synchrony_io.BACKEND
+    with pytest.raises(ValueError, match="orjsn"):
+        synchrony_io._select_backend("orjsn")
@@ -0,0 +1,114 @@
+"""Incremental TCN inference must match full recomputation, and the int8
+CPU fallback must stay close to the float encoder."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from tcn_inference import IncrementalTCN, TCNEncoder, int8_accuracy, normalize_state_dict  # noqa: E402
+
+MODEL_CONFIG = REPO_ROOT / "appdata" / "models" / "tcn_vae" / "model_config.json"
+WINDOW = 100
+HOP = 50
+
+
+@pytest.fixture(scope="module")
+def encoder():
+    return TCNEncoder.from_config(MODEL_CONFIG, weights_path=None, seed=1)
+
+
+def _stream(samples, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(samples, 9)).astype(np.float32)
+
+
+def test_incremental_matches_full_recomputation(encoder):
+    stream = _stream(WINDOW + HOP * 20)
+    incremental = IncrementalTCN(encoder, HOP)
+
+    for start in range(0, len(stream) - WINDOW + 1, HOP):
+        window = stream[start:start + WINDOW]
+        latent, scores = incremental(window)
+        expected_latent, expected_scores = encoder(window)
+        np.testing.assert_allclose(latent, expected_latent, rtol=1e-4, atol=1e-5)
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-4, atol=1e-6)
+
+    assert incremental.full_windows == 1
+    assert incremental.incremental_windows == 20
+
+
+def test_non_overlapping_window_falls_back_to_full(encoder):
+    incremental = IncrementalTCN(encoder, HOP)
+    first, second = _stream(WINDOW, seed=1), _stream(WINDOW, seed=2)
+
+    incremental(first)
+    latent, _ = incremental(second)
+
+    np.testing.assert_allclose(latent, encoder(second)[0], rtol=1e-4, atol=1e-5)
+    assert incremental.full_windows == 2
+    assert incremental.incremental_windows == 0
+
+
+def test_output_shapes(encoder):
+    latent, scores = encoder(_stream(WINDOW))
+    assert latent.shape == (64,)
+    assert scores.shape == (12,)
+    assert scores.sum() == pytest.approx(1.0, rel=1e-5)
+
+
+def test_int8_matches_float_encoder(encoder):
+    quantized = encoder.quantize_int8()
+    windows = [_stream(WINDOW, seed=seed) for seed in range(20)]
+
+    report = int8_accuracy(encoder, quantized, windows)
+
+    assert report["latent_min_cosine"] > 0.999
+    assert report["motif_score_max_abs_error"] < 0.02
+    assert report["top_motif_agreement"] >= 0.95
+
+
+def test_int8_incremental_matches_int8_full(encoder):
+    quantized = encoder.quantize_int8()
+    stream = _stream(WINDOW + HOP * 5)
+    incremental = IncrementalTCN(quantized, HOP)
+
+    for start in range(0, len(stream) - WINDOW + 1, HOP):
+        window = stream[start:start + WINDOW]
+        np.testing.assert_allclose(incremental(window)[0], quantized(window)[0], rtol=1e-4, atol=1e-5)
+
+
+@pytest.mark.parametrize("int8", [False, True])
+def test_batch_matches_per_window(encoder, int8):
+    model = encoder.quantize_int8() if int8 else encoder
+    windows = np.stack([_stream(WINDOW, seed=seed) for seed in range(10)])
+
+    latents, scores = model.batch(windows, batch_size=4)
+
+    assert latents.shape == (10, 64) and scores.shape == (10, 12)
+    for i, window in enumerate(windows):
+        expected_latent, expected_scores = model(window)
+        np.testing.assert_allclose(latents[i], expected_latent, rtol=1e-4, atol=1e-5)
+        np.testing.assert_allclose(scores[i], expected_scores, rtol=1e-4, atol=1e-6)
+
+
+def test_normalize_state_dict_folds_weight_norm():
+    rng = np.random.default_rng(0)
+    v = rng.normal(size=(4, 3, 3)).astype(np.float32)
+    g = np.full((4, 1, 1), 2.0, dtype=np.float32)
+    state = {
+        "encoder.network.0.conv1.weight_v": v,
+        "encoder.network.0.conv1.weight_g": g,
+        "encoder.network.0.conv1.bias": np.zeros(4, np.float32),
+    }
+
+    weights = normalize_state_dict(state)
+
+    assert set(weights) == {"blocks.0.conv1.weight", "blocks.0.conv1.bias"}
+    norms = np.sqrt((weights["blocks.0.conv1.weight"] ** 2).sum(axis=(1, 2)))
+    np.testing.assert_allclose(norms, 2.0, rtol=1e-5)
@@ -0,0 +1,52 @@
+"""Worker Prometheus exporter: exposition format, HTTP endpoint and textfile output."""
+
+import sys
+import urllib.request
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "opt" / "hailo"))
+
+import worker_metrics  # noqa: E402
+
+
+def _registry():
+    registry = worker_metrics.Registry()
+    pending = worker_metrics.Gauge(registry, "pending", "Pending sessions")
+    errors = worker_metrics.Counter(registry, "errors_total", "Errors", ["type"])
+    stage = worker_metrics.Histogram(registry, "stage_seconds", "Stage time", ["stage"], buckets=(1, 5))
+    pending.set(3)
+    errors.inc(type="device_busy")
+    errors.inc(type="device_busy")
+    stage.observe(0.5, stage="benchmark")
+    stage.observe(3.0, stage="benchmark")
+    return registry
+
+
+def test_exposition_format():
+    text = _registry().expose()
+
+    assert "# TYPE pending gauge\npending 3.0\n" in text
+    assert 'errors_total{type="device_busy"} 2.0' in text
+    assert 'stage_seconds_bucket{stage="benchmark",le="1.0"} 1' in text
+    assert 'stage_seconds_bucket{stage="benchmark",le="5.0"} 2' in text
+    assert 'stage_seconds_bucket{stage="benchmark",le="+Inf"} 2' in text
+    assert 'stage_seconds_sum{stage="benchmark"} 3.5' in text
+    assert 'stage_seconds_count{stage="benchmark"} 2' in text
+
+
+def test_http_endpoint_and_textfile(tmp_path):
+    registry = _registry()
+    server = worker_metrics.start_http_server(registry, 0, addr="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert response.read().decode() == registry.expose()
+    finally:
+        server.shutdown()
+
+    path = tmp_path / "session_worker.prom"
+    registry.write_textfile(path)
+    assert path.read_text() == registry.expose()
+    assert not (tmp_path / "session_worker.prom.tmp").exists()